@@ -125,6 +125,10 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # == 设置数据存储的目录，采用 json 格式存储 ==
 DATA_DIR = os.path.join(BASE_DIR, 'data')
 
+# == 服务预热: 启动后在后台线程中预先加载的服务, 如 ['products', 'tasks']; True 表示全部, 空表示第一次使用时才加载 ==
+# 服务名称见 core/services/registry.py, 各服务的加载耗时可由 registry.load_times() 查看
+SERVICE_PREWARM = []
+
 # == 静态文件配置 ==
 STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'core/static'),
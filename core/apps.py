@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # 服务默认在第一次请求时才加载; 配置 SERVICE_PREWARM 后在后台线程中预先加载, 不阻塞启动
+        names = getattr(settings, 'SERVICE_PREWARM', None)
+        if names:
+            from .services import registry
+            registry.prewarm(None if names is True else names)
@@ -1,5 +1,6 @@
 from .task_service import TaskService
 from .client_service import ClientService
 from .product_service import ProductService
+from .registry import ServiceRegistry, registry
 
 from .task_service_plus import TaskServicePlus
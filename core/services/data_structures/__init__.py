@@ -1,5 +1,8 @@
-from .heap import AdaptableHeapPriorityQueue
+from .heap import HeapPriorityQueue, AdaptableHeapPriorityQueue
 from .map import ProbeHashMap
 from .graph import Graph, BFS, BFS_allow_loop, topological_sort, exist_loop, floyd_warshall_shortest_path
 from .search_tree import AVLTreeMap
-from .b_plus_tree import BPlusTree
\ No newline at end of file
+from .b_plus_tree import BPlusTree
+from .ngram_index import NGramIndex
+from .lru_cache import LRUCache
+from .record_store import RecordStore
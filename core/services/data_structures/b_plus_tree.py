@@ -1,33 +1,267 @@
+import os
+import struct
+from bisect import bisect_left, bisect_right
+
 try:
     from .utils import ArrayStack
 except ImportError:
     from utils import ArrayStack  # 栈
 
-# B+ 树阶数
-ORDER = 3
+# B+ 树默认阶数: 节点最多 ORDER 个键; 阶数越大树越矮, 节点数越少, 页文件模式下一页约 16 * ORDER 字节
+ORDER = 64
+
+# 页文件: 第 0 页为文件头, 其后每页存储一个定长节点, 页号即节点的磁盘地址
+PAGE_MAGIC = b'BPTF'
+PAGE_VERSION = 2
+# 文件头: 魔数, 版本, 阶数, 键格式, 值格式, 根节点页号, 数据量, 页数, 空闲页链表头
+_FILE_HEADER = struct.Struct('<4sHHccqqqq')
+# 节点头: 是否为叶子节点, 键数, 下一个/上一个叶子节点的页号 (-1 表示无)
+_NODE_HEADER = struct.Struct('<?xHxxxxqq')
 
 
 class BPlusNode:
     """B+ 树的节点类"""
 
-    def __init__(self, is_leaf=False):
+    def __init__(self, is_leaf=False, page=None):
         self.is_leaf = is_leaf  # 是否为叶子节点, 只有叶子节点存储真实数据的索引
         self.keys = []  # 存储本节点的键值
         self.children = []  # 存储子树的索引, 指向下一层的节点
         self.next = None  # 同一层是否有链式结构, 叶子节点键链式连接
+        self.prev = None  # 上一个叶子节点, 叶子层为双向链表, 可以从大到小遍历
+        self.page = page  # 页文件模式下节点所在的页号, 内存模式为 None
+
+
+class _PageFile:
+    """
+    B+ 树的页文件: 每个节点序列化为定长的页, 第 0 页为文件头 (记录根节点页号、数据量、空闲页链表等)
+    页中的子节点与 next/prev 指针存为页号; 删除 (合并) 释放的页通过其 next 字段串成空闲链表, 分配时优先复用
+    键和值都是 8 字节的数 (struct 格式 'q' 整数 或 'd' 浮点数)
+    """
+
+    def __init__(self, filename, order, key_format, value_format):
+        for fmt in (key_format, value_format):
+            if fmt not in ('q', 'd'):
+                raise ValueError('key/value format must be "q" or "d"')
+        self.filename = filename
+        self.key_format = key_format
+        self.value_format = value_format
+        self._set_order(order)
+        self.root = -1  # 根节点页号
+        self.size = 0  # 数据量
+        self.pages = 1  # 页数 (含文件头)
+        self.free = -1  # 空闲页链表头
+
+    def _set_order(self, order):
+        """按阶数确定页的布局: 节点最多 order 个键 (满了才分裂), order + 1 个子节点"""
+        self.order = order
+        self._leaf = struct.Struct(f'<{order}{self.key_format}{order + 1}{self.value_format}')
+        self._internal = struct.Struct(f'<{order}{self.key_format}{order + 1}q')
+        self.page_size = max(_NODE_HEADER.size + self._leaf.size, _FILE_HEADER.size)
+
+    def open(self):
+        """
+        打开已有的页文件, 只读取文件头 O(1); 阶数以文件头为准 (页的布局由建立时的阶数决定)
+        文件头无效 (不存在/损坏/键值格式不符) 返回 False
+        """
+        if not os.path.exists(self.filename):
+            return False
+        f = open(self.filename, 'r+b')
+        data = f.read(_FILE_HEADER.size)
+        try:
+            magic, version, order, key_format, value_format, root, size, pages, free = _FILE_HEADER.unpack(data)
+        except struct.error:
+            f.close()
+            return False
+        if (magic, version, key_format, value_format) != \
+                (PAGE_MAGIC, PAGE_VERSION, self.key_format.encode(), self.value_format.encode()) or order < 3:
+            f.close()
+            return False
+        requested = self.order
+        self._set_order(order)
+        if os.path.getsize(self.filename) < pages * self.page_size:
+            self._set_order(requested)
+            f.close()
+            return False
+        self._file = f
+        self.root, self.size, self.pages, self.free = root, size, pages, free
+        return True
+
+    def create(self):
+        """新建 (清空) 页文件"""
+        self._file = open(self.filename, 'w+b')
+        self.root, self.size, self.pages, self.free = -1, 0, 1, -1
+
+    def allocate(self):
+        """分配一页, 优先复用空闲页"""
+        if self.free != -1:
+            page = self.free
+            self.free = _NODE_HEADER.unpack(self._read(page)[:_NODE_HEADER.size])[2]
+            return page
+        self.pages += 1
+        return self.pages - 1
+
+    def release(self, page):
+        """释放一页, 挂到空闲链表头 (立即写入, 以免之后读取该页取得旧内容)"""
+        data = bytearray(self.page_size)
+        _NODE_HEADER.pack_into(data, 0, True, 0, self.free, -1)
+        self._write(page, data)
+        self.free = page
+
+    def read_node(self, page):
+        """读取一页并反序列化为节点; 子节点与 next/prev 保持为页号, 由树在访问时替换为节点对象"""
+        data = self._read(page)
+        is_leaf, n, nxt, prv = _NODE_HEADER.unpack_from(data)
+        node = BPlusNode(is_leaf=is_leaf, page=page)
+        fields = (self._leaf if is_leaf else self._internal).unpack_from(data, _NODE_HEADER.size)
+        order = self.order
+        node.keys = list(fields[:n])
+        if is_leaf:
+            node.children = list(fields[order:order + n])
+            node.next = None if nxt == -1 else nxt
+            node.prev = None if prv == -1 else prv
+        else:
+            node.children = list(fields[order:order + n + 1])
+        return node
+
+    def write_node(self, node):
+        """序列化节点写入其页; 子节点与 next/prev 若已是节点对象则写入其页号"""
+        order = self.order
+        keys = node.keys + [0] * (order - len(node.keys))
+        if node.is_leaf:
+            children = node.children
+            nxt, prv = (-1 if link is None else (link if link.__class__ is int else link.page)
+                        for link in (node.next, node.prev))
+            fmt = self._leaf
+        else:
+            children = [c if c.__class__ is int else c.page for c in node.children]
+            nxt = prv = -1
+            fmt = self._internal
+        children = children + [0] * (order + 1 - len(children))
+        data = bytearray(self.page_size)
+        _NODE_HEADER.pack_into(data, 0, node.is_leaf, len(node.keys), nxt, prv)
+        fmt.pack_into(data, _NODE_HEADER.size, *keys, *children)
+        self._write(node.page, data)
+
+    def write_header(self):
+        data = bytearray(self.page_size)
+        _FILE_HEADER.pack_into(data, 0, PAGE_MAGIC, PAGE_VERSION, self.order, self.key_format.encode(),
+                               self.value_format.encode(), self.root, self.size, self.pages, self.free)
+        self._write(0, data)
+
+    def flush(self, fsync=False):
+        self._file.flush()
+        if fsync:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+    def _read(self, page):
+        self._file.seek(page * self.page_size)
+        return self._file.read(self.page_size)
+
+    def _write(self, page, data):
+        self._file.seek(page * self.page_size)
+        self._file.write(data)
 
 
 class BPlusTree:
-    """B+ 树类"""
+    """
+    B+ 树类
+    默认所有节点常驻内存; 给定 filename 时为页文件模式: 节点存储在定长页中, 打开时只读文件头 O(1),
+    节点在第一次访问时才从磁盘读入 (之后子节点指针替换为节点对象), 修改过的节点在 flush 时写回
+    """
+
+    def __init__(self, filename=None, key_format='q', value_format='q', order=ORDER):
+        """
+        :param filename: 页文件路径, None 表示纯内存模式
+        :param key_format: 页文件模式下键的类型, 'q' 整数 / 'd' 浮点数
+        :param value_format: 页文件模式下值的类型, 'q' 整数 (True/False 存为 1/0) / 'd' 浮点数
+        :param order: 阶数, 即节点最多的键数, 至少为 3; 打开已有页文件时以文件中的阶数为准
+        """
+        if order < 3:
+            raise ValueError('order must be at least 3')
+        self.order = order
+        self._pager = None
+        self._nodes = {}  # 页文件模式: 已读入的节点 {页号: BPlusNode}, 保证同一页只有一个节点对象
+        self._dirty = set()  # 页文件模式: 修改过、尚未写回的节点
+        self.opened = False  # 页文件模式: 是否打开了已有的页文件 (否则为新建)
+        if filename is None:
+            self.root = BPlusNode(is_leaf=True)  # 初始根节点, 暂定为叶子节点
+            self._size = 0  # 记录树的实际数据数量
+            return
 
-    def __init__(self):
-        self.root = BPlusNode(is_leaf=True)  # 初始根节点, 暂定为叶子节点
-        self._size = 0  # 记录树的实际数据数量
+        self._pager = _PageFile(filename, order, key_format, value_format)
+        self.opened = self._pager.open()
+        if self.opened:
+            self.order = self._pager.order
+            self._size = self._pager.size
+            self.root = self._load(self._pager.root)
+        else:
+            self._pager.create()
+            self._size = 0
+            self.root = self._new_node(is_leaf=True)
+            self.flush()
 
     def __len__(self):
         """数据数量"""
         return self._size
 
+    def __iter__(self):
+        """按键升序迭代所有键"""
+        for key, _ in self.items():
+            yield key
+
+    def __reversed__(self):
+        """按键降序迭代所有键"""
+        for key, _ in self.items(reverse=True):
+            yield key
+
+    def items(self, start=None, end=None, reverse=False):
+        """
+        沿叶子链表按键升序产出 (key, value), 惰性产出, 可以只取前若干个
+        :param start: 起始 key (包含), None 表示从最小的键开始
+        :param end: 终止 key (包含), None 表示直到最大的键
+        :param reverse: True 则从 end 开始沿 prev 链表按键降序产出
+        """
+        if reverse:
+            yield from self._items_reversed(start, end)
+            return
+        if start is None:
+            node = self.root
+            while not node.is_leaf:
+                node = self._child(node, 0)  # 一直向左, 得到最小的叶子节点
+            i = 0
+        else:
+            node = self._search_leaf(start)
+            i = bisect_left(node.keys, start)
+        while node:
+            j = len(node.keys) if end is None else bisect_right(node.keys, end, i)
+            yield from zip(node.keys[i:j], node.children[i:j])
+            if j < len(node.keys):
+                return  # 超出了 end
+            node = self._next(node)
+            i = 0
+
+    # -------------------- 页文件 --------------------
+    def flush(self, fsync=False):
+        """页文件模式: 写回所有修改过的节点和文件头 (根节点页号、数据量); 内存模式无操作"""
+        pager = self._pager
+        if pager is None:
+            return
+        for node in sorted(self._dirty, key=lambda node: node.page):
+            pager.write_node(node)
+        self._dirty.clear()
+        pager.root, pager.size = self.root.page, self._size
+        pager.write_header()
+        pager.flush(fsync)
+
+    def close(self):
+        """页文件模式: 写回并关闭文件"""
+        if self._pager is not None:
+            self.flush()
+            self._pager.close()
+
     # -------------------- 增/删/改/查 --------------------
     def search(self, key):
         """
@@ -37,33 +271,36 @@ class BPlusTree:
         """
         node = self._search_leaf(key)  # node 是包含 key 的叶子节点
 
-        # 再查找叶子 node 中 key 的具体位置
-        for i, k in enumerate(node.keys):
-            if k == key:
-                return node.children[i]  # 此时返回的存储了真实数据的节点 BPlusNode 类
+        # 再在叶子 node 中二分查找 key 的具体位置
+        i = bisect_left(node.keys, key)
+        if i < len(node.keys) and node.keys[i] == key:
+            return node.children[i]  # 此时返回的存储了真实数据的节点 BPlusNode 类
         return None
 
-    def search_range(self, start, end):
+    def search_range(self, start, end, reverse=False):
         """
-        查找范围数据 start <= key < end
+        查找范围数据 start <= key <= end
         :param start: 起始 key
         :param end: 终止 key
-        :return: BPlusNode 类列表 [BPlusNode, ...]
+        :param reverse: True 则按键降序返回, 从 end 所在的叶子沿 prev 链表向左, 不必先取出整段再反转
+        :return: (key, value) 列表 [(key, value), ...]
         """
-        results = []  # 存储节点类
+        if reverse:
+            return list(self._items_reversed(start, end))
+        results = []  # 存储 (key, value) 对
 
-        # 1. 单点搜索: 找到包含键为 start 的叶子节点
+        # 1. 单点搜索: 找到包含键为 start 的叶子节点, 并二分得到第一个 >= start 的位置
         node = self._search_leaf(start)  # node 是包含 key = start 的叶子节点
+        i = bisect_left(node.keys, start)
 
-        # 2. 因为叶子节点是链式存储, 可以从 start 开始遍历
+        # 2. 因为叶子节点是链式存储, 可以从 start 开始遍历, 每个叶子二分得到 end 的位置后整段取出
         while node:
-            for i, k in enumerate(node.keys):
-                if k < start:
-                    continue
-                if k > end:
-                    return results  # 直到超出了 end
-                results.append((k, node.children[i]))  # 返回 (key, value) 对
-            node = node.next
+            j = bisect_right(node.keys, end, i)
+            results.extend(zip(node.keys[i:j], node.children[i:j]))  # 返回 (key, value) 对
+            if j < len(node.keys):
+                return results  # 直到超出了 end
+            node = self._next(node)
+            i = 0
         return results  # 或者返回 [start, inf] 一直到最后
 
     def insert(self, key, value):
@@ -73,15 +310,10 @@ class BPlusTree:
         :param value: 存储的数据
         :return: None
         """
-        if self.search(key) is not None:
-            # 检查: 若 key 存在, 直接更新 value
-            self.update_value(key, value)
-            return
-
         root = self.root  # 从根搜索
-        if len(root.keys) == ORDER:  # 根节点已满
+        if len(root.keys) == self.order:  # 根节点已满
             # 1. 创建新的根节点
-            new_root = BPlusNode(is_leaf=False)
+            new_root = self._new_node(is_leaf=False)
             new_root.children.append(self.root)
 
             # 2. 进行分裂
@@ -89,10 +321,9 @@ class BPlusTree:
 
             self.root = new_root  # 重新指定根节点
 
-        # 非满节点中插入
-        self._insert_non_full(self.root, key, value)
-
-        self._size += 1  # 数据量增加
+        # 非满节点中插入 (一次下降; 若 key 已存在则只更新 value)
+        if self._insert_non_full(self.root, key, value):
+            self._size += 1  # 数据量增加
 
     def delete(self, key):
         """
@@ -108,7 +339,9 @@ class BPlusTree:
             # 根节点是否退化
             if not self.root.is_leaf and len(self.root.children) == 1:
                 # 当根节点不是叶子节点 & 只有一个子节点时, 退化
-                self.root = self.root.children[0]
+                old_root = self.root
+                self.root = self._child(old_root, 0)
+                self._release(old_root)
         return deleted
 
     def update_value(self, key, new_value):
@@ -121,11 +354,12 @@ class BPlusTree:
         # 找到包含该键的叶子节点
         node = self._search_leaf(key)
 
-        # 直接更新值即可
-        for i, k in enumerate(node.keys):
-            if k == key:
-                node.children[i] = new_value
-                return True
+        # 二分查找后直接更新值即可
+        i = bisect_left(node.keys, key)
+        if i < len(node.keys) and node.keys[i] == key:
+            node.children[i] = new_value
+            self._touch(node)
+            return True
         return False
 
     def update_key(self, old_key, new_key):
@@ -143,17 +377,126 @@ class BPlusTree:
         self.insert(new_key, value)  # 加入新的, 不改变值 value
         return True
 
+    # -------------------- 批量建树 --------------------
+    def bulk_load(self, items):
+        """
+        由按键严格递增的键值对 O(n) 自底向上建树, 要求当前树为空
+        从左到右把叶子装到 阶数 - 1 个键 (留一个空位, 之后的插入不会立即分裂), 键数在叶子间均分, 每个都不少于下限;
+        再逐层把下一层的节点按同样方式分组为内部节点, 分隔键为右侧子树的最小键
+        :param items: 有序列表 [(k, v), (k, v), ...]
+        :return: None
+        """
+        if self._size:
+            raise ValueError('bulk_load requires an empty tree')
+        items = list(items)
+        for i in range(1, len(items)):
+            if not items[i - 1][0] < items[i][0]:
+                raise ValueError('keys must be strictly increasing')
+        if not items:
+            return
+
+        # 1. 叶子层, 复用空树的根节点作为第一个叶子
+        level = []  # [(节点, 子树最小键), ...]
+        prev = None
+        for lo, hi in self._chunks(len(items), self.order - 1):
+            leaf = self.root if prev is None else self._new_node(is_leaf=True)
+            leaf.keys = [k for k, _ in items[lo:hi]]
+            leaf.children = [v for _, v in items[lo:hi]]
+            self._touch(leaf)
+            if prev is not None:
+                prev.next = leaf
+                leaf.prev = prev
+            prev = leaf
+            level.append((leaf, leaf.keys[0]))
+
+        # 2. 逐层向上建立内部节点, 每个内部节点最多 阶数 个子节点
+        while len(level) > 1:
+            upper = []
+            for lo, hi in self._chunks(len(level), self.order):
+                node = self._new_node(is_leaf=False)
+                node.children = [child for child, _ in level[lo:hi]]
+                node.keys = [low for _, low in level[lo + 1:hi]]
+                upper.append((node, level[lo][1]))
+            level = upper
+        self.root = level[0][0]
+        self._size = len(items)
+
+    @staticmethod
+    def _chunks(n, capacity):
+        """把 n 个元素均分为 ceil(n / capacity) 组, 返回各组的 [lo, hi) 区间"""
+        count = -(-n // capacity)
+        size, extra = divmod(n, count)
+        lo = 0
+        for i in range(count):
+            hi = lo + size + (1 if i < extra else 0)
+            yield lo, hi
+            lo = hi
+
     # -------------------- nonpublic method --------------------
+    def _load(self, page):
+        """页文件模式: 返回页号对应的节点, 未读入则从磁盘读入"""
+        node = self._nodes.get(page)
+        if node is None:
+            node = self._nodes[page] = self._pager.read_node(page)
+        return node
+
+    def _child(self, node, i):
+        """内部节点的第 i 个子节点; 页文件模式下若仍是页号, 读入后替换为节点对象"""
+        child = node.children[i]
+        if child.__class__ is int:
+            child = node.children[i] = self._load(child)
+        return child
+
+    def _next(self, node):
+        """叶子节点的下一个叶子节点 (同 _child, 按需读入)"""
+        nxt = node.next
+        if nxt.__class__ is int:
+            nxt = node.next = self._load(nxt)
+        return nxt
+
+    def _prev(self, node):
+        """叶子节点的上一个叶子节点 (同 _child, 按需读入)"""
+        prv = node.prev
+        if prv.__class__ is int:
+            prv = node.prev = self._load(prv)
+        return prv
+
+    def _link(self, left, right):
+        """在叶子层双向链表中把 right 接在 left 之后 (right 为 None 表示 left 是最后一个叶子)"""
+        left.next = right
+        if right is not None:
+            right.prev = left
+            self._touch(right)
+
+    def _new_node(self, is_leaf):
+        """创建新节点, 页文件模式下同时分配页"""
+        node = BPlusNode(is_leaf=is_leaf)
+        if self._pager is not None:
+            node.page = self._pager.allocate()
+            self._nodes[node.page] = node
+            self._dirty.add(node)
+        return node
+
+    def _touch(self, *nodes):
+        """标记节点已修改, 页文件模式下在 flush 时写回"""
+        if self._pager is not None:
+            self._dirty.update(nodes)
+
+    def _release(self, node):
+        """节点被合并后释放其页"""
+        if self._pager is not None:
+            self._dirty.discard(node)
+            self._nodes.pop(node.page, None)
+            self._pager.release(node.page)
+
     def _search_leaf(self, key):
         """根据 key 查找键 key 所在的叶子节点"""
         node = self.root  # 从根节点查找
 
         while not node.is_leaf:  # 直到叶子节点 (存储数据, 键为 key)
-            i = 0
-            while i < len(node.keys) and key >= node.keys[i]:
-                # 直到找到 i 使得 node.keys[i] < key <= node.keys[i + 1]
-                i += 1
-            node = node.children[i]  # 去往对应的子树, 继续查找
+            # 二分找到 i 使得 node.keys[i - 1] <= key < node.keys[i]
+            i = bisect_right(node.keys, key)
+            node = self._child(node, i)  # 去往对应的子树, 继续查找
 
         return node
 
@@ -163,31 +506,32 @@ class BPlusTree:
         :param node: 非满节点
         :param key: 需要被插入的键
         :param value: 需要被插入的值
-        :return: None
+        :return: 是否插入了新键 (False 表示 key 已存在, 只更新了 value)
         """
         # 1. 在叶子节点中插入
         if node.is_leaf:
-            i = 0
-            while i < len(node.keys) and key > node.keys[i]:  # 找到插入位置
-                i += 1
+            i = bisect_left(node.keys, key)  # 二分找到插入位置
+            self._touch(node)
+            if i < len(node.keys) and node.keys[i] == key:  # key 已存在, 直接更新 value
+                node.children[i] = value
+                return False
             # 因为是叶子节点, 所以直接插入即可
             node.keys.insert(i, key)
             node.children.insert(i, value)
+            return True
 
         # 2. 在非叶子节点 (内部节点) 中插入
         else:  # 根据 key 找到被插入的 (key, value) 的正确叶子节点位置
-            i = 0
-            while i < len(node.keys) and key >= node.keys[i]:
-                i += 1  # 一个节点里寻找正确的位置
-            child = node.children[i]  # 下一层
+            i = bisect_right(node.keys, key)  # 一个节点里二分寻找正确的位置
+            child = self._child(node, i)  # 下一层
 
-            if len(child.keys) == ORDER:  # 节点已满
+            if len(child.keys) == self.order:  # 节点已满
                 self._split_child(node, i)  # 分裂
                 if key >= node.keys[i]:
                     i += 1
 
             # 当前位置, 递归调用插入函数
-            self._insert_non_full(node.children[i], key, value)
+            return self._insert_non_full(self._child(node, i), key, value)
 
     def _split_child(self, parent, index):
         """
@@ -198,9 +542,10 @@ class BPlusTree:
         :param index: 需要被分裂的子节点在父节点 children 中的索引
         :return:
         """
-        node = parent.children[index]  # 待分裂的节点
+        node = self._child(parent, index)  # 待分裂的节点
         mid = len(node.keys) // 2  # 计算分裂点的位置 (取中间)
-        new_node = BPlusNode(is_leaf=node.is_leaf)  # 分裂出的一个新节点
+        new_node = self._new_node(is_leaf=node.is_leaf)  # 分裂出的一个新节点
+        self._touch(parent, node)
 
         # 1. 叶子节点分裂
         if node.is_leaf:
@@ -212,9 +557,9 @@ class BPlusTree:
             node.keys = node.keys[:mid]
             node.children = node.children[:mid]
 
-            # 叶子节点满足链式结构
-            new_node.next = node.next
-            node.next = new_node
+            # 叶子节点满足双向链式结构: node <-> new_node <-> 原来的下一个叶子
+            self._link(new_node, self._next(node))
+            self._link(node, new_node)
 
             # 新节点的第一个键 (min key) 提升到父节点
             parent.keys.insert(index, new_node.keys[0])  # 注: list.insert() 函数
@@ -254,42 +599,49 @@ class BPlusTree:
         """
         # 1. node 是叶子节点
         if node.is_leaf:
-            if key in node.keys:
+            idx = bisect_left(node.keys, key)
+            if idx < len(node.keys) and node.keys[idx] == key:
                 # 叶子节点删除, 只需要找到删除即可
-                idx = node.keys.index(key)
                 node.keys.pop(idx)
                 node.children.pop(idx)
+                self._touch(node)
+                # 删除的是叶子节点的最小键时, 祖先中等于 key 的分隔键在递归返回途中修复 (见内部节点分支)
 
-                # 检查是否需要修复: 删除的是叶子节点的边界值时, 需要修复父节点索引
-                self._fix_parent_keys(node, key)
-
-                # 删除成功, 修复: 节点的键数量是否 < (ORDER + 1) // 2
-                min_key = (ORDER + 1) // 2 - 1
+                # 删除成功, 修复: 节点的键数量是否 < (阶数 + 1) // 2 - 1
+                min_key = (self.order + 1) // 2 - 1
                 return True, len(node.keys) < min_key
 
             return False, False  # 失败
 
         # 2. node 是内部节点
         else:
-            # part 1 找到包含 k 的子节点
-            i = 0
-            while i < len(node.keys) and key >= node.keys[i]:
-                i += 1
+            # part 1 二分找到包含 k 的子节点
+            i = bisect_right(node.keys, key)
 
             # part 2 从子节点开始递归删除
-            deleted, need_fix = self._delete(node.children[i], key)
+            deleted, need_fix = self._delete(self._child(node, i), key)
 
             if not deleted:
                 return False, False  # 失败
 
+            # part 2.5 修复分隔键: 递归调用栈就是根到叶子的路径, 无需从根查找父节点
+            # 被删除的 key 若是子树 i 的最小键, 它至多作为一个祖先的分隔键出现, 即此处的 node.keys[i - 1],
+            # 改为子树新的最小键 O(树高); 子节点为空时由下面的借键/合并处理
+            if i > 0 and node.keys[i - 1] == key:
+                child = self._child(node, i)
+                if not child.is_leaf or child.keys:
+                    node.keys[i - 1] = self._min_key(child)
+                    self._touch(node)
+
             # part 3 是否需要修复 (合并节点 or 向兄弟节点借键)
             if need_fix:  # 需要修复
                 # 获取左右兄弟节点
-                left = node.children[i - 1] if i > 0 else None  # 超出则为 None, 表示没有
-                right = node.children[i + 1] if i + 1 < len(node.children) else None
-                min_key = (ORDER + 1) // 2 - 1
+                left = self._child(node, i - 1) if i > 0 else None  # 超出则为 None, 表示没有
+                right = self._child(node, i + 1) if i + 1 < len(node.children) else None
+                min_key = (self.order + 1) // 2 - 1
 
-                curr = node.children[i]  # 当前需要修复的子节点, node 是父节点
+                curr = self._child(node, i)  # 当前需要修复的子节点, node 是父节点
+                self._touch(node, curr, *(sibling for sibling in (left, right) if sibling))
 
                 # situation 1 从左兄弟借一个键 (left > (阶数 + 1) // 2)
                 if left and len(left.keys) > min_key:
@@ -324,7 +676,7 @@ class BPlusTree:
                             # 利用 list 直接合并 key 和 指针列表
                             left.keys += curr.keys
                             left.children += curr.children
-                            left.next = curr.next
+                            self._link(left, self._next(curr))
                         else:
                             left.keys.append(node.keys[i - 1])
                             left.keys += curr.keys
@@ -333,13 +685,14 @@ class BPlusTree:
                         # 删除父节点 node 中代表分隔的 key 和指针
                         node.keys.pop(i - 1)
                         node.children.pop(i)
+                        self._release(curr)
 
                     elif right:  # 否则和左合并
                         if curr.is_leaf:
                             # 利用 list 直接合并 key 和 指针列表
                             curr.keys += right.keys
                             curr.children += right.children
-                            curr.next = right.next
+                            self._link(curr, self._next(right))
                         else:
                             curr.keys.append(node.keys[i])
                             curr.keys += right.keys
@@ -348,57 +701,37 @@ class BPlusTree:
                         # 删除父节点 node 中代表分隔的 key 和指针
                         node.keys.pop(i)
                         node.children.pop(i + 1)
+                        self._release(right)
 
                     # (删除成功, 继续检查父节点是否需要修复)
-                    return True, len(node.keys) < ((ORDER + 1) // 2 - 1)
+                    return True, len(node.keys) < ((self.order + 1) // 2 - 1)
 
             # 不需要修复
             return True, False
 
-    def _fix_parent_keys(self, node, key):
-        """
-        当叶子节点最小 key 删除时, 递归修复父节点中的索引
-        :param node: 被删除 key 的叶子节点
-        :param key: 键值
-        :return: None
-        """
-        if node == self.root:  # 根节点无需修复
-            return
-
-        # 查找当前节点的父节点
-        parent = self._find_parent(self.root, node)
-
-        if not parent:  # 无父节点, 即根节点, 同样无需修复, 仅作为检查
-            return
-
-        # 遍历父节点的所有子节点检查
-        for i, child in enumerate(parent.children):
-            if child == node and i > 0:
-                if parent.keys[i - 1] == key and node.keys:
-                    # 检查父节点的分隔键 (即其子节点的边界上的键) 是否等于被删除的键
-                    # 用当前节点新的最小键更新父节点
-                    parent.keys[i - 1] = node.keys[0]
-                # 递归向上修复
-                self._fix_parent_keys(parent, key)
-                break
-
-    def _find_parent(self, current, child):
-        """
-        从 current 节点开始寻找 child 的父节点
-        :param current: 查找起点 节点类
-        :param child: 目标节点的子节点
-        :return: BPlusNode or None
-        """
-        if current.is_leaf:
-            return None  # 从叶子节点出发, 一定无法查找到父节点
-
-        for c in current.children:
-            if c == child:  # 遍历查找
-                return current
-            res = self._find_parent(c, child)  # 否则递归查找
-            if res:  # 找到则返回
-                return res
-        return None  # 否则返回 None
+    def _items_reversed(self, start, end):
+        """items(reverse=True) 的实现: 找到 end 所在的叶子 (None 则最右的叶子), 沿 prev 链表按键降序产出"""
+        if end is None:
+            node = self.root
+            while not node.is_leaf:
+                node = self._child(node, len(node.children) - 1)  # 一直向右, 得到最大的叶子节点
+            j = len(node.keys)
+        else:
+            node = self._search_leaf(end)
+            j = bisect_right(node.keys, end)
+        while node:
+            i = 0 if start is None else bisect_left(node.keys, start, 0, j)
+            yield from zip(reversed(node.keys[i:j]), reversed(node.children[i:j]))
+            if i > 0:
+                return  # 超出了 start
+            node = self._prev(node)
+            j = len(node.keys) if node else 0
+
+    def _min_key(self, node):
+        """子树 node 的最小键: 一直向左到叶子 O(树高)"""
+        while not node.is_leaf:
+            node = self._child(node, 0)
+        return node.keys[0]
 
     # -------------------- 其他: Debug 展示 --------------------
     def traverse(self):
@@ -422,8 +755,8 @@ class BPlusTree:
                 levels.append([])
             levels[lvl].append(node.keys)
             if not node.is_leaf:
-                for child in node.children:
-                    stack.push((child, lvl + 1))
+                for i in range(len(node.children)):
+                    stack.push((self._child(node, i), lvl + 1))
 
         # [打印]每层数据
         for i, lv in enumerate(levels):
@@ -437,13 +770,13 @@ class BPlusTree:
         """
         node = self.root
         while not node.is_leaf:
-            node = node.children[0]  # 一直向左查找, 得到最小值
+            node = self._child(node, 0)  # 一直向左查找, 得到最小值
 
         # [打印]所有数据 (按照叶子节点存储结构)
         print("# LeafChain:", end="")
         while node:
             print(f"{node.keys}", end=" -> ")
-            node = node.next
+            node = self._next(node)
         print("None")
 
 
@@ -455,7 +788,7 @@ if __name__ == '__main__':
     elements = [(i, letters[i]) for i in range(len(letters))]
     print(elements)
 
-    tree = BPlusTree()
+    tree = BPlusTree(order=3)  # 阶数取 3, 便于展示分裂
     for k, v in elements:
         tree.insert(k, v)
     tree.traverse()
@@ -472,3 +805,4 @@ if __name__ == '__main__':
     tree.traverse()
 
     print(tree.search_range(5, 11))
+    print(tree.search_range(5, 11, reverse=True))
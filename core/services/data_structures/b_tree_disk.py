@@ -1,5 +1,6 @@
 import struct
 import os
+from bisect import bisect_left
 
 T = 3
 ORDER = T
@@ -126,11 +127,8 @@ class DiskBTree:
                 DiskBTree.write_node(self)
 
         def find_key(self, k):
-            """在节点中找到键 k 的位置"""
-            idx = 0
-            while idx < self.n and self.keys[idx] < k:
-                idx += 1
-            return idx
+            """在节点中二分找到键 k 的位置: 第一个 >= k 的键"""
+            return bisect_left(self.keys, k, 0, self.n)
 
         def remove(self, k):
             """从节点中删除键 k"""
@@ -345,10 +343,8 @@ class DiskBTree:
             return None
 
         def _search(node):
-            i = 0
-            # 在当前节点中寻找第一个大于等于 k 的 key
-            while i < node.n and k > node.keys[i]:
-                i += 1
+            # 在当前节点中二分寻找第一个大于等于 k 的 key
+            i = node.find_key(k)
 
             # 如果找到了等于的 key，直接返回
             if i < node.n and node.keys[i] == k:
@@ -0,0 +1,147 @@
+class LRUCache:
+    """
+    LRU 缓存: 哈希表 + 双向链表
+    哈希表 {key: _Node} 实现 O(1) 定位, 双向链表按最近使用排序, 头部最新, 尾部最旧
+    容量满时淘汰尾部节点, 并记录命中/未命中/淘汰次数
+    """
+
+    # -------------------- nested _Node class --------------------
+    class _Node:
+        """双向链表节点"""
+        __slots__ = '_key', '_value', '_prev', '_next'
+
+        def __init__(self, key, value, prev=None, next=None):
+            self._key = key
+            self._value = value
+            self._prev = prev
+            self._next = next
+
+    # -------------------- 初始化 --------------------
+    def __init__(self, capacity=1024):
+        """
+        初始化空缓存
+        :param capacity: 最多缓存的条目数
+        """
+        if capacity < 1:
+            raise ValueError('capacity must be positive')
+        self._capacity = capacity
+        self._map = {}  # {key: _Node}
+        # 哨兵节点: 头尾不存数据, 避免边界判断
+        self._header = self._Node(None, None)
+        self._trailer = self._Node(None, None)
+        self._header._next = self._trailer
+        self._trailer._prev = self._header
+        # 统计
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._map)
+
+    def __contains__(self, key):
+        return key in self._map
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    # -------------------- nonpublic method: 链表操作 --------------------
+    def _unlink(self, node):
+        """从链表中摘下节点"""
+        node._prev._next = node._next
+        node._next._prev = node._prev
+
+    def _push_front(self, node):
+        """节点放到头部 (最新)"""
+        node._prev = self._header
+        node._next = self._header._next
+        self._header._next._prev = node
+        self._header._next = node
+
+    def _evict(self):
+        """淘汰尾部 (最旧) 节点, 返回 (key, value)"""
+        node = self._trailer._prev
+        self._unlink(node)
+        del self._map[node._key]
+        self.evictions += 1
+        return node._key, node._value
+
+    # -------------------- 公有方法 --------------------
+    def get(self, key, default=None):
+        """查询, 命中则移到头部 O(1)"""
+        node = self._map.get(key)
+        if node is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._unlink(node)
+        self._push_front(node)
+        return node._value
+
+    def put(self, key, value):
+        """
+        插入/更新, 放到头部, 超出容量则淘汰最旧的条目 O(1)
+        :return: 被淘汰的 [(key, value), ...]
+        """
+        node = self._map.get(key)
+        if node is not None:
+            node._value = value
+            self._unlink(node)
+            self._push_front(node)
+            return []
+        node = self._Node(key, value)
+        self._map[key] = node
+        self._push_front(node)
+        evicted = []
+        while len(self._map) > self._capacity:
+            evicted.append(self._evict())
+        return evicted
+
+    def pop(self, key, default=None):
+        """删除条目并返回其值, 不计入统计"""
+        node = self._map.pop(key, None)
+        if node is None:
+            return default
+        self._unlink(node)
+        return node._value
+
+    def clear(self):
+        """清空缓存, 统计保留"""
+        self._map.clear()
+        self._header._next = self._trailer
+        self._trailer._prev = self._header
+
+    def items(self):
+        """从新到旧迭代 (key, value)"""
+        node = self._header._next
+        while node is not self._trailer:
+            yield node._key, node._value
+            node = node._next
+
+    def hit_ratio(self):
+        """命中率"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        """统计信息"""
+        return {
+            'size': len(self),
+            'capacity': self._capacity,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': self.hit_ratio(),
+        }
+
+
+if __name__ == '__main__':
+    cache = LRUCache(capacity=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    print(cache.get('a'))  # 1, a 变为最新
+    print(cache.put('c', 3))  # 淘汰 b
+    print(cache.get('b'))  # None
+    print(list(cache.items()))
+    print(cache.stats())
@@ -0,0 +1,194 @@
+try:
+    from .utils import find_kmp, find_all_from_list, edit_distance, AhoCorasick
+except ImportError:
+    from utils import find_kmp, find_all_from_list, edit_distance, AhoCorasick
+
+
+class NGramIndex:
+    """
+    n-gram 倒排索引, 用于子串查询
+    对每个文本切出所有长度为 n 的子串 (gram), 记录 {gram: {id, ...}}
+    查询时对模式串的 gram 求倒排表交集得到候选, 再用 KMP 逐一确认
+    """
+
+    def __init__(self, n=3):
+        """
+        初始化空索引
+        :param n: gram 的长度, 默认 trigram
+        """
+        if n < 1:
+            raise ValueError('n must be positive')
+        self._n = n
+        self._postings = {}  # 倒排表 {gram: {id, ...}}
+        self._texts = {}  # 原文 {id: text}
+
+    def __len__(self):
+        """被索引的文本数"""
+        return len(self._texts)
+
+    def __contains__(self, key):
+        return key in self._texts
+
+    # -------------------- nonpublic method --------------------
+    def _grams(self, text):
+        """文本的所有 gram (去重)"""
+        n = self._n
+        return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+    # -------------------- 增/删/改 --------------------
+    def add(self, key, text):
+        """加入文本, 若 key 已存在则覆盖"""
+        if key in self._texts:
+            self.remove(key)
+        self._texts[key] = text
+        for gram in self._grams(text):
+            posting = self._postings.get(gram)
+            if posting is None:
+                posting = self._postings[gram] = set()
+            posting.add(key)
+
+    def remove(self, key):
+        """删除文本, 成功返回 True"""
+        text = self._texts.pop(key, None)
+        if text is None:
+            return False
+        for gram in self._grams(text):
+            posting = self._postings[gram]
+            posting.discard(key)
+            if not posting:  # 倒排表为空则删去 gram
+                del self._postings[gram]
+        return True
+
+    def update(self, key, text):
+        """更新文本, 文本未变化则不做任何操作"""
+        if self._texts.get(key) == text:
+            return
+        self.add(key, text)
+
+    # -------------------- 查询 --------------------
+    def candidates(self, pattern):
+        """
+        倒排表交集得到的候选 id 集合 (未经确认, 可能包含假阳性)
+        模式串短于 n 时无法使用索引, 返回 None
+        """
+        if len(pattern) < self._n:
+            return None
+        postings = []
+        for gram in self._grams(pattern):
+            posting = self._postings.get(gram)
+            if posting is None:  # 某个 gram 不存在, 不可能匹配
+                return set()
+            postings.append(posting)
+        postings.sort(key=len)  # 从最短的倒排表开始求交集
+        result = set(postings[0])
+        for posting in postings[1:]:
+            result &= posting
+            if not result:
+                break
+        return result
+
+    def estimate(self, pattern):
+        """
+        匹配数的上界估计 O(gram 数): 模式串各 gram 中最短倒排表的长度
+        模式串短于 n 时无法估计, 返回 None
+        """
+        if len(pattern) < self._n:
+            return None
+        result = len(self._texts)
+        for gram in self._grams(pattern):
+            posting = self._postings.get(gram)
+            if posting is None:
+                return 0
+            result = min(result, len(posting))
+        return result
+
+    def search(self, pattern):
+        """
+        返回所有包含 pattern 的文本 id 列表, 按 id 升序排列
+        (候选来自集合求交, 排序后结果与插入顺序、集合顺序无关)
+        :param pattern: 匹配模式
+        :return: [id, id, ...]
+        """
+        candidates = self.candidates(pattern)
+        if candidates is None:
+            # 模式过短, 退化为全量扫描
+            keys = list(self._texts.keys())
+            match_index = find_all_from_list(pattern=pattern, text_list=list(self._texts.values()))
+            return sorted(keys[idx] for idx in match_index)
+        # 只对候选逐一确认
+        return sorted(key for key in candidates if find_kmp(pattern, self._texts[key]) != -1)
+
+    def search_multi(self, patterns, ignore_case=False):
+        """
+        多模式子串查询, 返回 {pattern: [id, ...]}, id 升序
+        需要全量扫描的模式 (短于 n, 或忽略大小写: 索引区分大小写) 合并为一个 Aho-Corasick 自动机, 只扫描语料一遍;
+        一旦要扫描, 其余模式也并入同一遍扫描 (几乎不增加开销); 否则各候选数上界之和不超过语料规模时逐个走索引
+        :param patterns: 模式列表, 重复的模式只计算一次
+        :param ignore_case: True 则忽略大小写
+        :return: {pattern: [id, id, ...]}
+        """
+        patterns = list(dict.fromkeys(patterns))  # 去重并保持顺序
+        if not patterns:
+            return {}
+        scan = ignore_case or any(len(pattern) < self._n for pattern in patterns)
+        if not scan:
+            scan = sum(self.estimate(pattern) for pattern in patterns) > len(self._texts)
+        if not scan:
+            return {pattern: self.search(pattern) for pattern in patterns}
+
+        automaton = AhoCorasick(patterns, ignore_case=ignore_case)
+        result = [[] for _ in patterns]
+        for key, text in self._texts.items():
+            for idx in automaton.matched(text):
+                result[idx].append(key)
+        return {pattern: sorted(keys) for pattern, keys in zip(patterns, result)}
+
+    def search_fuzzy(self, pattern, k):
+        """
+        返回与 pattern 的编辑距离不超过 k 的所有文本, 按 (距离, id) 升序
+        q-gram 计数过滤: 一次编辑至多破坏 n 个 gram, 所以 pattern 的 G 个不同 gram 中
+        至少有 G - k * n 个出现在匹配的文本里; 对这些 gram 的倒排表计数得到候选, 再用截断的编辑距离确认
+        G - k * n <= 0 (模式太短或 k 太大) 时过滤无效, 退化为按长度筛选后逐个确认
+        :param pattern: 查询串
+        :param k: 最大编辑距离
+        :return: [(distance, id), ...]
+        """
+        if k < 0:
+            raise ValueError('k must be non-negative')
+        grams = self._grams(pattern)
+        threshold = len(grams) - k * self._n
+        if threshold <= 0:
+            candidates = self._texts.keys()
+        else:
+            counts = {}  # {id: 共有的 gram 数}
+            for gram in grams:
+                for key in self._postings.get(gram, ()):
+                    counts[key] = counts.get(key, 0) + 1
+            candidates = [key for key, count in counts.items() if count >= threshold]
+
+        lo, hi = len(pattern) - k, len(pattern) + k  # 长度差超过 k 不可能匹配
+        result = []
+        for key in candidates:
+            text = self._texts[key]
+            if lo <= len(text) <= hi:
+                distance = edit_distance(pattern, text, max_dist=k)
+                if distance <= k:
+                    result.append((distance, key))
+        result.sort()
+        return result
+
+
+if __name__ == '__main__':
+    index = NGramIndex(n=3)
+    names = ["abc421", "a12abc", "39akbc", "3ma3b1abc", "a31bc", "1ac1abc"]
+    for i, name in enumerate(names):
+        index.add(i, name)
+
+    print(index.search("abc"))  # 索引查询
+    print(index.search("bc"))  # 模式过短, 全量扫描
+    print(index.search_multi(["abc", "bc", "AK"], ignore_case=True))  # 多模式, 一遍扫描
+
+    index.update(0, "xyz421")
+    index.remove(1)
+    print(index.search("abc"))
+    print(index.search_fuzzy("xyz431", 1))  # 容错查询, 一次替换
@@ -0,0 +1,399 @@
+import os
+import struct
+
+try:
+    from .lru_cache import LRUCache
+except ImportError:
+    from lru_cache import LRUCache
+
+# 记录文件: 第 0 页为文件头, 其后为定长的分槽页 (slotted page), 页号即磁盘地址
+PAGE_SIZE = 4096
+STORE_MAGIC = b'RECF'
+STORE_VERSION = 1
+# 文件头: 魔数, 版本, 页大小, 页数, 空闲页链表头
+_FILE_HEADER = struct.Struct('<4sHHqq')
+# 页头: 分组键, 链中的下一页, 下一个有空闲槽的页 (链头页中为该链表的表头), 链中的记录数 (只有链头页 > 0),
+#       槽数, 本页的记录数, 空闲槽链表头, 名称区起点
+_PAGE_HEADER = struct.Struct('<qqqqHHHH')
+# 槽 (定长记录): 键, 名称在页中的偏移与长度; 已删除的槽键为 -1, 偏移字段存下一个空闲槽
+_SLOT = struct.Struct('<qHH')
+NO_SLOT = 0xFFFF
+SLOT_BITS = 12  # 记录号 rid = 页号 << SLOT_BITS | 槽号, 一页最多 (4096 - 40) // 12 个槽
+MAX_TEXT = PAGE_SIZE - _PAGE_HEADER.size - _SLOT.size  # 名称编码后的最大字节数 (一页只放一条记录)
+
+
+class RecordStore:
+    """
+    定长记录的分组存储: 每条记录为 (键, 名称), 同一分组键 (如价格) 的记录存放在一条页链中
+    页的布局: 页头 | 槽数组 (定长记录, 向后增长) ... 空闲空间 ... 名称区 (UTF-8, 从页尾向前增长)
+    追加只写链头页, 链头页满时分配新页作为链头; 删除的槽挂到本页的空闲槽链表, 有空闲槽的页串成链表供追加复用,
+    整条链删空时所有页挂到文件的空闲页链表; 读取一条记录只解析一个槽
+    修改的页记录为脏页, commit 时一起写回; 最近读过的页保存在 LRU 缓冲池中
+    """
+
+    def __init__(self, filename, cache_size=256):
+        """
+        :param filename: 记录文件路径, 不存在则新建
+        :param cache_size: 缓冲池容量 (页数), 0 表示不缓存
+        """
+        self.filename = filename
+        self._dirty = {}  # 修改过、尚未写回的页 {页号: bytearray}
+        self.cache = LRUCache(cache_size) if cache_size else None  # 缓冲池 {页号: bytearray}
+        if os.path.exists(filename) and os.path.getsize(filename):
+            self._file = open(filename, 'r+b')
+            try:
+                magic, version, page_size, self.pages, self.free = _FILE_HEADER.unpack(
+                    self._file.read(_FILE_HEADER.size))
+            except struct.error:
+                magic = version = page_size = None
+            if (magic, version, page_size) != (STORE_MAGIC, STORE_VERSION, PAGE_SIZE):
+                self._file.close()
+                raise ValueError(f'{filename} is not a record store file')
+        else:
+            self._file = open(filename, 'w+b')
+            self.pages = 1  # 页数 (含文件头)
+            self.free = -1  # 空闲页链表头
+            self._write_header()
+
+    # -------------------- nonpublic method: 页 --------------------
+    def _page(self, pid):
+        """读取一页, 脏页优先, 其次缓冲池; 返回的 bytearray 与缓冲池共享, 修改后必须 _touch"""
+        page = self._dirty.get(pid)
+        if page is not None:
+            return page
+        if self.cache is not None:
+            page = self.cache.get(pid)
+            if page is not None:
+                return page
+        self._file.seek(pid * PAGE_SIZE)
+        page = bytearray(self._file.read(PAGE_SIZE))
+        if self.cache is not None:
+            self.cache.put(pid, page)
+        return page
+
+    def _touch(self, pid, page):
+        self._dirty[pid] = page
+
+    def _allocate(self, group):
+        """分配一页作为 group 链的新页, 优先复用空闲页"""
+        if self.free != -1:
+            pid = self.free
+            self.free = _PAGE_HEADER.unpack_from(self._page(pid))[1]
+            if self.cache is not None:
+                self.cache.pop(pid)  # 新页是新的 bytearray, 缓冲池中的旧内容失效
+        else:
+            pid = self.pages
+            self.pages += 1
+        page = bytearray(PAGE_SIZE)
+        _PAGE_HEADER.pack_into(page, 0, group, -1, -1, 0, 0, 0, NO_SLOT, PAGE_SIZE)
+        self._touch(pid, page)
+        return pid, page
+
+    def _release(self, pid):
+        """释放一页, 通过 next 字段挂到空闲页链表头"""
+        page = self._page(pid)
+        _PAGE_HEADER.pack_into(page, 0, 0, self.free, -1, 0, 0, 0, NO_SLOT, PAGE_SIZE)
+        self._touch(pid, page)
+        self.free = pid
+
+    def _write_header(self):
+        data = bytearray(PAGE_SIZE)
+        _FILE_HEADER.pack_into(data, 0, STORE_MAGIC, STORE_VERSION, PAGE_SIZE, self.pages, self.free)
+        self._file.seek(0)
+        self._file.write(data)
+
+    @staticmethod
+    def _set_count(page, delta):
+        """链头页的记录数加 delta, 返回新值"""
+        header = list(_PAGE_HEADER.unpack_from(page))
+        header[3] += delta
+        _PAGE_HEADER.pack_into(page, 0, *header)
+        return header[3]
+
+    @staticmethod
+    def _free_space(page):
+        """页中可用的总空间 (含已删除名称占用的碎片)"""
+        nslots = _PAGE_HEADER.unpack_from(page)[4]
+        used = _PAGE_HEADER.size + nslots * _SLOT.size
+        for i in range(nslots):
+            key, offset, length = _SLOT.unpack_from(page, _PAGE_HEADER.size + i * _SLOT.size)
+            if key != -1:
+                used += length
+        return PAGE_SIZE - used
+
+    @staticmethod
+    def _compact(page):
+        """整理名称区: 有效名称重新紧凑地排在页尾, 返回新的名称区起点"""
+        header = list(_PAGE_HEADER.unpack_from(page))
+        names = []
+        for i in range(header[4]):
+            offset = _PAGE_HEADER.size + i * _SLOT.size
+            key, start, length = _SLOT.unpack_from(page, offset)
+            if key != -1:
+                names.append((offset, key, bytes(page[start:start + length])))
+        name_start = PAGE_SIZE
+        for offset, key, data in names:
+            name_start -= len(data)
+            page[name_start:name_start + len(data)] = data
+            _SLOT.pack_into(page, offset, key, name_start, len(data))
+        header[7] = name_start
+        _PAGE_HEADER.pack_into(page, 0, *header)
+        return name_start
+
+    def _insert(self, page, key, data):
+        """在页中放入一条记录, 优先复用空闲槽; 空间不足返回 None, 否则返回槽号"""
+        group, nxt, next_free, count, nslots, live, free_slot, name_start = _PAGE_HEADER.unpack_from(page)
+        need = len(data) + (_SLOT.size if free_slot == NO_SLOT else 0)
+        if name_start - (_PAGE_HEADER.size + nslots * _SLOT.size) < need:
+            if self._free_space(page) < need:
+                return None
+            name_start = self._compact(page)
+        if free_slot != NO_SLOT:
+            slot = free_slot
+            free_slot = _SLOT.unpack_from(page, _PAGE_HEADER.size + slot * _SLOT.size)[1]
+        else:
+            slot = nslots
+            nslots += 1
+        name_start -= len(data)
+        page[name_start:name_start + len(data)] = data
+        _SLOT.pack_into(page, _PAGE_HEADER.size + slot * _SLOT.size, key, name_start, len(data))
+        _PAGE_HEADER.pack_into(page, 0, group, nxt, next_free, count, nslots, live + 1, free_slot, name_start)
+        return slot
+
+    @staticmethod
+    def _records(page):
+        """页中的有效记录 (键, 名称), 按槽号顺序"""
+        for i in range(_PAGE_HEADER.unpack_from(page)[4]):
+            key, start, length = _SLOT.unpack_from(page, _PAGE_HEADER.size + i * _SLOT.size)
+            if key != -1:
+                yield key, page[start:start + length].decode()
+
+    # -------------------- 增/删/改/查 --------------------
+    def append(self, head, group, key, text):
+        """
+        在 group 的页链中追加一条记录: 先放入链头页, 其次有空闲槽的页, 都放不下则分配新页作为链头
+        :param head: 链头页号, None 表示 group 还没有记录 (新建页链)
+        :param group: 分组键 (整数)
+        :param key: 记录的键 (非负整数)
+        :param text: 名称
+        :return: (rid, 链头页号), 链头可能改变, 调用方需保存新的链头
+        """
+        data = text.encode()
+        if len(data) > MAX_TEXT:
+            raise ValueError(f'text longer than {MAX_TEXT} bytes')
+        if head is not None:
+            page = self._page(head)
+            slot = self._insert(page, key, data)
+            if slot is not None:  # 常见情况: 只写链头一页
+                self._set_count(page, 1)
+                self._touch(head, page)
+                return head << SLOT_BITS | slot, head
+
+            next_free = _PAGE_HEADER.unpack_from(page)[2]
+            if next_free != -1:  # 复用有空闲槽的页
+                other = self._page(next_free)
+                slot = self._insert(other, key, data)
+                if slot is not None:
+                    header = list(_PAGE_HEADER.unpack_from(other))
+                    if header[6] == NO_SLOT:  # 该页的空闲槽已用完, 移出链表
+                        header[2], next_free_after = -1, header[2]
+                        _PAGE_HEADER.pack_into(other, 0, *header)
+                        head_header = list(_PAGE_HEADER.unpack_from(page))
+                        head_header[2] = next_free_after
+                        _PAGE_HEADER.pack_into(page, 0, *head_header)
+                    self._set_count(page, 1)
+                    self._touch(next_free, other)
+                    self._touch(head, page)
+                    return next_free << SLOT_BITS | slot, head
+
+        # 分配新页作为链头, 记录数与空闲页链表从旧链头移过来
+        pid, new_page = self._allocate(group)
+        if head is not None:
+            old = list(_PAGE_HEADER.unpack_from(page))
+            next_free, count = old[2], old[3]
+            if old[6] != NO_SLOT:  # 旧链头仍有空闲槽 (名称放不下), 同样可供之后复用
+                old[2], next_free = next_free, head
+            else:
+                old[2] = -1
+            old[3] = 0
+            _PAGE_HEADER.pack_into(page, 0, *old)
+            self._touch(head, page)
+            _PAGE_HEADER.pack_into(new_page, 0, group, head, next_free, count, 0, 0, NO_SLOT, PAGE_SIZE)
+        slot = self._insert(new_page, key, data)
+        self._set_count(new_page, 1)
+        return pid << SLOT_BITS | slot, pid
+
+    def read(self, rid):
+        """读取一条记录, 返回 (分组键, 键, 名称); 不存在返回 None"""
+        pid, slot = rid >> SLOT_BITS, rid & ((1 << SLOT_BITS) - 1)
+        if not 0 < pid < self.pages:
+            return None
+        page = self._page(pid)
+        header = _PAGE_HEADER.unpack_from(page)
+        if slot >= header[4]:
+            return None
+        key, start, length = _SLOT.unpack_from(page, _PAGE_HEADER.size + slot * _SLOT.size)
+        if key == -1:
+            return None
+        return header[0], key, page[start:start + length].decode()
+
+    def write(self, rid, text):
+        """
+        原地修改一条记录的名称; 本页放不下新名称时返回 False (调用方可删除后重新追加), 成功返回 True
+        """
+        data = text.encode()
+        if len(data) > MAX_TEXT:
+            raise ValueError(f'text longer than {MAX_TEXT} bytes')
+        pid, slot = rid >> SLOT_BITS, rid & ((1 << SLOT_BITS) - 1)
+        page = self._page(pid)
+        offset = _PAGE_HEADER.size + slot * _SLOT.size
+        key, start, length = _SLOT.unpack_from(page, offset)
+        if key == -1:
+            raise KeyError(rid)
+        if len(data) <= length:  # 原位置放得下
+            page[start:start + len(data)] = data
+            _SLOT.pack_into(page, offset, key, start, len(data))
+            self._touch(pid, page)
+            return True
+
+        header = list(_PAGE_HEADER.unpack_from(page))
+        _SLOT.pack_into(page, offset, key, 0, 0)  # 旧名称视为空闲
+        if header[7] - (_PAGE_HEADER.size + header[4] * _SLOT.size) < len(data):
+            if self._free_space(page) < len(data):
+                _SLOT.pack_into(page, offset, key, start, length)
+                return False
+            header[7] = self._compact(page)
+        header[7] -= len(data)
+        page[header[7]:header[7] + len(data)] = data
+        _SLOT.pack_into(page, offset, key, header[7], len(data))
+        _PAGE_HEADER.pack_into(page, 0, *header)
+        self._touch(pid, page)
+        return True
+
+    def delete(self, head, rid):
+        """
+        删除一条记录, 槽挂到本页的空闲槽链表; 非链头页第一次出现空闲槽时挂到链头的空闲页链表
+        :param head: 记录所在页链的链头页号
+        :return: 整条链是否已删空 (删空时所有页已释放, 调用方需删除链头)
+        """
+        pid, slot = rid >> SLOT_BITS, rid & ((1 << SLOT_BITS) - 1)
+        page = self._page(pid)
+        offset = _PAGE_HEADER.size + slot * _SLOT.size
+        if _SLOT.unpack_from(page, offset)[0] == -1:
+            raise KeyError(rid)
+        header = list(_PAGE_HEADER.unpack_from(page))
+        _SLOT.pack_into(page, offset, -1, header[6], 0)
+        had_free = header[6] != NO_SLOT
+        header[5] -= 1
+        header[6] = slot
+        _PAGE_HEADER.pack_into(page, 0, *header)
+        self._touch(pid, page)
+
+        head_page = self._page(head)
+        if pid != head and not had_free:
+            header[2] = _PAGE_HEADER.unpack_from(head_page)[2]
+            _PAGE_HEADER.pack_into(page, 0, *header)
+            head_header = list(_PAGE_HEADER.unpack_from(head_page))
+            head_header[2] = pid
+            _PAGE_HEADER.pack_into(head_page, 0, *head_header)
+        self._touch(head, head_page)
+        if self._set_count(head_page, -1):
+            return False
+
+        pid = head  # 整条链删空, 释放所有页
+        while pid != -1:
+            nxt = _PAGE_HEADER.unpack_from(self._page(pid))[1]
+            self._release(pid)
+            pid = nxt
+        return True
+
+    def chain(self, head):
+        """页链中的所有记录 (分组键, 键, 名称), 按页的分配顺序 (旧页在前) 和槽号顺序"""
+        pids = []
+        while head != -1:
+            pids.append(head)
+            head = _PAGE_HEADER.unpack_from(self._page(head))[1]
+        for pid in reversed(pids):
+            page = self._page(pid)
+            group = _PAGE_HEADER.unpack_from(page)[0]
+            for key, text in self._records(page):
+                yield group, key, text
+
+    def scan(self, head, after=0, reverse=False):
+        """
+        按记录号升序惰性产出页链中记录号大于 after 的记录 (rid, 分组键, 键, 名称), 用于游标分页:
+        只读取链中各页的页头定位起点, 之后逐页解析
+        :param after: 上一次返回的最后一个记录号, 0 表示从头开始
+        :param reverse: True 则按记录号降序产出小于 after 的记录, after 为 0 表示从最大的记录号开始
+        """
+        after_pid, after_slot = after >> SLOT_BITS, after & ((1 << SLOT_BITS) - 1)
+        if reverse and not after:
+            after_pid = None
+        pids = []
+        while head != -1:
+            if after_pid is None or (head <= after_pid if reverse else head >= after_pid):
+                pids.append(head)
+            head = _PAGE_HEADER.unpack_from(self._page(head))[1]
+        for pid in sorted(pids, reverse=reverse):
+            page = self._page(pid)
+            header = _PAGE_HEADER.unpack_from(page)
+            if reverse:
+                slots = range((after_slot if pid == after_pid else header[4]) - 1, -1, -1)
+            else:
+                slots = range(after_slot + 1 if pid == after_pid else 0, header[4])
+            for slot in slots:
+                key, start, length = _SLOT.unpack_from(page, _PAGE_HEADER.size + slot * _SLOT.size)
+                if key != -1:
+                    yield pid << SLOT_BITS | slot, header[0], key, page[start:start + length].decode()
+
+    def __iter__(self):
+        """按页号顺序迭代所有记录 (分组键, 键, 名称)"""
+        for pid in range(1, self.pages):
+            page = self._page(pid)
+            group = _PAGE_HEADER.unpack_from(page)[0]
+            for key, text in self._records(page):
+                yield group, key, text
+
+    def heads(self):
+        """扫描所有页, 返回每条页链的 (分组键, 链头页号), 用于重建分组索引"""
+        result = []
+        for pid in range(1, self.pages):
+            header = _PAGE_HEADER.unpack_from(self._page(pid))
+            if header[3] > 0:
+                result.append((header[0], pid))
+        return result
+
+    @staticmethod
+    def live(page):
+        """页中的记录数"""
+        return _PAGE_HEADER.unpack_from(page)[5]
+
+    # -------------------- 提交/关闭 --------------------
+    def commit(self):
+        """把所有脏页和文件头写回"""
+        if not self._dirty:
+            return
+        for pid in sorted(self._dirty):
+            self._file.seek(pid * PAGE_SIZE)
+            self._file.write(self._dirty[pid])
+        self._dirty.clear()
+        self._write_header()
+        self._file.flush()
+
+    def close(self):
+        self.commit()
+        self._file.close()
+
+
+if __name__ == '__main__':
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = RecordStore(os.path.join(tmp_dir, 'records'))
+        rid1, head = store.append(None, 699, 1, 'Item1')
+        rid2, head = store.append(head, 699, 2, 'Item2')
+        print(store.read(rid2))  # (699, 2, 'Item2')
+        store.write(rid1, 'Renamed item')
+        print(list(store.chain(head)))  # [(699, 1, 'Renamed item'), (699, 2, 'Item2')]
+        print(store.delete(head, rid1), store.delete(head, rid2))  # False True, 整条链删空
+        store.close()
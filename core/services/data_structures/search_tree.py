@@ -94,6 +94,31 @@ class TreeMap(LinkedBinaryTree, MapBase):
             self._rebalance_access(p)  # 平衡树结构的钩子方法，实现方法见后
             return p
 
+    def insert_position(self, k, v):
+        """
+        插入 (k, v) 并返回节点, 只下降一次; 若键 k 已存在则不修改, 直接返回已有节点
+        :return: (Position, 是否为新插入的节点)
+        """
+        if self.is_empty():
+            leaf = self._add_root(self._Item(k, v))
+        else:
+            p = self._subtree_search(self.root(), k)
+            if p.key() == k:
+                self._rebalance_access(p)
+                return p, False
+            item = self._Item(k, v)
+            if p.key() < k:
+                leaf = self._add_right(p, item)
+            else:
+                leaf = self._add_left(p, item)
+        self._rebalance_insert(leaf)  # 旋转只重新链接节点, leaf 仍指向新节点
+        return leaf, True
+
+    def set_value(self, p, v):
+        """替换节点 p 的值, 不改变树结构 O(1)"""
+        self._validate(p)
+        p.element()._value = v
+
     # --------------- 有序映射方法 ---------------
     def find_min(self):
         """最小 k"""
@@ -249,13 +274,15 @@ class AVLTreeMap(TreeMap):
 
     # --------------- 覆写内嵌的 _Node 节点类 ---------------
     class _Node(TreeMap._Node):
-        """补充节点方法：计算高度"""
-        __slots__ = '_height'  # 存储高度
+        """补充节点方法：计算高度，以及顺序统计所需的子树权重"""
+        __slots__ = '_height', '_weight', '_total'  # 存储高度、本节点权重、子树权重和
 
         def __init__(self, element, parent=None, left=None, right=None):
-            """初始化，并增加 _height 存储高度"""
+            """初始化，并增加 _height 存储高度，_weight/_total 存储权重 (默认每个键权重为 1，即子树大小)"""
             super().__init__(element, parent, left, right)
             self._height = 0
+            self._weight = 1
+            self._total = 1
 
         def left_height(self):
             """左子树高度"""
@@ -269,6 +296,18 @@ class AVLTreeMap(TreeMap):
                 return 0
             return self._right._height
 
+        def left_total(self):
+            """左子树权重和"""
+            if self._left is None:
+                return 0
+            return self._left._total
+
+        def right_total(self):
+            """右子树权重和"""
+            if self._right is None:
+                return 0
+            return self._right._total
+
     # --------------- 平衡的基础操作 ---------------
     def _recompute_height(self, p):
         """计算当前节点的高度 h = 1 + max(h_left, h_right)"""
@@ -309,13 +348,120 @@ class AVLTreeMap(TreeMap):
             else:
                 p = self.parent(p)  # 从 p 节点向上检查平衡性
 
+    # --------------- 顺序统计: 维护子树权重 ---------------
+    def _recompute_total(self, node):
+        """计算子树权重和 total = left + weight + right"""
+        node._total = node.left_total() + node._weight + node.right_total()
+
+    def _recompute_path(self, node):
+        """从 node 向上到根，逐个重新计算子树权重和 O(log n)"""
+        while node is not None:
+            self._recompute_total(node)
+            node = node._parent
+
+    def _rotate(self, p):
+        """旋转后只有 x 和 y 的子树发生变化，先算下方的 y 再算上方的 x"""
+        x = p._node
+        y = x._parent
+        super()._rotate(p)
+        self._recompute_total(y)
+        self._recompute_total(x)
+
+    def delete(self, p):
+        """删除节点 p，度为 2 时前驱节点的元素连同权重一起替换上来"""
+        node = self._validate(p)
+        if node._left is not None and node._right is not None:
+            node._weight = self._subtree_last_position(self.left(p))._node._weight
+        super().delete(p)
+
     # --------------- 平衡操作的钩子函数 ---------------
     def _rebalance_insert(self, p):
+        self._recompute_path(p._node._parent)  # 新叶子的祖先权重增加
         self._rebalance(p)
 
     def _rebalance_delete(self, p):
+        if p is not None:
+            self._recompute_path(p._node)  # 被删节点的祖先权重减少
         self._rebalance(p)
 
+    # --------------- 顺序统计: 公有方法 ---------------
+    def set_weight(self, p, weight):
+        """设置节点 p 的权重 (例如桶内元素个数)，并更新祖先的权重和 O(log n)"""
+        node = self._validate(p)
+        node._weight = weight
+        self._recompute_path(node)
+
+    def total(self):
+        """全部键的权重和，权重均为 1 时即 len(self)"""
+        return 0 if self._root is None else self._root._total
+
+    def select_position(self, i):
+        """
+        按中序找到第 i 个 (从 0 开始) 权重单位所在的节点 O(log n)
+        :param i: 0 <= i < total()
+        :return: (Position, 该节点内的偏移量)
+        """
+        if not 0 <= i < self.total():
+            raise IndexError('select index out of range')
+        node = self._root
+        while True:
+            left = node.left_total()
+            if i < left:
+                node = node._left
+            elif i < left + node._weight:
+                return self._make_position(node), i - left
+            else:
+                i -= left + node._weight
+                node = node._right
+
+    def select(self, i):
+        """第 i 小的键值对 (key, value)，权重均为 1 时即第 i 个键 O(log n)"""
+        p, _ = self.select_position(i)
+        return p.key(), p.value()
+
+    def rank(self, k):
+        """所有小于 k 的键的权重和，权重均为 1 时即小于 k 的键的个数 O(log n)"""
+        result = 0
+        node = self._root
+        while node is not None:
+            if node._element._key < k:
+                result += node.left_total() + node._weight
+                node = node._right
+            else:
+                node = node._left
+        return result
+
+    # --------------- 自底向上批量建树 ---------------
+    def _build_balanced(self, items, lo, hi, parent, weight):
+        """由有序的 items[lo:hi] 递归建立完全平衡的子树, 高度和权重直接设置, 无需旋转"""
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2  # 中位数作为子树根节点
+        k, v = items[mid]
+        node = self._Node(self._Item(k, v), parent)
+        node._left = self._build_balanced(items, lo, mid, node, weight)
+        node._right = self._build_balanced(items, mid + 1, hi, node, weight)
+        node._height = 1 + max(node.left_height(), node.right_height())
+        if weight is not None:
+            node._weight = weight(v)
+        self._recompute_total(node)
+        return node
+
+    def bulk_load(self, items, weight=None):
+        """
+        由按键严格递增的键值对 O(n) 建立完全平衡的 AVL 树, 要求当前树为空
+        :param items: 有序列表 [(k, v), (k, v), ...]
+        :param weight: 可选, 由值计算节点权重的函数, 例如 len; 默认每个键权重为 1
+        :return: None
+        """
+        if not self.is_empty():
+            raise ValueError('bulk_load requires an empty tree')
+        for i in range(1, len(items)):
+            if not items[i - 1][0] < items[i][0]:
+                raise ValueError('keys must be strictly increasing')
+        self._root = self._build_balanced(items, 0, len(items), None, weight)
+        self._size = len(items)
+
     # --------------- 按顺序返回一个类字典字符串 ---------------
     def __str__(self):
         result = {}
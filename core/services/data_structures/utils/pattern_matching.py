@@ -138,7 +138,6 @@ def find_all_from_list(pattern: str, text_list: list, sep="*"):
     m = len(pattern)
     if m == 0:
         return [i for i in range(len(text_list))]
-    texts = ""
     start = 0
     range_idx_list = [(0, 0)] * len(text_list)
     res = set()
@@ -146,7 +145,7 @@ def find_all_from_list(pattern: str, text_list: list, sep="*"):
         tmp_len = len(text)
         range_idx_list[i] = (start, start + tmp_len - 1)
         start += tmp_len + 1
-        texts = texts + (text + sep)
+    texts = sep.join(text_list) + sep  # 一次性拼接, 避免逐个 += 的平方复杂度
     match = find_all_kmp(pattern, texts)
 
     i = 0
@@ -161,6 +160,148 @@ def find_all_from_list(pattern: str, text_list: list, sep="*"):
     return list(res)
 
 
+class AhoCorasick:
+    """
+    Aho-Corasick 多模式匹配自动机
+    由所有模式建立字典树 (trie), 再按层 (BFS) 计算失败指针: 失败指针指向当前状态所代表字符串的最长真后缀状态;
+    匹配时一遍扫描文本, 失配沿失败指针回退, 每个状态的输出为以该状态结尾的所有模式
+    建立 O(模式总长), 匹配 O(文本长 + 匹配数), 与模式个数无关
+    """
+
+    def __init__(self, patterns, ignore_case=False):
+        """
+        由模式列表建立自动机
+        :param patterns: 模式列表 [pattern, ...], 匹配结果以其下标表示
+        :param ignore_case: True 则忽略大小写 (模式与文本都转为小写)
+        """
+        self._ignore_case = ignore_case
+        self._patterns = list(patterns)
+        self._goto = [{}]  # 状态转移 [{字符: 下一个状态}, ...], 状态 0 为根
+        self._fail = [0]  # 失败指针
+        self._out = [[]]  # 输出 [[模式下标, ...], ...]
+        self._empty = []  # 空模式的下标, 匹配任何文本
+        for idx, pattern in enumerate(self._patterns):
+            if ignore_case:
+                pattern = pattern.lower()
+            if not pattern:
+                self._empty.append(idx)
+                continue
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(idx)
+        self._build_fail()
+
+    def __len__(self):
+        """模式数"""
+        return len(self._patterns)
+
+    def _build_fail(self):
+        """按层计算失败指针, 并把失败指针所指状态的输出并入当前状态"""
+        queue = list(self._goto[0].values())  # 第一层的失败指针均为根
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                f = self._goto[f].get(ch, 0)
+                self._fail[nxt] = f
+                if self._out[f]:
+                    self._out[nxt] = self._out[nxt] + self._out[f]
+
+    def iter(self, text):
+        """
+        扫描文本, 依次产出所有匹配 (起始位置, 模式下标), 空模式不产出
+        :param text: 被查找的文本
+        """
+        if self._ignore_case:
+            text = text.lower()
+        goto, fail, out, patterns = self._goto, self._fail, self._out, self._patterns
+        state = 0
+        for j, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for idx in out[state]:
+                yield j - len(patterns[idx]) + 1, idx
+
+    def matched(self, text):
+        """
+        文本中出现过的所有模式下标 (含空模式)
+        :param text: 被查找的文本
+        :return: {模式下标, ...}
+        """
+        if self._ignore_case:
+            text = text.lower()
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set(self._empty)
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+def edit_distance(a: str, b: str, max_dist=None):
+    """
+    Levenshtein 编辑距离 (插入、删除、替换各计 1), 逐行动态规划 O(|a| * |b|)
+    给定截断值 k 时只计算对角线两侧宽 k 的带状区域 O(k * |a|) (带外的格子距离必然大于 k),
+    且某一行的最小值已超过 k 时提前结束
+    :param a: 字符串
+    :param b: 字符串
+    :param max_dist: 可选的截断值 k
+    :return: 编辑距离; 给定 max_dist 且距离超过它时返回 max_dist + 1
+    """
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a  # 保证 b 较短, 行更短
+    m = len(b)
+
+    if max_dist is None:
+        prev = list(range(m + 1))  # 空前缀到 b[:j] 的距离
+        for i, ca in enumerate(a, 1):
+            cur = [i] + [0] * m
+            for j in range(1, m + 1):
+                cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != b[j - 1]))
+            prev = cur
+        return prev[m]
+
+    if len(a) - m > max_dist:
+        return max_dist + 1
+    inf = max_dist + 1  # 超过截断值的距离统一记为 max_dist + 1
+    prev = [j if j <= max_dist else inf for j in range(m + 1)]
+    for i, ca in enumerate(a, 1):
+        lo, hi = max(1, i - max_dist), min(m, i + max_dist)
+        cur = [inf] * (m + 1)
+        if i <= max_dist:
+            cur[0] = i
+        row_min = cur[lo - 1]
+        for j in range(lo, hi + 1):
+            d = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != b[j - 1]))
+            cur[j] = d if d < inf else inf
+            if d < row_min:
+                row_min = d
+        if row_min > max_dist:
+            return inf  # 距离只会更大
+        prev = cur
+    return prev[m]
+
+
 if __name__ == '__main__':
     text = "This is a sentence, the target is to find the pattern which is matching"
     pattern = "th"
@@ -180,3 +321,12 @@ if __name__ == '__main__':
     print(all_match_index)
     for match_index in all_match_index:
         print(text_list[match_index])
+
+    print("=" * 100)
+    print(edit_distance("kitten", "sitting"))  # 3
+    print(edit_distance("kitten", "sitting", max_dist=1))  # 2, 超过截断值
+
+    print("=" * 100)
+    automaton = AhoCorasick(["he", "she", "his", "hers"])
+    print(list(automaton.iter("ushers")))  # [(1, 1), (2, 0), (2, 3)]
+    print(AhoCorasick(["ABC", "k"], ignore_case=True).matched("3ma3b1abc"))  # {0}
@@ -1,14 +1,34 @@
+import gc
 import os
+import sys
+import mmap
+import time
+import struct
 import string
 import random
+import tempfile
+import tracemalloc
+from array import array
 from django.conf import settings
 
 try:
-    from .data_structures import AVLTreeMap, ProbeHashMap
-    from .data_structures.utils import find_all_from_list
+    from .data_structures import AVLTreeMap, ProbeHashMap, NGramIndex, LRUCache, HeapPriorityQueue
+    from .data_structures.utils import find_kmp, edit_distance
 except ImportError:
-    from data_structures import AVLTreeMap, ProbeHashMap
-    from data_structures.utils import find_all_from_list
+    from data_structures import AVLTreeMap, ProbeHashMap, NGramIndex, LRUCache, HeapPriorityQueue
+    from data_structures.utils import find_kmp, edit_distance
+
+
+# -------------------- 二进制快照格式 --------------------
+# 头部: 魔数, 格式版本, 商品数 n, 对应数据表的大小与修改时间 (判断快照是否过期), 最大主键
+# 之后按 key 顺序依次存放: uid 列, price 列, popularity 列 (各 n 个 int64, 小端),
+# 最后是以换行分隔的商品名字符串表 (utf-8)
+SNAPSHOT_MAGIC = b'PSNP'
+SNAPSHOT_VERSION = 1
+_SNAPSHOT_HEADER = struct.Struct('<4sIQQqQ')
+
+# top k 跳过同价格组时, 先沿中序走的最多步数, 超过则用 rank + select 直接跳到下一个价格
+TOP_K_GROUP_WALK = 8
 
 
 class Product:
@@ -17,52 +37,50 @@ class Product:
     # -------------------- nested ProductKey --------------------
     class ProductKey:
         """商品比较的键, 实现全序属性"""
+        __slots__ = '_key'  # 不使用 __dict__, 节省内存
 
-        def __init__(self, sort_key: list):
-            self._key = sort_key
+        def __init__(self, sort_key):
+            self._key = tuple(sort_key)  # 不可变元组
 
         def key(self):
-            """用于排序的 key"""
+            """用于排序的 key (元组)"""
             return self._key
 
         def __hash__(self):
-            """对转换为元组"""
-            return hash(tuple(self.key()))
+            """元组可直接哈希"""
+            return hash(self._key)
 
         # --------------- 设置比较逻辑: 从而实现全序属性 ---------------
         def __eq__(self, other):
-            """是否相等"""
+            """是否相等, 只比较公共前缀: 只含价格的键与同价格的任意键相等, 用于价格区间查询"""
             if not isinstance(other, self.__class__):  # 类型要一致
                 raise TypeError(f"Cannot compare {self.__class__.__name__} with {other.__class__.__name__}")
-            my_key, other_key = self.key(), other.key()
-            for me, you in zip(my_key, other_key):
-                if me != you:
-                    return False
-                # 或者
-                # if abs(me - you) < 1e-12:
-                #     return False
-            return True
+            my_key, other_key = self._key, other._key
+            if len(my_key) == len(other_key):
+                return my_key == other_key  # 常见情况, 元组比较在 C 层完成
+            n = min(len(my_key), len(other_key))
+            return my_key[:n] == other_key[:n]
 
         def __lt__(self, other):
-            """比较大小 self < other"""
+            """比较大小 self < other, 同样只比较公共前缀"""
             if not isinstance(other, self.__class__):  # 类型要一致
                 raise TypeError(f"Cannot compare {self.__class__.__name__} with {other.__class__.__name__}")
-            my_key, other_key = self.key(), other.key()
-            for me, you in zip(my_key, other_key):
-                if me < you:
-                    return True
-                if me > you:
-                    return False
-            return False
+            my_key, other_key = self._key, other._key
+            if len(my_key) == len(other_key):
+                return my_key < other_key
+            n = min(len(my_key), len(other_key))
+            return my_key[:n] < other_key[:n]
 
     # -------------------- 商品 Product 类 --------------------
-    def __init__(self, uid: int, name: str, sort_key: list, bucket: None):
+    __slots__ = '_uid', '_name', '_key', '_bucket'  # 不使用 __dict__, 节省内存
+
+    def __init__(self, uid: int, name: str, sort_key: list, bucket=None):
         """
         初始化商品对象, 代表了唯一的一个商品
         :param uid: 唯一主键
         :param name: 商品名称
         :param sort_key: 用于排序比较的键 [price] or [price, popularity]
-        :param bucket: 存储桶的地址
+        :param bucket: 存储桶的地址, 单独占用一个 key 时内联存储于 AVL 节点, 为 None
         """
         self._uid = uid  # 唯一主键
         self._name = name  # 商品名称
@@ -85,10 +103,14 @@ class Product:
     def bucket(self):
         return self._bucket
 
-    def set_bucket(self, bucket: ProbeHashMap):
-        """设置存储桶"""
+    def set_bucket(self, bucket):
+        """设置存储桶, None 表示内联存储"""
         self._bucket = bucket
 
+    def set_key(self, sort_key):
+        """设置新键, 只能在商品已从 AVL 树中摘下时调用"""
+        self._key = self.ProductKey(sort_key)
+
     def update_name(self, name):
         """设置新名"""
         self._name = name
@@ -113,51 +135,325 @@ class Product:
 class ProductService:
     """商品服务类"""
 
-    def __init__(self):
-        self.avl = AVLTreeMap()  # 存储 {ProductKey: {uid: Product, ...}, ...}
+    def __init__(self, file_path=None, bulk_load=True, log_threshold=10000, fsync=False, cache_size=256,
+                 popularity_index=False):
+        """
+        初始化, 读取数据表, 再重放追加日志
+        :param file_path: 数据表路径, 默认为 DATA_DIR/04products.csv
+        :param bulk_load: True 则排序后自底向上批量建树 O(n), False 则逐行插入 O(n log n)
+        :param log_threshold: 日志记录数达到该值时自动压缩 (重写数据表并清空日志)
+        :param fsync: False 时每条日志只 flush 到操作系统, 进程崩溃不丢数据, 但断电可能丢失最近的记录;
+                      True 时每条日志都 fsync 落盘, 断电也不丢, 代价是每次修改一次磁盘同步
+        :param cache_size: 查询结果 LRU 缓存的最大条目数
+        :param popularity_index: 是否维护人气二级索引, 用于加速 top_k_popular
+        """
+        self.avl = AVLTreeMap()  # 存储 {ProductKey: {uid: Product, ...} 或单个 Product, ...}
         self.uid_map = ProbeHashMap()  # {uid: Product 类}
-        self.product_data_file = os.path.join(settings.DATA_DIR, '04products.csv')
+        self.name_index = NGramIndex(n=3)  # 商品名 trigram 倒排索引 {gram: {uid, ...}}
+        # 人气二级索引 {-popularity: {uid: Product, ...}, ...}, 按人气降序; None 表示不维护
+        self.popularity_index = AVLTreeMap() if popularity_index else None
+        if file_path is None:
+            file_path = os.path.join(settings.DATA_DIR, '04products.csv')
+        self.product_data_file = file_path
+        self.product_log_file = os.path.splitext(file_path)[0] + '.log'  # 追加日志 04products.log
+        self.product_snapshot_file = os.path.splitext(file_path)[0] + '.snap'  # 二进制快照 04products.snap
+        self._log = None  # 日志文件句柄, 首次写入时打开
+        self._log_records = 0  # 日志中的记录数
+        self._log_threshold = log_threshold
+        self._fsync = fsync
         self._max_uid = 0
         self._n = 0
-        self._load_data()  # 读取数据
+        self._version = 0  # 修改版本号, 每次增/删/改名递增, 使旧的缓存结果失效
+        self.cache = LRUCache(capacity=cache_size)  # 查询结果缓存 {(查询类型, 参数, 版本号): 结果}
+        self._load_data(bulk_load)  # 读取数据
+        self._replay_log()  # 在数据表基础上重放日志
 
     def __len__(self):
         return self._n
 
     # -------------------- nonpublic method --------------------
-    def _load_data(self):
+    def _load_data(self, bulk_load=True):
+        """读取数据 (优先使用未过期的二进制快照, 否则解析数据表), 批量建树或逐行插入"""
+        rows = self._read_snapshot()
+        presorted = rows is not None  # 快照按 key 顺序写入, 无需再排序
+        if rows is None:
+            rows = self._read_rows()
+        if bulk_load:
+            self._bulk_build(rows, presorted=presorted)
+        else:
+            for uid, name, sort_key in rows:
+                self._add(uid=uid, name=name, sort_key=sort_key)  # 添加 Product 对象
+
+    def _read_rows(self):
+        """解析数据表, 返回 [(uid, name, sort_key), ...] 并记录最大主键"""
+        rows = []
         with open(self.product_data_file, "r") as f:
             content = f.readlines()
             if len(content) != 0 and content[0] != '\n':
                 for line in content:
                     if not line == '\n':
                         line = line.split(',')
-                        line = [int(line[0]), line[1], -int(100 * float(line[2])), -int(line[3])]  # 价格扩大取整
+                        line = [int(line[0]), line[1], -round(100 * float(line[2])), -int(line[3])]  # 价格扩大取整
                         if self._max_uid < line[0]:
                             self._max_uid = line[0]  # 找到目前最大主键
-                        # 添加 Product 对象
-                        self._add(uid=line[0], name=line[1], sort_key=[line[2], line[3]])
+                        rows.append((line[0], line[1], [line[2], line[3]]))
+        return rows
+
+    def _bulk_build(self, rows, presorted=False):
+        """
+        批量建树: 按 sort_key 排序一次, 相同 key 的商品归入同一个桶, 再自底向上 O(n) 建立 AVL 树
+        :param rows: [(uid, name, sort_key), ...]
+        :param presorted: rows 已按 sort_key 有序 (来自快照) 则跳过排序
+        :return: None
+        """
+        if not presorted:
+            rows.sort(key=lambda row: row[2])  # list 比较即字典序, 与 ProductKey 的全序一致
+        items = []  # [(ProductKey, 桶或单个商品), ...] 按键严格递增
+        i = 0
+        while i < len(rows):
+            # rows[i:j] 的 key 相同
+            j = i + 1
+            while j < len(rows) and rows[j][2] == rows[i][2]:
+                j += 1
+            bucket = ProbeHashMap() if j - i > 1 else None  # 单个商品内联存储, 不创建桶
+            for uid, name, sort_key in rows[i:j]:
+                product = Product(uid, name, sort_key, bucket=bucket)
+                self.uid_map[uid] = product  # 加入定位器
+                self.name_index.add(uid, name)  # 加入名称索引
+                if bucket is not None:
+                    bucket[uid] = product
+            items.append((product.key, bucket if bucket is not None else product))
+            i = j
+        self.avl.bulk_load(items, weight=self._bucket_size)  # 节点权重为桶内商品数, 用于按商品分页
+        self._n += len(rows)
+        if self.popularity_index is not None:
+            self._bulk_build_popularity()
+
+    def _bulk_build_popularity(self):
+        """按人气分组后批量建立人气索引, 不同人气值的个数远小于商品数"""
+        groups = {}  # {-popularity: {uid: Product, ...}}
+        for product in self.uid_map.values():
+            popularity = product.key_element()[1]
+            bucket = groups.get(popularity)
+            if bucket is None:
+                bucket = groups[popularity] = ProbeHashMap()
+            bucket[product.uid] = product
+        self.popularity_index.bulk_load(sorted(groups.items(), key=lambda item: item[0]))
+
+    def _popularity_add(self, product):
+        """商品加入人气索引 O(log p), p 为不同人气值的个数"""
+        popularity = product.key_element()[1]
+        bucket = self.popularity_index.get(popularity)
+        if bucket is None:
+            bucket = self.popularity_index[popularity] = ProbeHashMap()
+        bucket[product.uid] = product
+
+    def _popularity_remove(self, product):
+        """商品移出人气索引 O(log p), 桶空则删去该人气值"""
+        popularity = product.key_element()[1]
+        bucket = self.popularity_index[popularity]
+        del bucket[product.uid]
+        if len(bucket) == 0:
+            del self.popularity_index[popularity]
+
+    @staticmethod
+    def _bucket_size(bucket):
+        """AVL 节点的商品数: 内联的单个商品为 1"""
+        return 1 if isinstance(bucket, Product) else len(bucket)
+
+    @staticmethod
+    def _bucket_products(bucket):
+        """AVL 节点中的所有商品"""
+        return (bucket,) if isinstance(bucket, Product) else bucket.values()
+
+    # -------------------- 二进制快照 --------------------
+    def _data_file_stamp(self):
+        """数据表的 (大小, 修改时间), 数据表不存在时为 (0, 0)"""
+        try:
+            stat = os.stat(self.product_data_file)
+        except FileNotFoundError:
+            return 0, 0
+        return stat.st_size, stat.st_mtime_ns
+
+    def _read_snapshot(self):
+        """
+        读取二进制快照, 返回按 key 有序的 [(uid, name, sort_key), ...]
+        数值列经 mmap 切片后由 array.frombytes 整块解码, 商品名由一次 split 得到, 每行没有解析开销
+        快照不存在、损坏或与数据表不一致 (数据表在 save 之后被改动) 时返回 None, 由调用方回退到数据表
+        """
+        if not os.path.exists(self.product_snapshot_file):
+            return None
+        with open(self.product_snapshot_file, "rb") as f:
+            if os.fstat(f.fileno()).st_size < _SNAPSHOT_HEADER.size:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                magic, version, n, size, mtime_ns, max_uid = _SNAPSHOT_HEADER.unpack_from(mm, 0)
+                if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+                    return None
+                if (size, mtime_ns) != self._data_file_stamp():
+                    return None  # 过期
+                offset = _SNAPSHOT_HEADER.size
+                if len(mm) < offset + 24 * n:
+                    return None  # 截断
+                columns = []
+                for _ in range(3):
+                    column = array('q')
+                    column.frombytes(mm[offset:offset + 8 * n])
+                    if sys.byteorder != 'little':
+                        column.byteswap()
+                    columns.append(column)
+                    offset += 8 * n
+                names = mm[offset:].decode('utf-8').split('\n') if n else []
+        if len(names) != n:
+            return None
+        uids, prices, popularities = columns
+        self._max_uid = max(self._max_uid, max_uid)
+        return list(zip(uids, names, zip(prices, popularities)))
+
+    def _write_snapshot(self, products):
+        """
+        按 key 顺序写入二进制快照, 须在数据表替换之后调用, 以记录新数据表的大小与修改时间
+        :param products: 按 key 顺序的 [Product, ...]
+        """
+        uids, prices, popularities = array('q'), array('q'), array('q')
+        for product in products:
+            price, popularity = product.key_element()
+            uids.append(product.uid)
+            prices.append(price)
+            popularities.append(popularity)
+        if sys.byteorder != 'little':
+            for column in (uids, prices, popularities):
+                column.byteswap()
+        size, mtime_ns = self._data_file_stamp()
+        tmp_file = self.product_snapshot_file + '.tmp'
+        with open(tmp_file, "wb") as f:
+            f.write(_SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(products), size, mtime_ns, self._max_uid))
+            for column in (uids, prices, popularities):
+                f.write(column.tobytes())
+            f.write('\n'.join(product.name for product in products).encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.product_snapshot_file)
+
+    # -------------------- 追加日志 --------------------
+    def _replay_log(self):
+        """
+        重放日志, 每行一条记录, 商品名放在最后:
+            A,uid,price,popularity,name  插入 (price, popularity 为 sort_key 中的整数)
+            N,uid,name                   改名
+            D,uid                        删除
+        重放是幂等的: 压缩在替换数据表之后、清空日志之前中断时, 日志会在新数据表上再重放一遍,
+        此时 N/D 可能指向已被删除的 uid, 跳过即可, 结果不变
+        """
+        if not os.path.exists(self.product_log_file):
+            return
+        with open(self.product_log_file, "r") as f:
+            for line in f:
+                if not line.endswith('\n'):
+                    break  # 写入中断的残缺记录, 丢弃
+                op, rest = line[:-1].split(',', 1)
+                if op == 'A':
+                    uid, price, popularity, name = rest.split(',', 3)
+                    uid = int(uid)
+                    self._remove(uid)  # 幂等: 已存在则覆盖
+                    self._add(uid, name, [int(price), int(popularity)])
+                    if self._max_uid < uid:
+                        self._max_uid = uid
+                elif op == 'N':
+                    uid, name = rest.split(',', 1)
+                    uid = int(uid)
+                    if uid in self.uid_map:  # 商品已被后续记录删除, 跳过
+                        self._rename(uid, name)
+                elif op == 'D':
+                    self._remove(int(rest))
+                self._log_records += 1
+
+    def _append_log(self, *fields):
+        """追加一条日志记录 O(1), 达到阈值时触发压缩"""
+        self._append_logs((fields,))
+
+    def _append_logs(self, records):
+        """追加多条日志记录, 写完后只刷新 (以及 fsync) 一次, 达到阈值时触发压缩"""
+        if self._log is None:
+            self._log = open(self.product_log_file, "a")
+        count = 0
+        for fields in records:
+            self._log.write(",".join(str(field) for field in fields) + "\n")
+            count += 1
+        self._log.flush()
+        if self._fsync:
+            os.fsync(self._log.fileno())
+        self._log_records += count
+        if self._log_threshold is not None and self._log_records >= self._log_threshold:
+            self.save()
+
+    def _truncate_log(self):
+        """清空日志"""
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        if os.path.exists(self.product_log_file):
+            os.remove(self.product_log_file)
+        self._log_records = 0
 
     def _add(self, uid, name, sort_key: list):
         """插入, 当 uid 知时"""
         product = Product(uid, name, sort_key, bucket=None)
         self.uid_map[uid] = product  # 加入定位器
+        self.name_index.add(uid, name)  # 加入名称索引
+        self._attach(product)
+        self._n += 1  # 实际商品数
+        self._version += 1
+        return product
 
-        key = product.key
-        try:
-            bucket = self.avl[key]  # 已有 key 相同的桶
-            bucket[uid] = product  # 直接插入桶中
+    def _attach(self, product):
+        """
+        把商品挂到其 key 对应的 AVL 节点, 只下降一次 O(log n)
+        key 不存在则新建节点, 单个商品直接内联存储; 否则放入桶中
+        """
+        p, inserted = self.avl.insert_position(product.key, product)
+        if not inserted:
+            bucket = p.value()  # 已有 key 相同的桶
+            if isinstance(bucket, Product):
+                # 原本内联的单个商品, 第二个商品到来时才创建桶
+                other, bucket = bucket, ProbeHashMap()
+                bucket[other.uid] = other
+                other.set_bucket(bucket)
+                self.avl.set_value(p, bucket)
+            bucket[product.uid] = product  # 直接插入桶中
             product.set_bucket(bucket)  # 设置每个商品对应的桶
-        except KeyError:
-            # 未搜索到, 则创建新桶
-            new_bucket = ProbeHashMap()
-            new_bucket[uid] = product
-            product.set_bucket(new_bucket)
+            self.avl.set_weight(p, len(bucket))  # 节点权重 = 桶内商品数
+        if self.popularity_index is not None:
+            self._popularity_add(product)
 
-            self.avl[key] = new_bucket  # 将新桶插入 AVL 树
+    def _detach(self, product):
+        """
+        把商品从其 AVL 节点摘下 O(log n), 不修改定位器和名称索引
+        内联的单个商品直接删除节点; 否则从桶中删除并更新节点权重, 只剩一个商品时改回内联
+        """
+        bucket = product.bucket
+        key = product.key
+        if bucket is None:
+            del self.avl[key]
+        else:
+            del bucket[product.uid]
+            p = self.avl.find_position(key)
+            if len(bucket) == 1:
+                # 只剩一个商品, 改回内联存储, 释放桶
+                other = next(iter(bucket.values()))
+                other.set_bucket(None)
+                self.avl.set_value(p, other)
+            self.avl.set_weight(p, len(bucket))
+            product.set_bucket(None)
+        if self.popularity_index is not None:
+            self._popularity_remove(product)
 
-        self._n += 1  # 实际商品数
-        return product
+    def _reposition(self, product, sort_key):
+        """原地改键 (不写日志): 摘下后以新键重新挂上, 复用同一个 Product 对象和 uid"""
+        self._detach(product)
+        product.set_key(sort_key)
+        self._attach(product)
+        self._version += 1
 
     # -------------------- 增删改查 --------------------
     def add(self, name, sort_key: list):
@@ -165,41 +461,80 @@ class ProductService:
         uid = self._max_uid + 1
         product = self._add(uid, name, sort_key)
         self._max_uid += 1
+        self._append_log('A', uid, sort_key[0], sort_key[1], name)
         return product
 
     def update(self, uid, name, sort_key: list):
-        """改变键 key, 先删后加, 若相同则不变"""
+        """
+        改名并改键; 键改变时原地重新定位, uid 与 Product 对象不变
+        :return: 键改变则返回 uid, 否则返回 None
+        """
         product = self.uid_map[uid]
+        renamed = product.name != name
+        self._rename(uid, name)  # 改名
 
-        product.update_name(name)  # 改名
-
-        key = product.key  # ProductKey 类
         # 1. 比较 key 是否改变
-        if key.key() == sort_key:
+        if product.key.key() == tuple(sort_key):
+            if renamed:
+                self._append_log('N', uid, name)
             return None
-        # 2. 否则先删后加
-        self.remove(uid)
-        new = self.add(name, sort_key)
-        return new.uid
+        # 2. 否则原地改键, 日志记为以同一 uid 重新插入 (重放时覆盖旧记录)
+        self._reposition(product, sort_key)
+        self._append_log('A', uid, sort_key[0], sort_key[1], name)
+        return uid
+
+    def update_many(self, changes):
+        """
+        批量改键, 例如一次性给上千个商品调价, 每个商品原地重新定位 O(log n)
+        先检查全部 uid, 有不存在的则不做任何修改; 日志一次写完后只刷新 (以及 fsync) 一次
+        :param changes: [(uid, sort_key), ...] 或 {uid: sort_key, ...}, 同一个 uid 出现多次时以最后一次为准
+        :return: 键实际改变的商品数
+        """
+        changes = dict(changes)
+        moved = []
+        for uid, sort_key in changes.items():
+            product = self.uid_map[uid]  # 不存在则 KeyError
+            sort_key = tuple(sort_key)
+            if product.key.key() != sort_key:
+                moved.append((product, sort_key))
+        if not moved:
+            return 0
+
+        for product, sort_key in moved:
+            self._detach(product)
+            product.set_key(sort_key)
+            self._attach(product)
+        self._version += 1
+
+        self._append_logs(('A', product.uid, sort_key[0], sort_key[1], product.name) for product, sort_key in moved)
+        return len(moved)
 
     def remove(self, uid):
         """删除 uid 商品"""
+        product = self._remove(uid)
+        if product:
+            self._append_log('D', uid)
+        return product
+
+    def _rename(self, uid, name):
+        """改名, 同步名称索引 (不写日志)"""
+        product = self.uid_map[uid]
+        if product.name == name:
+            return
+        product.update_name(name)
+        self.name_index.update(uid, name)
+        self._version += 1
+
+    def _remove(self, uid):
+        """删除 uid 商品 (不写日志)"""
         if uid not in self.uid_map:
             return False
-        # 1. 寻找商品类和桶
         product = self.uid_map[uid]
-        bucket = product.bucket
-
-        # 2. 从桶中删除商品, 且从对照表中删除
-        del bucket[uid]
         del self.uid_map[uid]
-
-        # 3. 检查桶, 桶空则从 AVL 中删除
-        if len(bucket) == 0:
-            key = product.key
-            del self.avl[key]
-
+        self.name_index.remove(uid)
+        self._detach(product)
         self._n -= 1
+        self._version += 1
         return product  # 返回被删除的商品
 
     def __getitem__(self, uid):
@@ -216,54 +551,304 @@ class ProductService:
 
     def __iter__(self):
         """迭代遍历, 按顺序返回 Product 类"""
-        for bucket in self.avl.values():
-            for product in bucket.values():
+        p = self.avl.first()
+        while p is not None:
+            for product in self._bucket_products(p.value()):
                 yield product
+            p = self.avl.after(p)
 
     def search_name(self, pattern: str):
         """
         匹配 pattern 的 name 返回成功的 uid
+        trigram 倒排表求交集得到候选, 只对候选做 KMP 确认; 模式短于 3 时退化为全量扫描
         :param pattern: 匹配模式
         :return: 成功匹配的 uid 列表[uid, uid, ...]
         """
-        # 提前准备空间存储, 减少摊销时间
-        uid_list = [None] * len(self)
-        name_list = [None] * len(self)
-        # 存储 uid 和 name
-        i = 0
-        for uid, product in self.uid_map.items():
-            uid_list[i] = uid
-            name_list[i] = product.name
-            i += 1
-        match_index = find_all_from_list(pattern=pattern, text_list=name_list, sep="*")  # 开始匹配
-        if match_index:
-            return [uid_list[idx] for idx in match_index]  # 返回 uid 列表
-        else:
+        return self._cached('name', (pattern,), self.name_index.search)
+
+    def search_names_multi(self, patterns, ignore_case=False):
+        """
+        一次查询多个关键词, 每个关键词返回名称包含它的 uid
+        需要全量扫描的关键词合并为 Aho-Corasick 自动机, 一遍扫描所有名称; 结果经 LRU 缓存
+        :param patterns: 关键词列表
+        :param ignore_case: True 则忽略大小写
+        :return: {pattern: [uid, uid, ...]}
+        """
+        patterns = tuple(dict.fromkeys(patterns))
+        result = self._cached('multi', (patterns, ignore_case), self._search_names_multi)
+        return {pattern: list(uids) for pattern, uids in zip(patterns, result)}
+
+    def _search_names_multi(self, patterns, ignore_case):
+        found = self.name_index.search_multi(patterns, ignore_case=ignore_case)
+        return [tuple(found[pattern]) for pattern in patterns]
+
+    def search_name_fuzzy(self, pattern: str, k=1):
+        """
+        容错名称查询: 返回整个商品名与 pattern 的编辑距离不超过 k 的商品, 按距离升序 (距离相同按 uid)
+        复用 trigram 名称索引做 q-gram 计数过滤, 增/删/改名时已同步, 无需另建索引; 结果经 LRU 缓存
+        :param pattern: 查询串
+        :param k: 最大编辑距离
+        :return: [(uid, distance), ...]
+        """
+        return self._cached('fuzzy', (pattern, k), self._search_name_fuzzy)
+
+    def _search_name_fuzzy(self, pattern, k):
+        return [(uid, distance) for distance, uid in self.name_index.search_fuzzy(pattern, k)]
+
+    # -------------------- 查询结果缓存 --------------------
+    def _cached(self, kind, args, compute):
+        """
+        按 (查询类型, 参数, 版本号) 查缓存, 未命中则计算并放入缓存
+        任何修改都会使版本号递增, 旧版本的条目不再被命中, 随 LRU 淘汰
+        缓存中存元组, 返回列表副本, 调用方修改结果不会污染缓存
+        """
+        key = (kind, args, self._version)
+        result = self.cache.get(key)
+        if result is None:
+            result = tuple(compute(*args))
+            self.cache.put(key, result)
+        return list(result)
+
+    def cache_stats(self):
+        """查询缓存的统计: 命中/未命中/淘汰次数等, 用于确定缓存大小"""
+        return self.cache.stats()
+
+    # -------------------- 分页: 顺序统计 --------------------
+    def page(self, offset, limit):
+        """
+        按顺序返回第 offset 个商品起的 limit 个商品 O(log n + limit)
+        AVL 节点权重为桶内商品数, 先 select 定位起始桶, 再沿中序向后取
+        :param offset: 起始位置, 从 0 开始
+        :param limit: 最多返回的商品数
+        :return: [Product, ...]
+        """
+        if offset < 0 or limit <= 0 or offset >= len(self):
             return []
+        p, skip = self.avl.select_position(offset)  # 起始桶, 以及桶内需要跳过的商品数
+        result = []
+        while p is not None:
+            for product in self._bucket_products(p.value()):
+                if skip > 0:
+                    skip -= 1
+                    continue
+                result.append(product)
+                if len(result) == limit:
+                    return result
+            p = self.avl.after(p)
+        return result
+
+    def count_range(self, start, end):
+        """按照 key 统计范围内的商品数 start <= key < end, start, end: ProductKey (None 表示无界), O(log n)"""
+        lo = 0 if start is None else self.avl.rank(start)
+        hi = self.avl.total() if end is None else self.avl.rank(end)
+        return max(0, hi - lo)
+
+    def _iter_range(self, start, end):
+        """
+        按顺序迭代 start <= key < end 的商品 (None 表示无界)
+        起点由 rank + select 定位, 键只含价格时也不会漏掉同价格的桶
+        """
+        offset = 0 if start is None else self.avl.rank(start)
+        if offset >= self.avl.total():
+            return
+        p, _ = self.avl.select_position(offset)  # rank 按整桶计数, 偏移量必为 0
+        while p is not None and (end is None or p.key() < end):
+            for product in self._bucket_products(p.value()):
+                yield product
+            p = self.avl.after(p)
 
     # -------------------- 查范围 --------------------
     def find_range(self, start, end):
         """按照 key 查找范围内的商品对象 start, end: ProductKey"""
         for k, v in self.avl.find_range(start, end):
-            # k: ProductKey, v: {uid: Product, ...}
-            for product in v.values():
+            # k: ProductKey, v: {uid: Product, ...} 或单个 Product
+            for product in self._bucket_products(v):
                 yield product
 
+    def _prize_keys(self, prize1, prize2):
+        """价格闭区间 [prize1, prize2] 对应的键区间 [start, end), None 表示无界"""
+        start = None if prize2 is None else Product.ProductKey([-round(prize2 * 100)])
+        end = None if prize1 is None else Product.ProductKey([-round(prize1 * 100) + 1])
+        return start, end
+
     def prize_between(self, prize1, prize2):
-        """返回价格 [prize1, prize2]"""
-        p1 = Product.ProductKey([-int(prize2 * 100)])
-        p2 = Product.ProductKey([-int(prize1 * 100)])
-        return self.find_range(p1, p2)
+        """
+        返回价格闭区间 [prize1, prize2] 内的商品, 按 key 顺序
+        两端价格恰好相等的商品都包含在内 (旧实现基于 find_range, 会漏掉价格等于 prize1 的商品)
+        结果经 LRU 缓存, 相同区间在无修改时重复查询 O(1) 命中 (返回列表副本 O(k))
+        :return: [Product, ...]
+        """
+        return self._cached('prize', (prize1, prize2), lambda p1, p2: self._iter_range(*self._prize_keys(p1, p2)))
+
+    # -------------------- 组合查询: 价格区间 + 名称匹配 --------------------
+    def query(self, price_min=None, price_max=None, pattern='', limit=None):
+        """
+        组合查询, 惰性求值, 到 limit 即停止扫描 (展示上限由视图作为 limit 传入)
+        给定 limit 时结果有界, 经 LRU 缓存, 列表页重复提交相同条件时直接命中;
+        limit 为 None 时结果可能是整个价格区间, 不缓存, 直接返回生成器, 由调用方决定取多少
+        参数与 _query 相同
+        :return: 迭代器, 依次产出 Product
+        """
+        if limit is None:
+            return self._query(price_min, price_max, pattern)
+        return iter(self._cached('query', (price_min, price_max, pattern, limit), self._query))
+
+    def _query(self, price_min=None, price_max=None, pattern='', limit=None):
+        """
+        组合查询, 返回生成器, 调用方可在展示上限处提前停止
+        先估计两个条件的选择性: 价格区间的商品数由 rank 精确得到 O(log n),
+        名称匹配数由 trigram 最短倒排表给出上界; 由更小的一方驱动扫描, 另一方逐个检查:
+            名称驱动: 价格检查是键比较 O(1)
+            价格驱动: 先取 trigram 候选集合, 名称检查为集合成员测试 O(1), 只对命中者 KMP 确认 O(m);
+                      模式短于 3 时没有候选集合, 每个商品都要 KMP O(m)
+        :param price_min: 最低价格, None 表示无下界
+        :param price_max: 最高价格, None 表示无上界
+        :param pattern: 名称匹配模式, '' 表示不限制
+        :param limit: 最多返回的商品数, None 表示不限制
+        :return: 生成器, 依次产出 Product
+        """
+        start, end = self._prize_keys(price_min, price_max)
+        price_count = self.count_range(start, end)
+        name_count = self.name_index.estimate(pattern) if pattern else None
+
+        if name_count is not None and name_count < price_count:
+            # 名称更有选择性: 由名称匹配驱动, 按 key 排序后逐个检查价格
+            products = [self.uid_map[uid] for uid in self.name_index.search(pattern)]
+            products.sort(key=lambda product: product.key.key())
+            candidates = (
+                product for product in products
+                if (start is None or not product.key < start) and (end is None or product.key < end)
+            )
+        else:
+            # 价格更有选择性 (或模式过短无法估计): 沿 AVL 中序扫描价格区间, 逐个检查名称
+            candidates = self._iter_range(start, end)
+            if pattern:
+                names = self.name_index.candidates(pattern)  # trigram 倒排表交集, None 表示模式过短
+                if names is None:
+                    candidates = (product for product in candidates if find_kmp(pattern, product.name) != -1)
+                else:
+                    candidates = (
+                        product for product in candidates
+                        if product.uid in names and find_kmp(pattern, product.name) != -1
+                    )
+
+        count = 0
+        for product in candidates:
+            if limit is not None and count >= limit:
+                return
+            yield product
+            count += 1
+
+    # -------------------- 价格区间内人气 top k --------------------
+    def top_k_popular(self, price_min=None, price_max=None, k=10):
+        """
+        价格区间内人气最高的 k 个商品, 按人气降序, 人气相同按 uid 升序; 结果经 LRU 缓存
+        由估计的访问商品数选择执行方式:
+            区间扫描: 访问区间内的 m 个商品 (同价格组可整体跳过, 见 _top_k_by_range)
+            人气索引: 按人气降序逐个检查价格 O(1), 取满 k 个即停, 期望访问 k * n / m 个商品
+        :param price_min: 最低价格, None 表示无下界
+        :param price_max: 最高价格, None 表示无上界
+        :param k: 返回的商品数
+        :return: [Product, ...]
+        """
+        return self._cached('top', (price_min, price_max, k), self._top_k_popular)
+
+    def _top_k_popular(self, price_min, price_max, k):
+        start, end = self._prize_keys(price_min, price_max)
+        m = self.count_range(start, end)
+        if k <= 0 or m == 0:
+            return []
+        if self.popularity_index is not None and k * self._n < m * m:  # k * n / m < m
+            return self._top_k_by_popularity(start, end, k)
+        return self._top_k_by_range(start, end, k)
+
+    def _top_k_by_range(self, start, end, k):
+        """
+        沿主 AVL 扫描价格区间, 大小为 k 的最小堆保留当前最好的 k 个, 堆顶为其中最差者 O(m log k)
+        key 为 (-price, -popularity), 同一价格的节点按人气降序排列, 价格组第一个节点即组内最大人气;
+        堆满且某节点人气低于堆顶时, 同组后续节点更不可能入选, 大组用 rank + select 整体跳过 O(log n)
+        """
+        heap = HeapPriorityQueue()  # {(popularity, -uid): Product}, 堆顶为当前第 k 好的商品
+        worst = None  # 堆满后堆顶的 key, 即入选门槛
+        offset = 0 if start is None else self.avl.rank(start)
+        p = self.avl.select_position(offset)[0] if offset < self.avl.total() else None
+        while p is not None and (end is None or p.key() < end):
+            price, popularity = p.key().key()
+            popularity = -popularity
+            if worst is not None and popularity < worst[0]:
+                # 同价格组的后续节点人气更低, 都不可能入选: 先沿中序走几步,
+                # 组仍未结束 (大组) 再用 rank + select 跳到下一个价格, 避免小组也付出 O(log n)
+                q = self.avl.after(p)
+                steps = 0
+                while q is not None and q.key().key()[0] == price:
+                    steps += 1
+                    if steps == TOP_K_GROUP_WALK:
+                        offset = self.avl.rank(Product.ProductKey([price + 1]))
+                        q = self.avl.select_position(offset)[0] if offset < self.avl.total() else None
+                        break
+                    q = self.avl.after(q)
+                p = q
+                continue
+            for product in self._bucket_products(p.value()):
+                item = (popularity, -product.uid)
+                if worst is None:
+                    heap.add(item, product)
+                    if len(heap) == k:
+                        worst = heap.min()[0]
+                elif worst < item:
+                    heap.remove_min()
+                    heap.add(item, product)
+                    worst = heap.min()[0]
+            p = self.avl.after(p)
+
+        result = []
+        while not heap.is_empty():
+            result.append(heap.remove_min()[1])
+        result.reverse()
+        return result
+
+    def _top_k_by_popularity(self, start, end, k):
+        """按人气降序遍历人气索引, 逐个检查价格是否在区间内, 取满 k 个即停"""
+        result = []
+        p = self.popularity_index.first()
+        while p is not None:
+            bucket = p.value()
+            for uid in sorted(bucket.keys()):  # 人气相同按 uid 升序
+                product = bucket[uid]
+                if (start is None or not product.key < start) and (end is None or product.key < end):
+                    result.append(product)
+                    if len(result) == k:
+                        return result
+            p = self.popularity_index.after(p)
+        return result
 
     # -------------------- 保存 --------------------
-    def save(self):
-        """保存到数据表"""
-        writer = ""
-        for product in self:
-            price, popularity = product.key_element()
-            writer += f"{product.uid},{product.name},{abs(round(price / 100, 2))},{abs(popularity)}\n"
-        with open(self.product_data_file, "w") as f:
-            f.write(writer)
+    def save(self, snapshot=True):
+        """
+        压缩: 将当前全部商品重写到数据表 (以及二进制快照), 然后清空日志
+        临时文件先 fsync 再原子替换, 保证替换后的数据表内容完整; 之后才清空日志,
+        任何一步中断, 下次启动时 "数据表 + 日志重放" 都能得到相同的状态
+        快照记录新数据表的大小与修改时间, 若在写快照前中断, 旧快照与数据表不一致, 启动时自动回退到数据表
+        :param snapshot: 是否同时写二进制快照
+        """
+        products = list(self)
+        tmp_file = self.product_data_file + '.tmp'
+        with open(tmp_file, "w") as f:
+            for product in products:
+                price, popularity = product.key_element()
+                f.write(f"{product.uid},{product.name},{abs(round(price / 100, 2))},{abs(popularity)}\n")
+            f.flush()
+            os.fsync(f.fileno())  # 数据落盘后再替换, 否则断电后可能得到空的新数据表
+        os.replace(tmp_file, self.product_data_file)  # 原子替换, 中途崩溃不会损坏数据表
+        if snapshot:
+            self._write_snapshot(products)
+        self._truncate_log()
+
+    def close(self):
+        """关闭日志文件"""
+        if self._log is not None:
+            self._log.close()
+            self._log = None
 
 
 # -------------------- 生成测试数据 --------------------
@@ -277,16 +862,328 @@ def random_num(start=1, end=1000):
     return random.randint(start, end)
 
 
+def write_random_products(file_path, n):
+    """生成 n 条随机商品写入 file_path, 格式与 04products.csv 一致"""
+    with open(file_path, "w") as f:
+        f.writelines(
+            f"{uid},{random_name()},{random_num(100, 100000) / 100},{random_num(1, 10000)}\n"
+            for uid in range(1, n + 1)
+        )
+
+
+# -------------------- 性能测试 --------------------
+def benchmark_load(n=100000):
+    """
+    启动耗时: 逐行插入 vs 自底向上批量建树
+    整体耗时包含解析数据表、uid 定位器 ProbeHashMap 和名称索引的插入, 这部分两种方式都是 O(n) 且占大头;
+    另外单独给出只建 AVL 树 (相同的有序键) 的耗时, 即批量建树真正节省的部分
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, '04products.csv')
+        write_random_products(file_path, n)
+
+        start = time.time()
+        ProductService(file_path=file_path, bulk_load=False)
+        per_row_time = time.time() - start
+
+        start = time.time()
+        service = ProductService(file_path=file_path, bulk_load=True)
+        bulk_time = time.time() - start
+
+    # 只建树: 相同的 (ProductKey, 桶) 序列
+    items = [(p.key(), p.value()) for p in _positions(service.avl)]
+    start = time.time()
+    tree = AVLTreeMap()
+    for k, v in items:
+        tree[k] = v
+    tree_per_row_time = time.time() - start
+
+    start = time.time()
+    AVLTreeMap().bulk_load(items)
+    tree_bulk_time = time.time() - start
+
+    print(f"N = {n}\nPer-row load: {per_row_time:.3f}s\nBulk load: {bulk_time:.3f}s"
+          f"\nAVL only, per-row insert: {tree_per_row_time:.3f}s\nAVL only, bulk_load: {tree_bulk_time:.3f}s")
+
+
+def benchmark_snapshot(n=100000):
+    """
+    启动耗时: 解析 csv 数据表 vs 读取二进制快照 (均为批量建树)
+    另外单独给出只读取行数据 (不建树、不建索引) 的耗时, 即快照真正节省的部分
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, '04products.csv')
+        write_random_products(file_path, n)
+
+        start = time.time()
+        service = ProductService(file_path=file_path)
+        csv_time = time.time() - start
+
+        service.save()  # 写出快照
+        start = time.time()
+        service._read_rows()
+        csv_rows_time = time.time() - start
+        start = time.time()
+        service._read_snapshot()
+        snapshot_rows_time = time.time() - start
+
+        del service  # 释放第一个服务, 避免其对象使第二次加载的垃圾回收变慢
+        start = time.time()
+        ProductService(file_path=file_path)
+        snapshot_time = time.time() - start
+
+    print(f"N = {n}\nCSV load: {csv_time:.3f}s\nSnapshot load: {snapshot_time:.3f}s"
+          f"\nRows only, CSV: {csv_rows_time:.3f}s\nRows only, snapshot: {snapshot_rows_time:.3f}s")
+
+
+def benchmark_top_k(n=100000, k=10, repeat=20):
+    """
+    价格区间内人气 top k: 区间扫描后全排序 vs 有界堆 (区间扫描) vs 人气索引
+    区间取 "50 元以下" (约 5% 的商品) 与不限价格两种; 直接调用内部方法, 不经过结果缓存
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, '04products.csv')
+        write_random_products(file_path, n)
+        service = ProductService(file_path=file_path, popularity_index=True)
+
+    print(f"N = {n}, k = {k}")
+    for price_min, price_max in ((None, 50), (None, None)):
+        start, end = service._prize_keys(price_min, price_max)
+
+        t = time.time()
+        for _ in range(repeat):
+            sorted(service._iter_range(start, end), key=lambda product: (product.key_element()[1], product.uid))[:k]
+        sort_time = (time.time() - t) / repeat
+
+        t = time.time()
+        for _ in range(repeat):
+            service._top_k_by_range(start, end, k)
+        heap_time = (time.time() - t) / repeat
+
+        t = time.time()
+        for _ in range(repeat):
+            service._top_k_by_popularity(start, end, k)
+        index_time = (time.time() - t) / repeat
+
+        print(f"Price in [{price_min}, {price_max}], {service.count_range(start, end)} products"
+              f"\nScan + sort: {sort_time * 1000:.2f}ms\nBounded heap: {heap_time * 1000:.2f}ms"
+              f"\nPopularity index: {index_time * 1000:.2f}ms")
+
+
+def benchmark_update(n=100000, m=5000, fsync=False):
+    """批量调价 m 个商品: 先删后加 (旧实现) vs 逐个原地改键 vs update_many; fsync=True 时每次写日志都落盘"""
+    def delete_add(service, changes):
+        for uid, sort_key in changes:
+            name = service[uid].name
+            service.remove(uid)
+            service.add(name, sort_key)
+
+    def update(service, changes):
+        for uid, sort_key in changes:
+            service.update(uid, service[uid].name, sort_key)
+
+    def update_many(service, changes):
+        service.update_many(changes)
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, '04products.csv')
+        write_random_products(file_path, n)
+        changes = [(uid, [-random_num(100, 100000), -random_num(1, 10000)]) for uid in rng.sample(range(1, n + 1), m)]
+
+        times = []
+        for method in (delete_add, update, update_many):
+            service = ProductService(file_path=file_path, log_threshold=None, fsync=fsync)
+            gc.collect()
+            start = time.time()
+            method(service, changes)
+            times.append(time.time() - start)
+            service.close()
+            os.remove(service.product_log_file)  # 每种方式都从同一份数据开始
+            del service
+
+    print(f"N = {n}, reprice {m}, fsync = {fsync}\nDelete + add: {times[0]:.3f}s\nUpdate in place: {times[1]:.3f}s"
+          f"\nUpdate many: {times[2]:.3f}s")
+
+
+def benchmark_fuzzy(n=100000, repeat=20):
+    """容错查询: trigram 计数过滤 + 截断编辑距离 vs 逐个计算编辑距离的全量扫描; 查询为已有商品名做 k 次替换"""
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, '04products.csv')
+        write_random_products(file_path, n)
+        service = ProductService(file_path=file_path)
+
+    names = [product.name for product in service]
+    print(f"N = {n}")
+    for k in (1, 2, 3):
+        queries = []
+        for _ in range(repeat):
+            name = list(rng.choice(names))
+            for i in rng.sample(range(len(name)), k):
+                name[i] = rng.choice(string.ascii_letters)
+            queries.append(''.join(name))
+
+        start = time.time()
+        for query in queries:
+            service.name_index.search_fuzzy(query, k)
+        index_time = (time.time() - start) / repeat
+
+        start = time.time()
+        for query in queries[:2]:  # 全量扫描太慢, 只测两次
+            [name for name in names if edit_distance(query, name) <= k]
+        scan_time = (time.time() - start) / 2
+
+        print(f"k = {k}\nTrigram filter: {index_time * 1000:.2f}ms\nFull scan: {scan_time * 1000:.2f}ms")
+
+
+def benchmark_multi(n=100000, m=200):
+    """多关键词查询: 逐个 search_name vs search_names_multi; 关键词为 m 个随机 2 字母串 (短于 3, 只能全量扫描)"""
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, '04products.csv')
+        write_random_products(file_path, n)
+        service = ProductService(file_path=file_path)
+
+    patterns = [''.join(rng.choices(string.ascii_letters, k=2)) for _ in range(m)]
+    print(f"N = {n}, {m} patterns")
+    start = time.time()
+    expected = {pattern: service.name_index.search(pattern) for pattern in patterns}
+    print(f"Per-pattern search: {time.time() - start:.3f}s")
+    start = time.time()
+    result = service.name_index.search_multi(patterns)
+    print(f"Aho-Corasick, one pass: {time.time() - start:.3f}s")
+    assert result == expected
+    start = time.time()
+    service.name_index.search_multi(patterns, ignore_case=True)
+    print(f"Aho-Corasick, ignore case: {time.time() - start:.3f}s")
+
+
+def _positions(tree):
+    """按中序返回树的所有 Position"""
+    p = tree.first()
+    while p is not None:
+        yield p
+        p = tree.after(p)
+
+
+def benchmark_memory(n=100000):
+    """tracemalloc 统计每个商品占用的内存 (字节), 分别给出含/不含名称索引的结果"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, '04products.csv')
+        write_random_products(file_path, n)
+
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        service = ProductService(file_path=file_path)
+        total = tracemalloc.get_traced_memory()[0] - base
+        service.name_index = NGramIndex(n=3)  # 释放名称索引, 只统计商品本身的存储
+        storage = tracemalloc.get_traced_memory()[0] - base
+        tracemalloc.stop()
+
+    print(f"N = {n}\nBytes per product: {total / n:.1f}\nBytes per product (without name index): {storage / n:.1f}")
+
+
 if __name__ == '__main__':
-    product_service = ProductService()
-    N = 1000
-    for i in range(N):
-        product_name = random_name(length=10)
-        price = -random_num(start=1000, end=10000)
-        popularity = -random_num(start=100, end=10000)
-        product_service.add(product_name, [price, popularity])
-
-    product_service.save()
+    """
+    整体耗时包含数据表解析、uid 定位器和 trigram 名称索引的构建, 两种方式都要做, 且占批量加载耗时的大部分
+    N = 10000
+    Per-row load: 1.476s
+    Bulk load: 0.482s
+    AVL only, per-row insert: 0.728s
+    AVL only, bulk_load: 0.046s
+    N = 100000
+    Per-row load: 17.007s
+    Bulk load: 7.632s
+    AVL only, per-row insert: 8.557s
+    AVL only, bulk_load: 0.451s
+
+    内存 (tracemalloc, 字节/商品), 之前: 普通类 + list 键 + 每个 key 一个 ProbeHashMap 桶;
+    之后: __slots__ + 元组键 + 单个商品内联存储于 AVL 节点
+    N = 100000
+    Before: 1933.4 / without name index: 983.7
+    After: 1472.9 / without name index: 523.8
+    N = 1000000
+    Before: 1353.0 / without name index: 976.1
+    After: 893.3 / without name index: 516.5
+
+    二进制快照 (以下为加载期间暂停垃圾回收时测得; 暂停 gc 对整个进程生效, 在后台预热时会波及请求线程, 已去掉,
+    N = 100000 的 CSV 批量加载约 4.4s, 暂停时约 2.9s):
+    读取行数据快 2.5 倍以上, 但整体耗时仍由 uid 定位器和名称索引的构建主导, 两种格式相差在噪声内
+    N = 10000
+    CSV load: 0.157s
+    Snapshot load: 0.135s
+    Rows only, CSV: 0.012s
+    Rows only, snapshot: 0.002s
+    N = 100000
+    CSV load: 2.768s
+    Snapshot load: 2.847s
+    Rows only, CSV: 0.144s
+    Rows only, snapshot: 0.057s
+
+    价格区间内人气 top k (k = 10, 单次查询)
+    N = 100000, Price in [None, 50], 4860 products
+    Scan + sort: 78.33ms
+    Bounded heap: 20.20ms
+    Popularity index: 0.64ms
+    N = 100000, Price in [None, None], 100000 products
+    Scan + sort: 716.41ms
+    Bounded heap: 492.30ms
+    Popularity index: 0.03ms
+
+    批量调价 (原地改键复用 Product 与 uid; update_many 的日志只刷新一次)
+    N = 100000, reprice 5000, fsync = False
+    Delete + add: 0.860s
+    Update in place: 0.666s
+    Update many: 0.636s
+    N = 100000, reprice 5000, fsync = True
+    Delete + add: 2.317s
+    Update in place: 1.383s
+    Update many: 0.687s
+
+    容错名称查询 (单次查询, 名称为 10 个随机字母); k = 3 时 10 个字符的查询 q-gram 过滤无效, 退化为带状截断的全量确认
+    N = 100000
+    k = 1
+    Trigram filter: 0.07ms
+    Full scan: 4784.09ms
+    k = 2
+    Trigram filter: 0.06ms
+    Full scan: 5045.47ms
+    k = 3
+    Trigram filter: 1776.60ms
+    Full scan: 3253.65ms
+
+    多关键词查询 (关键词为随机 2 字母串, 每个都要全量扫描; 一遍扫描的耗时与关键词数几乎无关)
+    N = 100000, 20 patterns
+    Per-pattern search: 6.304s
+    Aho-Corasick, one pass: 0.211s
+    Aho-Corasick, ignore case: 0.245s
+    N = 100000, 200 patterns
+    Per-pattern search: 45.689s
+    Aho-Corasick, one pass: 0.302s
+    Aho-Corasick, ignore case: 0.427s
+    """
+    for N in (10000, 100000):
+        benchmark_load(N)
+    for N in (100000, 1000000):
+        benchmark_memory(N)
+    for N in (10000, 100000):
+        benchmark_snapshot(N)
+    benchmark_top_k(100000)
+    for fsync in (False, True):
+        benchmark_update(100000, 5000, fsync=fsync)
+    benchmark_fuzzy(100000)
+    benchmark_multi(100000)
+
+    # product_service = ProductService()
+    # N = 1000
+    # for i in range(N):
+    #     product_name = random_name(length=10)
+    #     price = -random_num(start=1000, end=10000)
+    #     popularity = -random_num(start=100, end=10000)
+    #     product_service.add(product_name, [price, popularity])
+    #
+    # product_service.save()
     # p1 = product_service.add("p1", [-1.1, 0])
     # product_service.add("p2.1", [-2.2, -1])
     # product_service.add("p2.2", [-2.2, 0])
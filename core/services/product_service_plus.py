@@ -8,21 +8,50 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "BiDms.settings")
 django.setup()  # os.environ['DJANGO_SETTINGS_MODULE']
 
 import os
-import shelve
+import io
+import dbm
+import base64
+import pickle
+import struct
+import logging
+import functools
+from contextlib import contextmanager
 
 import time
 import random
+import threading
 import string
+import tempfile
 
 from django.conf import settings
 
 try:
-    from .data_structures import BPlusTree
+    from .data_structures import BPlusTree, RecordStore
+    from .data_structures.record_store import MAX_TEXT
 except ImportError:
-    from data_structures import BPlusTree
-
-PRODUCTS_DATA_DIR = os.path.join(settings.DATA_DIR, '05products_plus')
-UID_MAP = os.path.join(settings.DATA_DIR, '06products_plus_uid_price')
+    from data_structures import BPlusTree, RecordStore
+    from data_structures.record_store import MAX_TEXT
+
+PRODUCTS_DATA_DIR = os.path.join(settings.DATA_DIR, '05products_plus.rec')
+UID_MAP = os.path.join(settings.DATA_DIR, '06products_plus_uid_price.idx')
+PRICE_INDEX = os.path.join(settings.DATA_DIR, '09products_plus_price_index.bpt')
+# 旧版本的 shelve 存储 {str(price): [Product, ...]} 与 {str(uid): price}, 由 migrate_legacy_store 一次性转换
+LEGACY_PRODUCTS_DATA = os.path.join(settings.DATA_DIR, '05products_plus')
+LEGACY_UID_MAP = os.path.join(settings.DATA_DIR, '06products_plus_uid_price')
+
+logger = logging.getLogger(__name__)
+
+# UIDMap 文件: 文件头 (元数据) + 以 uid 为下标的定长条目 (price, rid), rid 为 0 表示该 uid 不存在
+UID_MAGIC = b'UIDF'
+UID_VERSION = 1
+# 文件头: 魔数, 版本, 是否完整提交, 最大 uid, 商品数
+_UID_HEADER = struct.Struct('<4sH?xqq')
+_UID_ENTRY = struct.Struct('<qq')
+# scan 的游标: 上一批最后一个商品的价格和记录号, 编码为 URL 安全的 base64 字符串
+_CURSOR = struct.Struct('<qq')
+# 商品名编码后的最大字节数 (一条记录须放得进一页); 价格存为 8 字节有符号整数
+MAX_NAME_BYTES = MAX_TEXT
+MIN_PRICE, MAX_PRICE = -2 ** 63, 2 ** 63 - 1
 
 
 class Product:
@@ -40,67 +69,145 @@ class Product:
 
 class BlockManager:
     """
-    数据在磁盘中的存储形式
-    {price: [Product(uid, name, price), Product(uid, name, price), ...]} 例如:
-    {
-        "699": [Product(uid=1, name="Item1", price=699), Product(uid=2, name="Item2", price=699)],
-        "799": [Product(uid=3, name="Item3", price=799)],
-    }
+    商品数据在磁盘中的存储形式: 记录文件 (RecordStore) 中的定长二进制记录 (uid, 名称),
+    同一价格的商品存放在一条页链中, 例如价格 699 的两个商品在同一页的两个槽中:
+    page 7: [price=699] slot 0: (uid=1, "Item1"), slot 1: (uid=2, "Item2")
+    链头页号保存在价格 B+ 树中 {price: 链头页号}, 商品的记录号 rid (页号 + 槽号) 保存在 UIDMap 中
     """
 
-    def __init__(self, filename=PRODUCTS_DATA_DIR):
-        """数据以二进制的方式存储在 filename.db 中"""
-        self.db = shelve.open(filename, writeback=True)
+    def __init__(self, filename=PRODUCTS_DATA_DIR, cache_size=256):
+        """
+        修改的页记录为脏页, commit 时只写这些页
+        :param cache_size: 缓冲池容量 (页数), 0 表示不缓存
+        """
+        self.store = RecordStore(filename, cache_size)
 
     # -------------------- 二进制文件: 读/写/删/查 --------------------
-    def read_block(self, price):
-        """根据 price 获取商品 Product 类的列表
+    def read_block(self, head):
+        """根据链头页号获取该价格的商品 Product 类的列表 (按加入顺序, 删除后空出的槽会被复用)
          形如: [Product(uid, name, price), Product(uid, name, price), ...]"""
-        return self.db.get(str(price), [])
+        return [Product(uid, name, price) for price, uid, name in self.store.chain(head)]
+
+    def scan_block(self, head, after=0, reverse=False):
+        """
+        按记录号升序惰性产出该价格中记录号大于 after 的商品 (rid, Product), 用于游标分页
+        reverse 为 True 时按记录号降序产出小于 after 的商品 (after 为 0 表示从最后一个开始)
+        """
+        for rid, price, uid, name in self.store.scan(head, after, reverse):
+            yield rid, Product(uid, name, price)
 
-    def write_block(self, price, products):
-        """写入以二进制的方式磁盘"""
-        self.db[str(price)] = products
-        self.db.sync()  # 将内存中的所有更改同步到磁盘, 可加可不加, 最后 close 时仍然会保存
+    def read_record(self, rid):
+        """读取记录号为 rid 的商品, 只解析这一条记录; 不存在则返回 None"""
+        record = self.store.read(rid)
+        if record is None:
+            return None
+        price, uid, name = record
+        return Product(uid, name, price)
 
-    def delete_block(self, price):
-        """删除 price 整个数据块"""
-        if str(price) in self.db:
-            del self.db[str(price)]
-            self.db.sync()
+    def append_record(self, head, product):
+        """
+        商品追加到其价格的页链中 (通常只写链头一页)
+        :param head: 链头页号, None 表示新价格
+        :return: (rid, 链头页号), 链头改变时需要更新价格 B+ 树
+        """
+        return self.store.append(head, product.price, product.uid, product.name)
+
+    def write_record(self, rid, product):
+        """原地修改商品名称; 所在页放不下新名称时返回 False"""
+        return self.store.write(rid, product.name)
+
+    def delete_record(self, head, rid):
+        """删除记录号为 rid 的商品, 槽留待复用; 返回该价格是否已没有商品 (页链已释放)"""
+        return self.store.delete(head, rid)
+
+    def heads(self):
+        """扫描记录文件得到所有价格的 (price, 链头页号), 用于重建价格 B+ 树"""
+        return self.store.heads()
+
+    def cache_stats(self):
+        """
+        缓冲池统计: 命中/未命中/淘汰次数、命中率, 以及缓存的页数、商品数和内存占用 (字节)
+        """
+        cache = self.store.cache
+        if cache is None:
+            return {'capacity': 0}
+        stats = cache.stats()
+        products = nbytes = 0
+        for _, page in cache.items():
+            nbytes += sys.getsizeof(page)
+            products += RecordStore.live(page)
+        stats['products'] = products
+        stats['bytes'] = nbytes
+        return stats
+
+    def commit(self):
+        """把所有脏页写入磁盘"""
+        self.store.commit()
 
     # -------------------- 关闭二进制文件 --------------------
     def close(self):
-        self.db.close()
+        self.store.close()
 
 
 class UIDMap:
-    """存储 uid 的存储关系
-    形如: {uid: price, uid: price, ...}"""
+    """存储 uid 的存储关系: 商品的价格及其在记录文件中的记录号
+    形如: {uid: (price, rid), uid: (price, rid), ...}
+    uid 是连续分配的整数, 第 uid 个定长条目即其位置, 查找只读一个条目;
+    文件头记录最大 uid、商品数和格式版本, 与条目在同一次提交中写入, 打开时只读文件头 O(1);
+    文件头缺失或与文件不符 (未完整提交、大小不符) 时才扫描所有条目恢复"""
 
     def __init__(self, filename=UID_MAP):
-        self.db = shelve.open(filename, writeback=True)
+        self.filename = filename
+        self._dirty = {}  # 尚未写入的修改 {uid: (price, rid) 或 None (已删除)}
         self._max_uid = 0
-        self._size = self._load_max_uid()
+        self._size = 0
+        self.recovered = False  # 打开时是否经过了扫描恢复
+        if os.path.exists(filename):
+            self._file = open(filename, 'r+b')
+            if not self._load_header():
+                self._rescan()
+                self.recovered = True
+        else:
+            self._file = open(filename, 'w+b')
+            self._write_header(True)
 
     def __len__(self):
         return self._size
 
-    # -------------------- uid 生成方式封装 --------------------
-    def _load_max_uid(self):
-        """加载数据库中的最大 UID"""
-        length = 0
-        if self.db:
-            # 获取所有的 uid
-            all_uids = [int(k) for k in self.db.keys()]
-            length = len(all_uids)
-            if all_uids:
-                self._max_uid = max(all_uids)
-            else:
-                self._max_uid = 0  # 如果没有任何记录, 初始化为 0
+    # -------------------- 文件头 --------------------
+    @staticmethod
+    def _offset(uid):
+        return _UID_HEADER.size + uid * _UID_ENTRY.size
+
+    def _load_header(self):
+        """读取文件头得到最大 uid 和商品数; 返回文件头是否有效"""
+        self._file.seek(0)
+        try:
+            magic, version, clean, max_uid, count = _UID_HEADER.unpack(self._file.read(_UID_HEADER.size))
+        except struct.error:
+            return False
+        if (magic, version) != (UID_MAGIC, UID_VERSION) or not clean or not 0 <= count <= max_uid \
+                or os.path.getsize(self.filename) != self._offset(max_uid + 1):
+            return False
+        self._max_uid, self._size = max_uid, count
+        return True
 
-        return length
+    def _rescan(self):
+        """扫描所有条目得到最大 uid 和商品数 O(n), 并写回文件头; 已删除的条目仍保留, 最大 uid 不会倒退"""
+        self._file.seek(_UID_HEADER.size)
+        data = self._file.read()
+        entries = len(data) // _UID_ENTRY.size
+        self._max_uid = max(entries - 1, 0)
+        self._size = sum(1 for price, rid in _UID_ENTRY.iter_unpack(data[:entries * _UID_ENTRY.size]) if rid)
+        self._file.truncate(self._offset(self._max_uid + 1))
+        self._write_header(True)
+        self._file.flush()
+
+    def _write_header(self, clean):
+        self._file.seek(0)
+        self._file.write(_UID_HEADER.pack(UID_MAGIC, UID_VERSION, clean, self._max_uid, self._size))
 
+    # -------------------- uid 生成方式封装 --------------------
     def get_max_uid(self):
         """返回当前的最大 uid"""
         return self._max_uid
@@ -110,42 +217,122 @@ class UIDMap:
         self._max_uid += 1
         return self._max_uid
 
+    def reserve_uid(self, uid):
+        """保证不超过 uid 的编号不再被分配 (导入已有 uid 的商品时使用)"""
+        self._max_uid = max(self._max_uid, uid)
+
     # -------------------- 更新 uid 索引 --------------------
-    def set(self, uid, price):
-        """形如 {uid: price, uid: price, ...}"""
-        self.db[str(uid)] = price
-        self.db.sync()
+    def set(self, uid, price, rid):
+        """形如 {uid: (price, rid), ...} (commit 时写入)"""
+        if self.get(uid) is None:
+            self._size += 1
+        self._dirty[uid] = (price, rid)
 
     def get(self, uid):
-        return self.db.get(str(uid), None)
+        """返回 (price, rid), 不存在则返回 None"""
+        if uid in self._dirty:
+            return self._dirty[uid]
+        if not 0 < uid <= self._max_uid:
+            return None
+        self._file.seek(self._offset(uid))
+        data = self._file.read(_UID_ENTRY.size)
+        if len(data) < _UID_ENTRY.size:  # 已分配但尚未提交的 uid
+            return None
+        price, rid = _UID_ENTRY.unpack(data)
+        return (price, rid) if rid else None
 
     def delete(self, uid):
-        if str(uid) in self.db:
-            del self.db[str(uid)]
-            self.db.sync()
+        if self.get(uid) is not None:
+            self._dirty[uid] = None
+            self._size -= 1
+
+    def commit(self):
+        """
+        把所有修改和文件头写入磁盘: 先把文件头标记为未完整提交, 写完条目后再写入新的文件头,
+        中途崩溃时下次打开会扫描恢复
+        """
+        if not self._dirty:
+            return
+        self._write_header(False)
+        for uid in sorted(self._dirty):
+            location = self._dirty[uid]
+            self._file.seek(self._offset(uid))
+            self._file.write(_UID_ENTRY.pack(*(location or (0, 0))))
+        self._file.seek(0, os.SEEK_END)
+        if self._file.tell() < self._offset(self._max_uid + 1):  # 补齐未使用的 uid 的条目
+            self._file.truncate(self._offset(self._max_uid + 1))
+        self._dirty.clear()
+        self._write_header(True)
+        self._file.flush()
 
     # -------------------- 其他 --------------------
     def all_items(self):
-        """返回数据库中所有的 uid 和 price 对 [uid: price, uid: price, ...]"""
-        return [(int(k), v) for k, v in self.db.items()]
+        """返回所有的 uid 和位置 [(uid, (price, rid)), ...], 按 uid 升序 (含未提交的修改)"""
+        self._file.seek(_UID_HEADER.size)
+        data = self._file.read(self._offset(self._max_uid + 1) - _UID_HEADER.size)
+        data = data[:len(data) // _UID_ENTRY.size * _UID_ENTRY.size]
+        items = {uid: (price, rid) for uid, (price, rid) in enumerate(_UID_ENTRY.iter_unpack(data)) if rid}
+        items.update(self._dirty)
+        return [(uid, location) for uid, location in sorted(items.items()) if location is not None]
 
     # -------------------- 关闭二进制文件 --------------------
     def close(self):
-        self.db.close()
+        self.commit()
+        self._file.close()
+
+
+def _locked(method):
+    """持有服务锁调用方法: 定时提交的线程与调用方共用同一组文件"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 class ProductService:
-    """商品服务"""
+    """
+    商品服务
+    修改先记录在内存中 (脏块/脏页), 按组提交 (group commit): 未提交的修改达到 commit_size 个,
+    或最早的未提交修改已超过 commit_delay 秒时 (由定时器触发, 之后没有新的修改也会提交), 一次写入三个文件并各同步一次;
+    在 with service.batch(): 中的修改在退出时统一提交. 默认 commit_size=1, 即每次修改后立即提交
+    """
 
-    def __init__(self):
-        self.tree = BPlusTree()  # B+ 树
-        self.block_manager = BlockManager()  # 真实数据硬盘存储管理 {price: Product}
-        self.uid_index = UIDMap()  # uid price 索引硬盘存储管理 {uid: price}
+    def __init__(self, data_file=PRODUCTS_DATA_DIR, uid_file=UID_MAP, index_file=PRICE_INDEX,
+                 commit_size=1, commit_delay=None, cache_size=256, legacy_files=None):
+        """
+        :param data_file: 商品记录文件
+        :param uid_file: uid 索引文件 {uid: (price, rid)}
+        :param index_file: 价格 B+ 树的页文件 {price: 链头页号}
+        :param commit_size: 未提交的修改 (增/删/改) 达到该数量时提交
+        :param commit_delay: 最早的未提交修改超过该秒数时提交, None 表示不按时间提交
+        :param cache_size: 记录文件缓冲池的容量 (页数), 0 表示不缓存
+        :param legacy_files: (旧 shelve 商品存储, 旧 uid 索引) 的路径, 记录文件不存在而旧存储存在时先一次性转换
+        """
+        if legacy_files is not None:
+            migrate_legacy_store(*legacy_files, data_file, uid_file)
+        self.block_manager = BlockManager(data_file, cache_size)  # 真实数据硬盘存储管理 (记录文件)
+        self.uid_index = UIDMap(uid_file)  # uid 位置索引硬盘存储管理 {uid: (price, rid)}
         self._size = len(self.uid_index)
-        self._iter = self._reader()
-
-        # 加载本地数据
-        self._rebuild_index()
+        self._read_cursor = None  # read_next 的游标
+        self._read_done = False
+        self._commit_size = commit_size
+        self._commit_delay = commit_delay
+        self._pending = 0  # 未提交的修改数
+        self._pending_since = 0.0  # 最早的未提交修改的时间
+        self._batch_depth = 0  # batch() 的嵌套层数
+        self._timer = None  # commit_delay 的定时提交线程
+        # 文件读写共用同一个文件位置, 公开方法在内部持有此锁 (可重入);
+        # 调用方需要把几次调用作为一个整体时 (如视图先修改再读取) 也可以自行持有
+        self.lock = threading.RLock()
+
+        # B+ 树页文件: 打开只读文件头, 节点按需读入; 不存在、无效或与数据明显不符 (一方为空) 时重建
+        self.tree = BPlusTree(index_file)
+        if not self.tree.opened or (len(self.tree) == 0) != (self._size == 0):
+            self.tree.close()
+            os.remove(index_file)
+            self.tree = BPlusTree(index_file)
+            self._rebuild_index()
 
     def __len__(self):
         """返回数据量"""
@@ -153,109 +340,153 @@ class ProductService:
 
     # -------------------- nonpublic method --------------------
     def _rebuild_index(self):
-        """"读取磁盘上的所有价格块 {uid: price}, 插入 B+ 树"""
-        discovered = set()  # 记录所有 price (price 作为树的 key)
-        for uid, price in self.uid_index.all_items():
-            if price not in discovered:
-                self.tree.insert(price, True)
-                discovered.add(price)
-
-    def _reader(self):
-        for price, products in self.block_manager.db.items():
-            for product in products:
-                yield product
+        """"扫描记录文件中所有价格的链头页, 批量建立 B+ 树 {price: 链头页号} 并写入页文件 (只在页文件缺失或无效时调用)"""
+        self.tree.bulk_load(sorted(self.block_manager.heads()))
+        self.tree.flush()
+
+    def _written(self):
+        """记录一次修改, 按组提交策略决定是否提交"""
+        self._pending += 1
+        if self._pending == 1:
+            self._pending_since = time.monotonic()
+        if self._batch_depth:
+            return
+        if self._pending >= self._commit_size or \
+                (self._commit_delay is not None and time.monotonic() - self._pending_since >= self._commit_delay):
+            self.commit()
+        elif self._commit_delay is not None and self._timer is None:
+            # 之后即使没有新的修改, 也在 commit_delay 秒后提交; 不是守护线程, 解释器退出前会等它提交
+            self._timer = threading.Timer(self._commit_delay - (time.monotonic() - self._pending_since),
+                                          self._commit_due)
+            self._timer.start()
+
+    def _commit_due(self):
+        """定时器到期: 提交未写入的修改 (定时器已被 commit/close 取消或替换时不做任何事)"""
+        with self.lock:
+            if threading.current_thread() is self._timer:
+                self._timer = None
+                self.commit()
+
+    @staticmethod
+    def _validate(name=None, price=None):
+        """修改前检查名称和价格能否存入文件, 否则 ValueError (此时尚未做任何修改)"""
+        if name is not None and len(name.encode()) > MAX_NAME_BYTES:
+            raise ValueError(f'name longer than {MAX_NAME_BYTES} bytes')
+        if price is not None and (not isinstance(price, int) or not MIN_PRICE <= price <= MAX_PRICE):
+            raise ValueError(f'price must be an integer in [{MIN_PRICE}, {MAX_PRICE}]')
+
+    @staticmethod
+    def _encode_cursor(price, rid):
+        return base64.urlsafe_b64encode(_CURSOR.pack(price, rid)).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor):
+        try:
+            return _CURSOR.unpack(base64.urlsafe_b64decode(cursor.encode()))
+        except (ValueError, TypeError, AttributeError, struct.error):
+            raise ValueError(f'invalid cursor: {cursor!r}') from None
 
     # -------------------- 增/删/改/查 --------------------
+    @_locked
     def find_product_by_uid(self, uid):
         """根据 UID 查找商品, 返回 Product 类"""
-        price = self.uid_index.get(uid)  # 获取 price (key)
-        if price is None:  # 未找到
+        location = self.uid_index.get(uid)  # 获取 (price, rid)
+        if location is None:  # 未找到
             return None
 
-        # 找到索引 key = price 则进入真实数据文件读取 {price：[Product, ...]}
-        products = self.block_manager.read_block(price)
-        for product in products:  # O(price 桶中 Product 数)
-            if product.uid == uid:  # 找到符合 uid 的商品
-                return product
-        return None
+        # 进入真实数据文件, 只读取记录号为 rid 的一条记录
+        return self.block_manager.read_record(location[1])
 
+    def _append(self, product):
+        """把商品追加到其价格的页链中 (新价格或链头页改变时更新 B+ 树), 返回记录号"""
+        head = self.tree.search(product.price)  # 寻找是否有价格重合的商品链, 值为链头页号
+        rid, new_head = self.block_manager.append_record(head, product)
+        if new_head != head:  # 新价格插入 B+ 树 (创建新的 key = price), 或者链头页改变
+            self.tree.insert(product.price, new_head)
+        return rid
+
+    @_locked
     def add_product(self, name, price):
         """
         增加新商品, uid 自动添加
         :param name: 商品名
         :param price: 价格
-        :return:
+        :return: 新商品的 uid
+        :raise ValueError: 名称过长或价格超出范围
         """
+        self._validate(name, price)
         new_uid = self.uid_index.increment_uid()  # 获取新的 uid
-        self.uid_index.set(new_uid, price)  # 保存此时的 uid: price
-
         product = Product(new_uid, name, price)  # 创建商品 Product 类
+        rid = self._append(product)
 
-        if self.tree.search(price) is None:  # 寻找是否有价格重合的商品桶
-            self.tree.insert(price, True)  # 无则插入 B+ 树 (创建新的 key = price), value = True 占位
-
-        # 有则在二进制文件中直接添加 (即直接在 key = price 的桶中添加)
-        products = self.block_manager.read_block(price)
-        products.append(product)
-
-        # 最新结果保存进本地文件
-        self.block_manager.write_block(price, products)
+        # 保存此时的 uid: (price, rid)
+        self.uid_index.set(new_uid, price, rid)
         self._size += 1
+        self._written()
+        return new_uid
 
+    @_locked
     def remove_product(self, uid):
         """
         根据 uid 删除商品
         :param uid: 商品唯一编号
         :return: True or False
         """
-        price = self.uid_index.get(uid)  # 获取对应的 price
-        if price is None:  # 不存在则返回 False
+        location = self.uid_index.get(uid)  # 获取对应的 (price, rid)
+        if location is None:  # 不存在则返回 False
             return False
 
-        # 否则寻找 price 对应的数据块 {price: [Product, ...], ...}
-        products = self.block_manager.read_block(price)
-        # 除去 uid 商品的其他商品
-        other_products = [p for p in products if p.uid != uid]
-
-        if not other_products:  # 若删除 uid 后桶为空
-            self.block_manager.delete_block(price)  # 则删去整个 price 数据
+        # 删去记录号为 rid 的记录
+        price, rid = location
+        if self.block_manager.delete_record(self.tree.search(price), rid):  # 若删除 uid 后该价格没有商品
             self.tree.delete(price)  # 从树结构也删去 price
-        else:
-            # 否则, 直接保存其他商品即可
-            self.block_manager.write_block(price, other_products)
 
         # 索引对照表删去 {uid: price}
         self.uid_index.delete(uid)
+        self._size -= 1
+        self._written()
         return True
 
+    @_locked
     def update_product(self, uid, new_name=None, new_price=None):
         """
         更新 name 和 price
         :param uid: 商品 uid 不允许更改, 只用于查找
         :param new_name: 更新后的 name
         :param new_price: 更新后的 price
-        :return:
+        :return: True or False
+        :raise ValueError: 名称过长或价格超出范围 (商品保持不变)
         """
-        old_price = self.uid_index.get(uid)  # price 是键, 先查找
-        if old_price is None:
-            return False  # B+ 树结构中不存在 key = price
-
-        # 进入真实数据读取 price 的商品 {price: [Product, ...]}
-        products = self.block_manager.read_block(old_price)
-        for p in products:
-            if p.uid == uid:  # 找到需要被修改的商品
-                # 如果价格变化, 采用删除节点再重新插入节点的方法
-                if new_price is not None and new_price != old_price:
-                    self.remove_product(uid)
-                    self.add_product(new_name, new_price)
-                # 否则, 只更新名字 name
-                else:
-                    if new_name:
-                        p.name = new_name
-                        self.block_manager.write_block(old_price, products)
-                return True
-        return False
+        self._validate(new_name, new_price)
+        location = self.uid_index.get(uid)  # (price, rid), 先查找
+        if location is None:
+            return False  # 不存在该商品
+
+        # 进入真实数据只读取这一条记录
+        old_price, rid = location
+        product = self.block_manager.read_record(rid)
+        if product is None:
+            return False
+        if new_name:
+            product.name = new_name
+        # 如果价格变化, 以同一 uid 追加到新价格的页链, 成功后再从旧价格的页链删除记录
+        if new_price is not None and new_price != old_price:
+            product.price = new_price
+            self.uid_index.set(uid, new_price, self._append(product))
+            if self.block_manager.delete_record(self.tree.search(old_price), rid):
+                self.tree.delete(old_price)
+            self._written()
+        # 否则, 只更新名字 name
+        elif new_name:
+            if not self.block_manager.write_record(rid, product):
+                # 所在页放不下新名称: 追加到该价格的页链中, 再删除旧记录
+                new_rid = self._append(product)
+                self.block_manager.delete_record(self.tree.search(old_price), rid)
+                self.uid_index.set(uid, old_price, new_rid)
+            self._written()
+        return True
 
+    @_locked
     def find_products_in_price_range(self, min_price, max_price):
         """
         查找一定 price 间的商品数据
@@ -264,65 +495,175 @@ class ProductService:
         :return: 商品列表 [Product 类, ...]
         """
         # B+ 树的范围搜索
-        price_isLeaf_list = self.tree.search_range(min_price, max_price)
-        # [(key, value), ] ==> [(price, True/False 占位)]
+        price_head_list = self.tree.search_range(min_price, max_price)
+        # [(key, value), ] ==> [(price, 链头页号)]
 
         result = []
-        for price, _ in price_isLeaf_list:
-            # 读取真正数据, 商品桶 [Product, ...]
-            products = self.block_manager.read_block(price)
+        for price, head in price_head_list:
+            # 读取真正数据, 该价格页链中的商品 [Product, ...]
+            products = self.block_manager.read_block(head)
             result.extend(products)  # 直接并入 result
         return result
 
     # -------------------- 其他 --------------------
+    @_locked
+    def scan(self, cursor=None, batch_size=10, min_price=None, max_price=None, reverse=False):
+        """
+        游标分页: 按 (价格, 记录号) 升序返回下一批商品; 沿 B+ 树叶子链表从游标处继续, 每批 O(batch_size)
+        游标是不透明的字符串, 可以交给 HTTP 客户端在下一次请求时带回; 不同调用方的游标互不影响
+        :param cursor: 上一次返回的游标, None 表示从头开始
+        :param batch_size: 每批的商品数
+        :param min_price: 价格下限 (包含), None 表示不限
+        :param max_price: 价格上限 (包含), None 表示不限
+        :param reverse: True 则按降序 (价格最高的在前) 沿叶子的 prev 链表分页, 游标只能用于同一方向的下一批
+        :return: (商品列表 [Product, ...], 下一批的游标; 没有更多商品时为 None)
+        """
+        if batch_size < 1:
+            raise ValueError('batch_size must be positive')
+        start, end, after = min_price, max_price, 0
+        if cursor is not None:
+            price, rid = self._decode_cursor(cursor)
+            if reverse and (max_price is None or price <= max_price):
+                end, after = price, rid
+            elif not reverse and (min_price is None or price >= min_price):
+                start, after = price, rid
+        first = end if reverse else start  # 游标所在的价格, 只有这个价格从 after 处继续
+
+        def items():
+            for price, head in self.tree.items(start, end, reverse):  # 沿叶子链表按价格升序 (或降序)
+                yield from ((price, rid, product) for rid, product in
+                            self.block_manager.scan_block(head, after if price == first else 0, reverse))
+
+        batch, last = [], None
+        for price, rid, product in items():
+            if len(batch) == batch_size:  # 多取一个, 确认后面还有商品
+                return batch, self._encode_cursor(*last)
+            batch.append(product)
+            last = (price, rid)
+        return batch, None
+
     def find_n_products(self, n):
-        """返回 n 个商品, 用于展示 (不推荐, 建议直接从二进制数据库文件中读取)"""
-        results = []
-        node = self.tree.root  # 从根节点开始搜索
-
-        while not node.is_leaf:  # 数据只存储在叶子节点上
-            node = node.children[0]
-
-        while node and len(results) < n:  # n 个
-            for price in node.keys:  # 找到对应的数据索引 price (key)
-                products = self.block_manager.read_block(price)  # 读取数据
-                for p in products:
-                    results.append(p)  # 将真正的产品数据加入 result
-                    if len(results) >= n:
-                        break
-                if len(results) >= n:
-                    break
-            node = node.next  # 若不足继续前往下个节点 (leaf node 链式相连)
-        return results
+        """返回价格最低的 n 个商品, 用于展示 (分页请用 scan)"""
+        if n <= 0:
+            return []
+        return self.scan(None, n)[0]
 
+    @_locked
     def read_next(self, batch_size=10):
-        """不建议使用, 可以考虑将 uid price 对照表存储为 csv 文件, 按照跳行的方式读取任意 [m, n] 行区间的数据"""
-        batch = []
-        for _ in range(batch_size):
-            try:
-                batch.append(next(self._iter))
-            except StopIteration:
-                break  # 数据读完
+        """按价格顺序读取下一批商品; 游标保存在服务中, 所有调用方共享, 需要各自分页时使用 scan"""
+        if self._read_done:
+            return []
+        batch, self._read_cursor = self.scan(self._read_cursor, batch_size)
+        self._read_done = self._read_cursor is None
         return batch
 
     def __iter__(self):
-        """迭代器获取商品"""
-        node = self.tree.root  # 从根节点开始搜索
-
-        while not node.is_leaf:  # 数据只存储在叶子节点上
-            node = node.children[0]
-
-        while node:  # n 个
-            for price in node.keys:  # 找到对应的数据索引 price (key)
-                products = self.block_manager.read_block(price)  # 读取数据
-                for p in products:
-                    yield p
-            node = node.next  # 继续前往下个节点
-
+        """迭代器获取商品, 按价格升序; 逐批 scan, 每批持有一次锁, 迭代期间不阻塞其他线程"""
+        batch, cursor = self.scan(None, 500)
+        while True:
+            yield from batch
+            if cursor is None:
+                return
+            batch, cursor = self.scan(cursor, 500)
+
+    @_locked
+    def cache_stats(self):
+        """记录文件缓冲池的统计 (命中率、内存占用等), 用于确定缓冲池容量"""
+        return self.block_manager.cache_stats()
+
+    # -------------------- 提交 --------------------
+    @contextmanager
+    def batch(self):
+        """
+        批量修改: with service.batch(): ... 内的所有修改在退出时一起提交 (可嵌套, 最外层退出时提交)
+        只合并写盘, 不提供回滚: 出现异常时已做的修改同样会被提交
+        """
+        with self.lock:  # 整个批量期间持有锁, 定时器不会在中途提交
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self.commit()
+
+    @_locked
+    def commit(self):
+        """
+        提交所有未写入的修改, 每个文件同步一次
+        顺序: uid 索引 -> 价格 B+ 树 -> 记录文件; 新商品的 uid 先于商品落盘, 崩溃后不会重复分配 uid,
+        新价格 (链头页) 先于记录进入 B+ 树, 范围查询不会漏掉已落盘的商品
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        self.uid_index.commit()
+        self.tree.flush()
+        self.block_manager.commit()
+        self._pending = 0
+
+    @_locked
     def close(self):
-        """关闭 I/O 读写"""
+        """关闭 I/O 读写 (先提交未写入的修改)"""
+        self.commit()
         self.block_manager.close()
         self.uid_index.close()
+        self.tree.close()
+
+
+# -------------------- 旧版本存储的转换 --------------------
+class _LegacyUnpickler(pickle.Unpickler):
+    """旧存储中的 Product 按写入时的模块名序列化 (product_service_plus / core.services... / __main__)"""
+
+    def find_class(self, module, name):
+        if name == 'Product':
+            return Product
+        return super().find_class(module, name)
+
+
+def migrate_legacy_store(legacy_data=LEGACY_PRODUCTS_DATA, legacy_uid=LEGACY_UID_MAP,
+                         data_file=PRODUCTS_DATA_DIR, uid_file=UID_MAP):
+    """
+    把旧版本的 shelve 存储一次性转换为记录文件和 uid 索引文件 (价格 B+ 树在服务打开时由记录文件重建)
+    记录文件已存在或没有旧存储时不做任何事; 先写入临时文件, 记录文件最后改名, 作为转换完成的标志,
+    中途失败下次会重新转换. 旧文件保留, 确认无误后可手动删除
+    :param legacy_data: 旧商品存储 {str(price): [Product, ...]}
+    :param legacy_uid: 旧 uid 索引 {str(uid): price}, 只用于恢复最大 uid
+    :return: 转换的商品数, 未转换返回 None
+    """
+    if os.path.exists(data_file) or not dbm.whichdb(legacy_data):
+        return None
+    tmp_data, tmp_uid = data_file + '.migrating', uid_file + '.migrating'
+    for path in (tmp_data, tmp_uid):
+        if os.path.exists(path):
+            os.remove(path)
+
+    block_manager = BlockManager(tmp_data, cache_size=0)
+    uid_index = UIDMap(tmp_uid)
+    count = 0
+    with dbm.open(legacy_data, 'r') as db:
+        for key in db.keys():
+            head = None
+            for old in _LegacyUnpickler(io.BytesIO(db[key])).load():
+                product = Product(int(old.uid), old.name, int(old.price))
+                ProductService._validate(product.name, product.price)
+                rid, head = block_manager.append_record(head, product)
+                uid_index.set(product.uid, product.price, rid)
+                uid_index.reserve_uid(product.uid)
+                count += 1
+    if dbm.whichdb(legacy_uid):
+        with dbm.open(legacy_uid, 'r') as db:
+            for key in db.keys():  # 已删除商品的 uid 不再分配
+                uid_index.reserve_uid(int(key))
+    block_manager.close()
+    uid_index.close()
+
+    os.replace(tmp_uid, uid_file)
+    os.replace(tmp_data, data_file)
+    logger.info("migrated %d products from legacy store %s to %s", count, legacy_data, data_file)
+    return count
 
 
 # -------------------- 生成测试数据 --------------------
@@ -336,13 +677,331 @@ def random_price(start=1, end=1000):
     return random.randint(start, end)
 
 
+def write_random_store(data_file, uid_file, n, end=1000):
+    """直接写入 n 个随机商品的记录文件与 uid 索引 (批量写入, 不逐条同步), 用于性能测试"""
+    block_manager = BlockManager(data_file, cache_size=0)
+    uid_index = UIDMap(uid_file)
+    heads = {}  # {price: 链头页号}
+    for _ in range(n):
+        product = Product(uid_index.increment_uid(), random_name(), random_price(1, end))
+        rid, heads[product.price] = block_manager.append_record(heads.get(product.price), product)
+        uid_index.set(product.uid, product.price, rid)
+    block_manager.close()
+    uid_index.close()
+
+
+# -------------------- 性能测试 --------------------
+def benchmark_open(n=100000, end=1000):
+    """
+    启动耗时: 第一次打开扫描记录文件重建 B+ 树并写入页文件, 之后打开只读各文件的文件头;
+    另外单独给出价格索引部分的耗时
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        files = [os.path.join(tmp_dir, name) for name in ('products', 'uid_price', 'price_index.bpt')]
+        write_random_store(files[0], files[1], n, end)
+        print(f"N = {n}, {end} prices")
+        for label in ('First open (rebuild)', 'Reopen (page file)'):
+            start = time.time()
+            service = ProductService(*files)
+            print(f"{label}: {(time.time() - start) * 1000:.3f}ms")
+            service.close()
+
+        service = ProductService(*files)
+        page_file_tree = service.tree
+        start = time.time()
+        service.tree = BPlusTree()
+        service._rebuild_index()
+        print(f"Price index only, rebuild: {(time.time() - start) * 1000:.3f}ms")
+        start = time.time()
+        tree = BPlusTree(files[2])
+        print(f"Price index only, open page file: {(time.time() - start) * 1000:.3f}ms "
+              f"(nodes in memory: {len(tree._nodes)})")
+        tree.close()
+        service.tree = page_file_tree
+        service.close()
+
+
+def benchmark_add(n=100000, m=200, end=1000):
+    """
+    在已有 n 个商品的库中新增 m 个商品的平均耗时:
+    每次提交 (默认) / commit_size=64 的组提交 / 整体放在一个 batch() 中
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        files = [os.path.join(tmp_dir, name) for name in ('products', 'uid_price', 'price_index.bpt')]
+        write_random_store(files[0], files[1], n, end)
+        print(f"N = {n}, add {m}")
+        for label, kwargs, batched in (('Commit every add', {}, False),
+                                       ('Group commit (64)', {'commit_size': 64}, False),
+                                       ('One batch', {}, True)):
+            service = ProductService(*files, **kwargs)
+            start = time.time()
+            if batched:
+                with service.batch():
+                    for _ in range(m):
+                        service.add_product(random_name(), random_price(1, end))
+            else:
+                for _ in range(m):
+                    service.add_product(random_name(), random_price(1, end))
+                service.commit()
+            print(f"{label}: {(time.time() - start) / m * 1000:.3f}ms per add")
+            service.close()
+
+
+def _tree_shape(tree):
+    """B+ 树的高度和节点数"""
+    height, nodes, level = 0, 0, [tree.root]
+    while level:
+        height += 1
+        nodes += len(level)
+        level = [tree._child(node, i) for node in level if not node.is_leaf for i in range(len(node.children))]
+    return height, nodes
+
+
+def benchmark_build(n=100000):
+    """价格索引建树: 阶数 3 / 默认阶数逐个插入 vs 批量建树 (n 个不同价格, 随机顺序插入)"""
+    prices = random.sample(range(1, n * 10), n)
+    print(f"N = {n}")
+    for label, order, bulk in (('Insert, order 3', 3, False), (f'Insert, order {BPlusTree().order}', None, False),
+                               (f'bulk_load, order {BPlusTree().order}', None, True)):
+        tree = BPlusTree() if order is None else BPlusTree(order=order)
+        start = time.time()
+        if bulk:
+            tree.bulk_load([(price, True) for price in sorted(prices)])
+        else:
+            for price in prices:
+                tree.insert(price, True)
+        elapsed = time.time() - start
+        height, nodes = _tree_shape(tree)
+        print(f"{label}: {elapsed:.3f}s, height {height}, {nodes} nodes")
+
+
+def _linear_search(tree, key):
+    """对照: 节点内逐个比较的查找 (改为二分之前的做法)"""
+    node = tree.root
+    while not node.is_leaf:
+        i = 0
+        while i < len(node.keys) and key >= node.keys[i]:
+            i += 1
+        node = tree._child(node, i)
+    for i, k in enumerate(node.keys):
+        if k == key:
+            return node.children[i]
+    return None
+
+
+def _linear_range(tree, start, end):
+    """对照: 节点内逐个比较, 从叶子开头逐个跳过小于 start 的键 (改为二分之前的做法)"""
+    node = tree.root
+    while not node.is_leaf:
+        i = 0
+        while i < len(node.keys) and start >= node.keys[i]:
+            i += 1
+        node = tree._child(node, i)
+    results = []
+    while node:
+        for i, k in enumerate(node.keys):
+            if k < start:
+                continue
+            if k > end:
+                return results
+            results.append((k, node.children[i]))
+        node = tree._next(node)
+    return results
+
+
+def benchmark_fanout(n=100000, m=20000, orders=(4, 8, 16, 32, 64, 128, 256, 512)):
+    """
+    不同阶数下 m 次单点查找与 m / 10 次范围查询 (每次约 20 个键) 的平均耗时: 节点内二分 vs 逐个比较
+    树由 n 个键批量建立
+    """
+    rng = random.Random(0)
+    keys = list(range(0, n * 2, 2))
+    queries = [rng.randrange(n * 2) for _ in range(m)]
+    ranges = [(q, q + 40) for q in queries[:m // 10]]
+    print(f"N = {n}")
+    for order in orders:
+        tree = BPlusTree(order=order)
+        tree.bulk_load([(key, key) for key in keys])
+        line = [f"order {order:>3}, height {_tree_shape(tree)[0]}"]
+        for label, search in (('bisect', tree.search), ('linear', lambda key: _linear_search(tree, key))):
+            start = time.perf_counter()
+            for key in queries:
+                search(key)
+            line.append(f"{label} {(time.perf_counter() - start) / m * 1e6:.2f}us")
+        for label, search_range in (('range bisect', tree.search_range),
+                                    ('range linear', lambda lo, hi: _linear_range(tree, lo, hi))):
+            start = time.perf_counter()
+            for lo, hi in ranges:
+                search_range(lo, hi)
+            line.append(f"{label} {(time.perf_counter() - start) / len(ranges) * 1e6:.2f}us")
+        print(", ".join(line))
+
+
+def benchmark_cache(n=100000, m=2000, end=1000):
+    """
+    按 uid 查找 m 次的平均耗时, 有/无缓冲池; 80% 的查询落在 20 个热门价格上
+    """
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        files = [os.path.join(tmp_dir, name) for name in ('products', 'uid_price', 'price_index.bpt')]
+        write_random_store(files[0], files[1], n, end)
+        service = ProductService(*files)
+        by_price = {}
+        for uid, (price, rid) in service.uid_index.all_items():
+            by_price.setdefault(price, []).append(uid)
+        service.close()
+        prices = sorted(by_price)
+        hot = rng.sample(prices, 20)
+        uids = [rng.choice(by_price[rng.choice(hot if rng.random() < 0.8 else prices)]) for _ in range(m)]
+
+        print(f"N = {n}, {m} lookups")
+        for cache_size in (0, 64, 256):
+            service = ProductService(*files, cache_size=cache_size)
+            start = time.time()
+            for uid in uids:
+                service.find_product_by_uid(uid)
+            elapsed = (time.time() - start) / m * 1000
+            stats = service.cache_stats()
+            extra = f", hit ratio {stats['hit_ratio']:.2f}, {stats['bytes'] / 2 ** 20:.1f}MiB" if cache_size else ""
+            print(f"Cache size {cache_size}: {elapsed:.3f}ms per lookup{extra}")
+            service.close()
+
+
+def benchmark_point(n=100000, m=1000, end=10):
+    """
+    热门价格上的单点操作: n 个商品只有 end 个价格 (每个价格约 n / end 个商品),
+    按 uid 查找 / 改名 m 次的平均耗时, 无缓冲池与默认缓冲池
+    """
+    rng = random.Random(0)
+    uids = [rng.randint(1, n) for _ in range(m)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        files = [os.path.join(tmp_dir, name) for name in ('products', 'uid_price', 'price_index.bpt')]
+        write_random_store(files[0], files[1], n, end)
+        print(f"N = {n}, {end} prices")
+        for cache_size in (0, 256):
+            service = ProductService(*files, commit_size=m, cache_size=cache_size)
+            start = time.time()
+            for uid in uids:
+                service.find_product_by_uid(uid)
+            lookup = (time.time() - start) / m * 1000
+            start = time.time()
+            for uid in uids:
+                service.update_product(uid, new_name=random_name())
+            rename = (time.time() - start) / m * 1000
+            print(f"Cache size {cache_size}: {lookup:.3f}ms per lookup, {rename:.3f}ms per rename (uncommitted)")
+            service.close()
+
+
+def benchmark_store(n=100000, m=200, end=10):
+    """
+    商品数据文件的大小, 以及在每个价格约 n / end 个商品时新增 m 个商品的平均耗时 (每次新增提交一次),
+    其中写商品数据文件的耗时
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        files = [os.path.join(tmp_dir, name) for name in ('products', 'uid_price', 'price_index.bpt')]
+        write_random_store(files[0], files[1], n, end)
+        size = sum(os.path.getsize(os.path.join(tmp_dir, name)) for name in os.listdir(tmp_dir)
+                   if name.startswith('products'))
+        print(f"N = {n}, {end} prices, data file {size / 2 ** 20:.2f}MiB ({size / n:.1f} bytes per product)")
+        service = ProductService(*files)
+        commit, spent = service.block_manager.commit, [0.0]
+
+        def timed_commit():  # 单独统计写商品数据文件的耗时 (提交时 uid 索引的 dbm 同步耗时更多)
+            t = time.time()
+            commit()
+            spent[0] += time.time() - t
+
+        service.block_manager.commit = timed_commit
+        start = time.time()
+        for _ in range(m):
+            service.add_product(random_name(), random_price(1, end))
+        print(f"Add (commit every add): {(time.time() - start) / m * 1000:.3f}ms per add, "
+              f"writing data file {spent[0] / m * 1000:.3f}ms")
+        service.close()
+
+
+def benchmark_scan(n=100000, batch_size=100, end=1000):
+    """
+    分页读取: 第 k 页的耗时, 游标 scan vs 从头读取再跳过前 k 页 (find_n_products 再切片)
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        files = [os.path.join(tmp_dir, name) for name in ('products', 'uid_price', 'price_index.bpt')]
+        write_random_store(files[0], files[1], n, end)
+        service = ProductService(*files)
+        cursors, cursor = [None], None
+        while True:  # 预先记下每一页的游标
+            batch, cursor = service.scan(cursor, batch_size)
+            if cursor is None:
+                break
+            cursors.append(cursor)
+        print(f"N = {n}, {len(cursors)} pages of {batch_size}")
+        for page in (0, len(cursors) // 2, len(cursors) - 1):
+            start = time.perf_counter()
+            service.scan(cursors[page], batch_size)
+            scan_time = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            service.find_n_products((page + 1) * batch_size)[page * batch_size:]
+            skip_time = (time.perf_counter() - start) * 1000
+            print(f"Page {page}: scan {scan_time:.3f}ms, skip {skip_time:.3f}ms")
+        service.close()
+
+
+def benchmark_delete(n=100000, m=20000, orders=(3, 64)):
+    """
+    价格索引删除: n 个键批量建树后随机删除 m 个键的平均耗时; 一半删除的是叶子的最小键 (需要修复分隔键)
+    """
+    rng = random.Random(0)
+    keys = list(range(0, n * 2, 2))
+    print(f"N = {n}, delete {m}")
+    for order in orders:
+        tree = BPlusTree(order=order)
+        tree.bulk_load([(key, True) for key in keys])
+        leaf_mins, node = [], tree.root
+        while not node.is_leaf:
+            node = tree._child(node, 0)
+        while node:
+            leaf_mins.append(node.keys[0])
+            node = tree._next(node)
+        victims = rng.sample(leaf_mins, min(m // 2, len(leaf_mins)))
+        victims += rng.sample(sorted(set(keys) - set(victims)), m - len(victims))
+        rng.shuffle(victims)
+        start = time.perf_counter()
+        for key in victims:
+            tree.delete(key)
+        elapsed = (time.perf_counter() - start) / m * 1e6
+        print(f"order {order:>3}: {elapsed:.2f}us per delete, {len(tree)} left")
+
+
+def benchmark_reverse(n=100000, batch_size=20, end=1000):
+    """
+    价格最高的一页 (降序): 沿 prev 链表的反向 scan vs 取出整段 (升序) 再反转
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        files = [os.path.join(tmp_dir, name) for name in ('products', 'uid_price', 'price_index.bpt')]
+        write_random_store(files[0], files[1], n, end)
+        service = ProductService(*files)
+        print(f"N = {n}, top {batch_size}")
+        for low in (0, end // 2):
+            start = time.perf_counter()
+            top = service.scan(None, batch_size, low, end, reverse=True)[0]
+            scan_time = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            products = service.find_products_in_price_range(low, end)
+            products.sort(key=lambda p: p.price, reverse=True)
+            materialised_time = (time.perf_counter() - start) * 1000
+            assert [p.price for p in top] == [p.price for p in products[:batch_size]]
+            print(f"Prices {low}-{end} ({len(products)} products): reverse scan {scan_time:.3f}ms, "
+                  f"materialise and reverse {materialised_time:.3f}ms")
+        service.close()
+
+
 if __name__ == '__main__':
     """
     All Data: 101132
     Add one time: 0.02136499881744385
     Search one time: 0.00011587142944335938
     """
-    product_service = ProductService()
+    product_service = ProductService(legacy_files=(LEGACY_PRODUCTS_DATA, LEGACY_UID_MAP))
     # print(product_service.find_products_in_price_range(0, 2))
 
     N = 10
@@ -377,8 +1036,146 @@ if __name__ == '__main__':
 
     product_service.close()
 
+    """
+    启动耗时: 价格索引改为 B+ 树页文件后, 打开只读文件头; 剩余的耗时来自 UIDMap 打开时扫描所有 uid
+    N = 100000, 1000 prices
+    First open (rebuild): 3.123s
+    Reopen (page file): 1.610s
+    Price index only, rebuild: 1.309s
+    Price index only, open page file: 0.170ms (nodes in memory: 1)
+    UIDMap 改为以 uid 为下标的定长条目文件, 文件头记录最大 uid、商品数和版本, 打开只读文件头 O(1)
+    (之前的 shelve 为 dbm.dumb, 打开时解析整个键目录约 2.1s, 再扫描所有 uid 约 0.06s):
+    First open (rebuild): 7.181ms
+    Reopen (page file): 0.161ms
+    Price index only, rebuild: 6.312ms
+    Price index only, open page file: 0.085ms (nodes in memory: 1)
+    """
+    benchmark_open(100000)
+
+    """
+    新增商品 (shelve 为 dbm.dumb, 每次同步都重写整个键目录, 所以单次提交的代价随库大小增长);
+    之前 writeback=True, 每次新增同步两次, 且每次同步重写所有读过的条目
+    N = 100000, add 200
+    Before (writeback, sync per write): 126.883ms per add
+    Commit every add: 108.017ms per add
+    Group commit (64): 2.865ms per add
+    One batch: 1.219ms per add
+    UIDMap 改为定长条目文件后, 提交只写修改的条目和文件头:
+    Commit every add: 0.031ms per add
+    Group commit (64): 0.018ms per add
+    One batch: 0.017ms per add
+    """
+    benchmark_add(100000, 200)
+
+    """
+    价格块缓冲池 (每个价格约 100 个商品; 查找时 uid 索引仍读 dbm, 剩余耗时主要在此)
+    N = 100000, 2000 lookups
+    Cache size 0: 0.151ms per lookup
+    Cache size 64: 0.052ms per lookup, hit ratio 0.80, 1.3MiB
+    Cache size 256: 0.067ms per lookup, hit ratio 0.82, 5.4MiB
+    """
+    benchmark_cache(100000)
+
+    """
+    热门价格上的单点操作 (每个价格约 10000 个商品). 之前价格块整体序列化为 [Product, ...],
+    查找要反序列化整个块再逐个比较 uid; 现在 UIDMap 保存 (price, slot), 每个商品单独编码, 只解码一条记录
+    (无缓冲池时仍要从 dbm 读出整个块的记录列表, 剩余耗时主要在此)
+    N = 100000, 10 prices
+    Before, cache size 0: 17.611ms per lookup, 0.873ms per rename (uncommitted)
+    Before, cache size 256: 0.689ms per lookup, 0.660ms per rename (uncommitted)
+    Cache size 0: 0.540ms per lookup, 0.045ms per rename (uncommitted)
+    Cache size 256: 0.032ms per lookup, 0.041ms per rename (uncommitted)
+    """
+    benchmark_point(100000)
+
+    """
+    商品数据文件: 定长记录的分槽页 vs shelve 中的价格块 (dbm.dumb, 值按 512 字节对齐).
+    新增只写链头一页, 写数据文件的耗时不再随价格块大小增长 (整体耗时主要是 uid 索引的 dbm 同步);
+    价格很多而每个价格商品很少时, 每条页链的最后一页未写满, 文件略大
+    Before (pickled [Product, ...]):
+    N = 100000, 10 prices, data file 3.31MiB (34.7 bytes per product)
+    Add (commit every add): 145.660ms per add, writing data file 17.759ms
+    N = 100000, 1000 prices, data file 3.72MiB (39.0 bytes per product)
+    Add (commit every add): 126.033ms per add, writing data file 1.884ms
+    Before (per-product pickled records in the block):
+    N = 100000, 10 prices, data file 3.41MiB (35.7 bytes per product)
+    Add (commit every add): 115.153ms per add, writing data file 1.843ms
+    N = 100000, 1000 prices, data file 3.77MiB (39.6 bytes per product)
+    Add (commit every add): 116.321ms per add, writing data file 1.583ms
+    Record store:
+    N = 100000, 10 prices, data file 2.15MiB (22.5 bytes per product)
+    Add (commit every add): 121.173ms per add, writing data file 0.028ms
+    N = 100000, 1000 prices, data file 3.91MiB (41.0 bytes per product)
+    Add (commit every add): 118.805ms per add, writing data file 0.027ms
+    """
+    benchmark_store(100000)
+    benchmark_store(100000, 200, 1000)
+
+    """
+    价格索引建树 (阶数由 3 改为默认 64; 批量建树自底向上 O(n), 逐个插入不再先 search 一遍)
+    N = 100000
+    Insert, order 3: 1.486s, height 14, 82493 nodes
+    Insert, order 64: 0.714s, height 3, 2307 nodes
+    bulk_load, order 64: 0.106s, height 3, 1614 nodes
+    """
+    benchmark_build(100000)
+
+    """
+    节点内二分查找 vs 逐个比较 (单点查找; 范围查询每次约 20 个键). 逐个比较的耗时随阶数线性增长,
+    二分基本不随阶数变化; 阶数很小时叶子很短, 范围查询按叶子切片反而略慢
+    N = 100000
+    order   4, height 9, bisect 3.04us, linear 5.46us, range bisect 15.70us, range linear 9.58us
+    order   8, height 6, bisect 1.88us, linear 3.11us, range bisect 8.54us, range linear 8.30us
+    order  16, height 5, bisect 1.77us, linear 3.49us, range bisect 8.03us, range linear 8.94us
+    order  32, height 4, bisect 2.26us, linear 4.91us, range bisect 6.08us, range linear 8.27us
+    order  64, height 3, bisect 1.79us, linear 6.41us, range bisect 5.09us, range linear 9.16us
+    order 128, height 3, bisect 1.48us, linear 9.15us, range bisect 4.87us, range linear 11.19us
+    order 256, height 3, bisect 1.56us, linear 15.25us, range bisect 4.89us, range linear 14.65us
+    order 512, height 2, bisect 1.42us, linear 24.20us, range bisect 5.01us, range linear 20.54us
+    """
+    benchmark_fanout(100000)
+
+    """
+    价格索引删除 (一半删除叶子的最小键). 之前修复分隔键时 _find_parent 从根开始遍历整棵树查找父节点 O(n),
+    现在在递归返回途中修复, 递归调用栈就是根到叶子的路径 O(log n)
+    N = 100000, delete 2000
+    Before (_find_parent), order   3: 38315.52us per delete
+    Before (_find_parent), order  64: 375.57us per delete
+    order   3: 8.57us per delete, 98000 left
+    order  64: 2.32us per delete, 98000 left
+    """
+    benchmark_delete(100000, 2000)
+
+    """
+    游标分页 scan: 每页 O(batch_size), 不随页码增长; 从头读取再跳过前 k 页则随 k 线性增长
+    (每个价格约 10000 个商品时, 定位起点要读该价格页链中所有页的页头, 约 0.5ms)
+    N = 100000, 1000 pages of 100
+    Page 0: scan 0.122ms, skip 0.114ms
+    Page 500: scan 0.136ms, skip 90.152ms
+    Page 999: scan 0.205ms, skip 274.954ms
+    N = 100000, 1000 pages of 100 (10 prices)
+    Page 0: scan 0.662ms, skip 0.272ms
+    Page 500: scan 0.577ms, skip 147.217ms
+    Page 999: scan 0.760ms, skip 271.650ms
+    """
+    benchmark_scan(100000)
+    benchmark_scan(100000, 100, 10)
+
+    """
+    价格最高的一页: B+ 树叶子层加入 prev 链表后, 反向 scan 从最大的价格沿 prev 向左, 只读一页所需的商品;
+    之前只能沿 next 正向取出整段价格区间再反转
+    N = 100000, top 20
+    Prices 0-1000 (100000 products): reverse scan 0.167ms, materialise and reverse 209.958ms
+    Prices 500-1000 (49976 products): reverse scan 0.171ms, materialise and reverse 148.122ms
+    N = 100000, top 20 (10 prices)
+    Prices 0-10 (100000 products): reverse scan 0.321ms, materialise and reverse 171.008ms
+    Prices 5-10 (59930 products): reverse scan 0.233ms, materialise and reverse 141.424ms
+    """
+    benchmark_reverse(100000)
+    benchmark_reverse(100000, 20, 10)
+
     """
     ```bash
-    hexdump -C 05products_plus.db | less
+    hexdump -C 05products_plus.rec | less
     ```
     """
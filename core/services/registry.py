@@ -0,0 +1,127 @@
+import time
+import logging
+import threading
+
+try:
+    from .task_service import TaskService
+    from .task_service_plus import TaskServicePlus
+    from .client_service import ClientService
+    from .product_service import ProductService
+except ImportError:
+    from task_service import TaskService
+    from task_service_plus import TaskServicePlus
+    from client_service import ClientService
+    from product_service import ProductService
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceRegistry:
+    """
+    服务注册表: 按名称登记构造函数, 第一次使用时才构造服务 (读取数据), 之后一直复用同一个实例
+    这样导入视图模块不再加载任何数据, 与服务无关的命令 (migrate, check, 测试等) 启动几乎不花时间;
+    可选在后台线程中预热, 第一个请求不必等待加载. 每个服务的加载耗时都会记录下来
+    """
+
+    def __init__(self):
+        self._factories = {}  # {name: 构造函数}
+        self._instances = {}  # {name: 服务实例}
+        self._load_times = {}  # {name: 加载耗时 (秒)}
+        self._locks = {}  # {name: Lock}, 同一服务只构造一次, 不同服务互不阻塞
+
+    def register(self, name, factory):
+        """
+        登记服务, 不会立即构造
+        :param name: 服务名称
+        :param factory: 无参数的构造函数, 返回服务实例
+        """
+        self._factories[name] = factory
+        self._locks[name] = threading.Lock()
+
+    def __contains__(self, name):
+        return name in self._factories
+
+    def names(self):
+        """所有登记的服务名称"""
+        return list(self._factories)
+
+    def loaded(self, name):
+        """服务是否已经构造"""
+        return name in self._instances
+
+    def get(self, name):
+        """
+        返回服务实例, 第一次调用时构造; 多个线程同时请求同一服务时只构造一次, 其余线程等待其完成
+        :param name: 服务名称, 未登记则 KeyError
+        """
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        if name not in self._factories:
+            raise KeyError(name)
+        with self._locks[name]:
+            instance = self._instances.get(name)
+            if instance is None:  # 加锁后再检查一次, 可能已被其他线程 (如预热线程) 构造
+                start = time.perf_counter()
+                instance = self._factories[name]()
+                self._load_times[name] = time.perf_counter() - start
+                self._instances[name] = instance
+                logger.info("service %r loaded in %.3fs", name, self._load_times[name])
+        return instance
+
+    def load_times(self):
+        """已构造服务的加载耗时 {name: 秒}"""
+        return dict(self._load_times)
+
+    def prewarm(self, names=None, background=True):
+        """
+        预先构造服务
+        :param names: 服务名称列表, None 表示全部
+        :param background: True 则在后台 (守护) 线程中依次构造并立即返回该线程, 否则同步构造后返回 None
+        """
+        names = self.names() if names is None else list(names)
+        for name in names:
+            if name not in self._factories:
+                raise KeyError(name)
+        if not background:
+            for name in names:
+                self.get(name)
+            return None
+        thread = threading.Thread(target=self._prewarm, args=(names,), name='service-prewarm', daemon=True)
+        thread.start()
+        return thread
+
+    def _prewarm(self, names):
+        for name in names:
+            try:
+                self.get(name)
+            except Exception:  # 预热失败不影响进程, 请求到来时会重试并抛出异常
+                logger.exception("prewarming service %r failed", name)
+
+    def reset(self, name=None):
+        """丢弃已构造的实例 (不调用其 close), 下次使用时重新构造; name 为 None 则全部丢弃"""
+        names = self.names() if name is None else [name]
+        for name in names:
+            with self._locks[name]:
+                self._instances.pop(name, None)
+                self._load_times.pop(name, None)
+
+
+# 全局注册表, 视图通过它获取服务
+registry = ServiceRegistry()
+registry.register('tasks', TaskService)
+registry.register('tasks_plus', TaskServicePlus)
+registry.register('clients', ClientService)
+registry.register('products', ProductService)
+
+
+def _products_plus():
+    """磁盘版商品服务; 该模块导入时会调用 django.setup(), 因此在第一次使用时才导入"""
+    try:
+        from .product_service_plus import ProductService as ProductServicePlus, LEGACY_PRODUCTS_DATA, LEGACY_UID_MAP
+    except ImportError:
+        from product_service_plus import ProductService as ProductServicePlus, LEGACY_PRODUCTS_DATA, LEGACY_UID_MAP
+    return ProductServicePlus(legacy_files=(LEGACY_PRODUCTS_DATA, LEGACY_UID_MAP))  # 旧版本的 shelve 存储先转换
+
+
+registry.register('products_plus', _products_plus)
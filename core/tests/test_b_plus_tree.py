@@ -0,0 +1,185 @@
+import os
+import random
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+
+from core.services.data_structures import BPlusTree
+
+
+class BPlusTreeTests(SimpleTestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.file = os.path.join(self.dir, 'index.bpt')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def run_random_ops(self, tree, rng, expected, steps, reopen=None):
+        for step in range(steps):
+            key = rng.randint(0, 400)
+            if rng.random() < 0.55:
+                tree.insert(key, key * 2)
+                expected[key] = key * 2
+            else:
+                self.assertEqual(tree.delete(key), key in expected)
+                expected.pop(key, None)
+            if reopen and step % 300 == 0:
+                tree = reopen(tree)
+            self.assertEqual(len(tree), len(expected))
+        self.assertEqual(list(tree.items()), sorted(expected.items()))
+        self.assertEqual(list(tree), sorted(expected))
+        for key in range(0, 401, 7):
+            self.assertEqual(tree.search(key), expected.get(key))
+        self.assertEqual([k for k, _ in tree.search_range(100, 200)], sorted(k for k in expected if 100 <= k <= 200))
+        self.assertEqual(list(tree.items(100, 200)), tree.search_range(100, 200))
+        self.assertEqual(list(tree.items(start=333)), [(k, v) for k, v in sorted(expected.items()) if k >= 333])
+        self.assertEqual(list(tree.items(end=50)), [(k, v) for k, v in sorted(expected.items()) if k <= 50])
+        # 沿 prev 链表降序
+        self.assertEqual(list(reversed(tree)), sorted(expected, reverse=True))
+        self.assertEqual(tree.search_range(100, 200, reverse=True), tree.search_range(100, 200)[::-1])
+        self.assertEqual(list(tree.items(start=333, reverse=True)), list(tree.items(start=333))[::-1])
+        self.assertEqual(list(tree.items(end=50, reverse=True)), list(tree.items(end=50))[::-1])
+        self.check_shape(tree)
+        return tree
+
+    def test_in_memory(self):
+        for order in (3, 4, 64):
+            self.run_random_ops(BPlusTree(order=order), random.Random(61), {}, 3000)
+
+    def test_insert_existing_key_updates(self):
+        tree = BPlusTree(order=3)
+        for key in range(10):
+            tree.insert(key, 'old')
+        tree.insert(4, 'new')
+        self.assertEqual(len(tree), 10)
+        self.assertEqual(tree.search(4), 'new')
+        with self.assertRaises(ValueError):
+            BPlusTree(order=2)
+
+    def test_search_range_bounds(self):
+        tree = BPlusTree(order=3)
+        tree.bulk_load([(key, str(key)) for key in range(0, 100, 3)])
+        self.assertEqual([k for k, _ in tree.search_range(9, 21)], [9, 12, 15, 18, 21])  # 两端都包含
+        self.assertEqual([k for k, _ in tree.search_range(10, 22, reverse=True)], [21, 18, 15, 12])
+        self.assertEqual(tree.search_range(100, 200, reverse=True), [])
+        self.assertEqual(tree.search_range(-10, 0, reverse=True), [(0, '0')])
+        self.assertEqual([k for k, _ in tree.search_range(10, 20)], [12, 15, 18])
+        self.assertEqual(tree.search_range(-10, 0), [(0, '0')])
+        self.assertEqual([k for k, _ in tree.search_range(95, 1000)], [96, 99])
+        self.assertEqual(tree.search_range(100, 200), [])
+        self.assertEqual(tree.search_range(13, 14), [])
+
+    def check_shape(self, tree):
+        """所有叶子同深度, 非根节点键数不少于下限, 分隔键与子树一致"""
+        min_keys = (tree.order + 1) // 2 - 1
+        depths = set()
+        leaves = []
+
+        def walk(node, depth, lo, hi):
+            if node is not tree.root:
+                self.assertGreaterEqual(len(node.keys), min_keys)
+            self.assertLessEqual(len(node.keys), tree.order)
+            for key in node.keys:
+                self.assertTrue((lo is None or key >= lo) and (hi is None or key < hi))
+            if node.is_leaf:
+                depths.add(depth)
+                leaves.append(node)
+                return
+            self.assertEqual(len(node.children), len(node.keys) + 1)
+            for i in range(len(node.children)):
+                walk(tree._child(node, i), depth + 1,
+                     node.keys[i - 1] if i > 0 else lo, node.keys[i] if i < len(node.keys) else hi)
+
+        walk(tree.root, 0, None, None)
+        self.assertEqual(len(depths), 1)
+        # 叶子层的 next/prev 链表与从左到右的顺序一致
+        self.assertEqual([tree._next(leaf) for leaf in leaves], leaves[1:] + [None])
+        self.assertEqual([tree._prev(leaf) for leaf in leaves], [None] + leaves[:-1])
+
+    def test_bulk_load(self):
+        rng = random.Random(63)
+        for order in (3, 4, 5, 16):
+            for n in list(range(0, 30)) + [500]:
+                tree = BPlusTree(order=order)
+                items = [(key * 2, key) for key in range(n)]
+                tree.bulk_load(items)
+                self.assertEqual(list(tree.items()), items)
+                self.check_shape(tree)
+                # 批量建树后继续增删
+                expected = dict(items)
+                self.run_random_ops(tree, rng, expected, 200)
+                self.check_shape(tree)
+
+        tree = BPlusTree()
+        with self.assertRaises(ValueError):
+            tree.bulk_load([(2, 0), (1, 0)])
+        tree.insert(1, 0)
+        with self.assertRaises(ValueError):
+            tree.bulk_load([(2, 0)])
+
+    def test_delete_heavy(self):
+        rng = random.Random(64)
+        for order in (3, 4, 5):
+            tree = BPlusTree(order=order)
+            keys = list(range(0, 600, 2))
+            tree.bulk_load([(key, key) for key in keys])
+            # 先删除各叶子的最小键 (即分隔键), 再随机删除直到清空
+            for key in keys[::order - 1] + rng.sample(keys, len(keys)):
+                self.assertEqual(tree.delete(key), key in keys)
+                if key in keys:
+                    keys.remove(key)
+                self.assertEqual(len(tree), len(keys))
+                if len(keys) % 17 == 0:
+                    self.check_shape(tree)
+                    self.assertEqual(list(tree), keys)
+            self.assertEqual(list(tree.items()), [])
+
+    def test_page_file_persists(self):
+        def reopen(tree):
+            tree.close()
+            tree = BPlusTree(self.file)
+            self.assertTrue(tree.opened)
+            return tree
+
+        expected = {}
+        tree = self.run_random_ops(BPlusTree(self.file, order=4), random.Random(62), expected, 3000, reopen)
+        tree.close()
+        tree = BPlusTree(self.file)
+        self.assertEqual(tree.order, 4)  # 阶数以文件为准
+        tree.close()
+
+        # 打开时只读入根节点, 查找只读入一条根到叶子的路径
+        tree = BPlusTree(self.file)
+        self.assertEqual(len(tree._nodes), 1)
+        tree.search(200)
+        self.assertLess(len(tree._nodes), 16)
+        self.assertEqual(list(tree.items()), sorted(expected.items()))
+        self.assertEqual(list(tree.items(reverse=True)), sorted(expected.items(), reverse=True))
+        tree.close()
+
+    def test_page_file_bulk_load(self):
+        tree = BPlusTree(self.file, order=8)
+        tree.bulk_load([(key, key + 1) for key in range(1000)])
+        tree.close()
+        tree = BPlusTree(self.file)
+        self.assertEqual(len(tree), 1000)
+        self.assertEqual(tree.search(777), 778)
+        self.check_shape(tree)
+        tree.close()
+
+    def test_invalid_page_file_recreated(self):
+        with open(self.file, 'wb') as f:
+            f.write(b'not a page file')
+        tree = BPlusTree(self.file)
+        self.assertFalse(tree.opened)
+        tree.insert(1, 1)
+        tree.close()
+        with self.assertRaises(ValueError):
+            BPlusTree(self.file, key_format='i')
+        # 格式不符的文件不会被当作有效页文件打开
+        tree = BPlusTree(self.file, key_format='d')
+        self.assertFalse(tree.opened)
+        tree.close()
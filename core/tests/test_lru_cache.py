@@ -0,0 +1,91 @@
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+
+from core.services.data_structures import LRUCache
+from core.services.product_service import ProductService
+
+
+class LRUCacheTests(SimpleTestCase):
+
+    def test_eviction_order(self):
+        cache = LRUCache(capacity=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(cache.get('a'), 1)  # a 变为最新
+        self.assertEqual(cache.put('c', 3), [('b', 2)])
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(list(cache.items()), [('c', 3), ('a', 1)])
+        self.assertEqual(cache.put('a', 10), [])  # 更新不淘汰
+        self.assertEqual(cache.pop('c'), 3)
+        self.assertEqual(len(cache), 1)
+
+    def test_stats(self):
+        cache = LRUCache(capacity=1)
+        cache.get('x')
+        cache.put('x', 1)
+        cache.get('x')
+        cache.put('y', 2)
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions']), (1, 1, 1))
+        self.assertEqual(stats['hit_ratio'], 0.5)
+
+    def test_capacity_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            LRUCache(capacity=0)
+
+
+class ProductCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.csv = os.path.join(self.dir, 'products.csv')
+        with open(self.csv, 'w') as f:
+            f.write("1,apple,10,1\n2,pineapple,12,5\n3,grape,20,2\n")
+        self.service = ProductService(self.csv, log_threshold=None, cache_size=4)
+
+    def tearDown(self):
+        self.service.close()
+        shutil.rmtree(self.dir)
+
+    def uids(self, products):
+        return [p.uid for p in products]
+
+    def test_hit_and_invalidate(self):
+        service = self.service
+        self.assertEqual(service.search_name('apple'), [1, 2])
+        self.assertEqual(service.search_name('apple'), [1, 2])
+        self.assertEqual(self.uids(service.prize_between(10, 15)), [2, 1])
+        self.assertEqual(self.uids(service.prize_between(10, 15)), [2, 1])
+        self.assertEqual((service.cache.hits, service.cache.misses), (2, 2))
+
+        # 任何修改都使旧结果失效
+        uid = service.add('crabapple', [-1100, 0]).uid
+        self.assertEqual(service.search_name('apple'), [1, 2, uid])
+        self.assertEqual(self.uids(service.prize_between(10, 15)), [2, uid, 1])
+        service.update(3, 'apple pie', [-2000, -2])  # 只改名
+        self.assertEqual(service.search_name('apple'), [1, 2, 3, uid])
+        service.remove(1)
+        self.assertEqual(service.search_name('apple'), [2, 3, uid])
+        self.assertEqual(self.uids(service.prize_between(10, 15)), [2, uid])
+        self.assertEqual(service.cache.hits, 2)
+
+    def test_unchanged_update_keeps_cache(self):
+        service = self.service
+        service.search_name('grape')
+        service.update(3, 'grape', [-2000, -2])  # 名称和键都不变
+        service.search_name('grape')
+        self.assertEqual(service.cache.hits, 1)
+
+    def test_result_is_a_copy(self):
+        result = self.service.search_name('apple')
+        result.append(99)
+        self.assertEqual(self.service.search_name('apple'), [1, 2])
+
+    def test_evictions_counted(self):
+        for pattern in ('app', 'ppl', 'ple', 'gra', 'rap'):
+            self.service.search_name(pattern)
+        self.assertEqual(self.service.cache_stats()['evictions'], 1)
+        self.assertEqual(len(self.service.cache), 4)
@@ -0,0 +1,95 @@
+import random
+
+from django.test import SimpleTestCase
+
+from core.services.data_structures import NGramIndex
+from core.services.data_structures.utils import edit_distance, AhoCorasick
+
+
+class NGramIndexTests(SimpleTestCase):
+
+    def setUp(self):
+        self.index = NGramIndex(n=3)
+        names = ["abc421", "a12abc", "39akbc", "3ma3b1abc", "a31bc", "1ac1abc"]
+        # 倒序插入, 确认结果顺序与插入顺序无关
+        for i in reversed(range(len(names))):
+            self.index.add(i * 7, names[i])
+
+    def test_search_sorted(self):
+        self.assertEqual(self.index.search("abc"), [0, 7, 21, 35])
+
+    def test_short_pattern_sorted(self):
+        # 模式短于 n, 走全量扫描分支
+        self.assertEqual(self.index.search("bc"), [0, 7, 14, 21, 28, 35])
+
+    def test_update_remove(self):
+        self.index.update(0, "xyz421")
+        self.index.remove(7)
+        self.assertEqual(self.index.search("abc"), [21, 35])
+        self.assertEqual(self.index.search("421"), [0])
+
+
+class FuzzySearchTests(SimpleTestCase):
+
+    def test_edit_distance(self):
+        self.assertEqual(edit_distance("kitten", "sitting"), 3)
+        self.assertEqual(edit_distance("kitten", "sitting", max_dist=2), 3)
+        self.assertEqual(edit_distance("", "abc"), 3)
+        self.assertEqual(edit_distance("abc", "abc", max_dist=0), 0)
+
+    def test_matches_brute_force(self):
+        rng = random.Random(51)
+        index = NGramIndex(n=3)
+        texts = {}
+        for key in range(600):
+            texts[key] = ''.join(rng.choices('abcde', k=rng.randint(3, 9)))
+            index.add(key, texts[key])
+        for key in rng.sample(range(600), 100):  # 删除与改名后保持同步
+            if rng.random() < 0.5:
+                index.remove(key)
+                del texts[key]
+            else:
+                texts[key] = ''.join(rng.choices('abcde', k=rng.randint(3, 9)))
+                index.update(key, texts[key])
+
+        for _ in range(60):
+            pattern = ''.join(rng.choices('abcde', k=rng.randint(1, 10)))
+            for k in range(4):
+                expected = sorted(
+                    (edit_distance(pattern, text), key) for key, text in texts.items()
+                    if edit_distance(pattern, text) <= k
+                )
+                self.assertEqual(index.search_fuzzy(pattern, k), expected, (pattern, k))
+
+
+class MultiPatternTests(SimpleTestCase):
+
+    def test_aho_corasick_positions(self):
+        patterns = ["he", "she", "his", "hers", ""]
+        automaton = AhoCorasick(patterns)
+        text = "ushershishe"
+        expected = sorted(
+            (i, idx) for idx, pattern in enumerate(patterns) if pattern
+            for i in range(len(text)) if text.startswith(pattern, i)
+        )
+        self.assertEqual(sorted(automaton.iter(text)), expected)
+        self.assertEqual(automaton.matched("xhisx"), {2, 4})  # 空模式匹配任何文本
+
+    def test_search_multi_matches_single(self):
+        rng = random.Random(52)
+        index = NGramIndex(n=3)
+        for key in range(500):
+            index.add(key, ''.join(rng.choices('abcdAB', k=rng.randint(1, 9))))
+        patterns = [''.join(rng.choices('abcdAB', k=rng.randint(1, 4))) for _ in range(40)]
+        patterns.append(patterns[0])  # 重复的模式
+
+        expected = {pattern: index.search(pattern) for pattern in patterns}
+        self.assertEqual(index.search_multi(patterns), expected)
+        long_patterns = [pattern for pattern in patterns if len(pattern) >= 3]
+        self.assertEqual(index.search_multi(long_patterns), {p: expected[p] for p in long_patterns})
+
+        texts = index._texts
+        folded = index.search_multi(patterns, ignore_case=True)
+        for pattern in patterns:
+            self.assertEqual(folded[pattern], [key for key in sorted(texts) if pattern.lower() in texts[key].lower()])
+        self.assertEqual(index.search_multi([]), {})
@@ -0,0 +1,121 @@
+import os
+import random
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+
+from core.services.data_structures import AVLTreeMap
+from core.services.product_service import ProductService, write_random_products
+
+
+class AVLOrderStatisticsTests(SimpleTestCase):
+
+    def check(self, tree, model):
+        """tree 与 model {key: weight} 的顺序统计应一致, 并检查平衡与高度"""
+        keys = sorted(model)
+        self.assertEqual(list(tree), keys)
+        self.assertEqual(tree.total(), sum(model.values()))
+
+        # rank: 小于 k 的权重和, 包含不在树中的键
+        prefix = 0
+        for k in keys:
+            self.assertEqual(tree.rank(k), prefix)
+            self.assertEqual(tree.rank(k + 0.5), prefix + model[k])
+            prefix += model[k]
+
+        # select_position: 第 i 个权重单位落在哪个键, 节点内偏移
+        expected = [(k, offset) for k in keys for offset in range(model[k])]
+        for i, (k, offset) in enumerate(expected):
+            p, off = tree.select_position(i)
+            self.assertEqual((p.key(), off), (k, offset))
+        with self.assertRaises(IndexError):
+            tree.select_position(len(expected))
+
+        def height(node):
+            if node is None:
+                return 0
+            h = 1 + max(height(node._left), height(node._right))
+            self.assertLessEqual(abs(node.left_height() - node.right_height()), 1)
+            self.assertEqual(node._height, h)
+            return h
+        height(tree._root)
+
+    def test_random_insert_delete(self):
+        rng = random.Random(4)
+        tree, model = AVLTreeMap(), {}
+        for step in range(2000):
+            k = rng.randrange(300)
+            if rng.random() < 0.6:
+                tree[k] = k
+                p = tree.find_position(k)
+                w = rng.randint(1, 4)
+                tree.set_weight(p, w)
+                model[k] = w
+            elif k in model:
+                del tree[k]
+                del model[k]
+            if step % 250 == 0:
+                self.check(tree, model)
+        self.check(tree, model)
+
+    def test_bulk_load(self):
+        rng = random.Random(5)
+        keys = sorted(rng.sample(range(10000), 777))
+        weights = {k: rng.randint(1, 5) for k in keys}
+        tree = AVLTreeMap()
+        tree.bulk_load([(k, weights[k]) for k in keys], weight=lambda w: w)
+        self.check(tree, weights)
+
+        # 批量建树之后继续增删, 权重仍须正确维护
+        for k in keys[::3]:
+            del tree[k]
+            del weights[k]
+        for k in range(10000, 10100):
+            tree[k] = 1
+            weights[k] = 1
+        self.check(tree, weights)
+
+    def test_bulk_load_rejects_unsorted(self):
+        with self.assertRaises(ValueError):
+            AVLTreeMap().bulk_load([(2, 'b'), (1, 'a')])
+
+
+class ProductPageTests(SimpleTestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.csv = os.path.join(self.dir, 'products.csv')
+        random.seed(7)
+        write_random_products(self.csv, 500)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def check_pages(self, service):
+        products = list(service)
+        self.assertEqual(len(products), len(service))
+        for offset, limit in [(0, 50), (37, 13), (450, 100), (len(products) - 1, 5), (len(products), 5), (0, 0)]:
+            self.assertEqual(service.page(offset, limit), products[offset:offset + limit])
+
+    def test_page_matches_slice(self):
+        for bulk_load in (True, False):
+            service = ProductService(self.csv, bulk_load=bulk_load, log_threshold=None)
+            self.check_pages(service)
+            service.close()
+
+    def test_page_after_mutations(self):
+        service = ProductService(self.csv, log_threshold=None)
+        rng = random.Random(8)
+        for _ in range(200):
+            uids = list(service.uid_map.keys())
+            op = rng.random()
+            if op < 0.4:
+                service.add('x', [-rng.randint(100, 300), -rng.randint(0, 3)])  # 制造大量同键商品
+            elif op < 0.7:
+                service.remove(rng.choice(uids))
+            else:
+                uid = rng.choice(uids)
+                service.update(uid, service[uid].name, [-rng.randint(100, 300), -rng.randint(0, 3)])
+        self.check_pages(service)
+        service.close()
@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.services.product_service import ProductService
+
+
+def snapshot(service):
+    """按顺序导出 (uid, name, sort_key), 用于比较两个服务的状态"""
+    return [(p.uid, p.name, p.key.key()) for p in service]
+
+
+class ProductLogTests(SimpleTestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.csv = os.path.join(self.dir, 'products.csv')
+        with open(self.csv, 'w') as f:
+            f.write("1,apple,3.5,10\n2,banana,1.2,5\n3,cherry,3.5,7\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def mutate(self, service):
+        service.add('durian', [-999, -1])
+        service.update(1, 'green apple', service[1].key.key())  # N,1
+        service.remove(1)  # D,1: 数据表中不再有 uid 1
+        service.update(2, 'banana', [-120, -6])  # 原地改键: A,2 覆盖旧记录
+        service.remove(3)
+
+    def test_replay_after_restart(self):
+        service = ProductService(self.csv, log_threshold=None)
+        self.mutate(service)
+        expected = snapshot(service)
+        service.close()
+        self.assertTrue(os.path.exists(service.product_log_file))
+
+        restored = ProductService(self.csv, log_threshold=None)
+        self.assertEqual(snapshot(restored), expected)
+        self.assertEqual(restored.add('eggplant', [-100, 0]).uid, 5)
+        restored.close()
+
+    def test_crash_between_replace_and_truncate(self):
+        service = ProductService(self.csv, log_threshold=None)
+        self.mutate(service)
+        expected = snapshot(service)
+        # 模拟进程在 os.replace 之后、清空日志之前崩溃
+        with mock.patch.object(ProductService, '_truncate_log', side_effect=RuntimeError('crash')):
+            with self.assertRaises(RuntimeError):
+                service.save()
+        service.close()
+        self.assertTrue(os.path.exists(service.product_log_file))
+
+        # 新数据表已包含全部修改, 日志又在其上重放一遍, 指向已删除 uid 的记录应被跳过
+        restored = ProductService(self.csv, log_threshold=None)
+        self.assertEqual(snapshot(restored), expected)
+        self.assertEqual(len(restored), len(expected))
+        restored.save()
+        self.assertFalse(os.path.exists(restored.product_log_file))
+        restored.close()
+
+    def test_partial_trailing_record_dropped(self):
+        service = ProductService(self.csv, log_threshold=None)
+        service.remove(2)
+        expected = snapshot(service)
+        service.close()
+        with open(service.product_log_file, 'a') as f:
+            f.write("A,9,-100,-1,trunc")  # 无换行, 写入中断
+
+        restored = ProductService(self.csv, log_threshold=None)
+        self.assertEqual(snapshot(restored), expected)
+        restored.close()
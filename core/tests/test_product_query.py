@@ -0,0 +1,149 @@
+import os
+import random
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.services.product_service import Product, ProductService, write_random_products
+
+
+class ProductQueryTests(SimpleTestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.csv = os.path.join(self.dir, 'products.csv')
+        random.seed(11)
+        write_random_products(self.csv, 2000)
+        self.service = ProductService(self.csv, log_threshold=None)
+
+    def tearDown(self):
+        self.service.close()
+        shutil.rmtree(self.dir)
+
+    def brute(self, price_min, price_max, pattern):
+        result = []
+        for product in self.service:
+            price = -product.key_element()[0] / 100
+            if price_min is not None and price < price_min:
+                continue
+            if price_max is not None and price > price_max:
+                continue
+            if pattern and pattern not in product.name:
+                continue
+            result.append(product.uid)
+        return result
+
+    def test_query_matches_brute_force(self):
+        rng = random.Random(12)
+        names = [product.name for product in self.service]
+        for _ in range(60):
+            name = rng.choice(names)
+            i = rng.randrange(len(name) - 1)
+            pattern = rng.choice(['', name[i:i + 2], name[i:i + 3], name[i:i + 4], 'zzzz'])
+            lo = rng.randint(1, 1000)
+            price_min, price_max = rng.choice([(None, None), (lo, lo + rng.randint(0, 300)), (lo, lo + 5)])
+            for limit in (None, 7):
+                got = [p.uid for p in self.service.query(price_min, price_max, pattern, limit=limit)]
+                expected = self.brute(price_min, price_max, pattern)
+                self.assertEqual(got, expected[:limit] if limit else expected)
+
+    def test_query_is_lazy(self):
+        for limit in (None, 7):
+            result = self.service.query(pattern='a', limit=limit)
+            self.assertIs(iter(result), result)  # 迭代器, 不是列表
+        with mock.patch.object(ProductService, '_bucket_products', wraps=self.service._bucket_products) as buckets:
+            first = next(self.service.query())  # 不限数量时只扫描到取出的位置
+            self.assertEqual(buckets.call_count, 1)
+        self.assertEqual(first.uid, next(iter(self.service)).uid)
+
+
+class PrizeBetweenTests(SimpleTestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.csv = os.path.join(self.dir, 'products.csv')
+        with open(self.csv, 'w') as f:
+            f.write("1,a,10,1\n2,b,10,5\n3,c,15.5,2\n4,d,20,3\n5,e,20,9\n6,f,20.01,1\n7,g,9.99,1\n")
+        self.service = ProductService(self.csv, log_threshold=None)
+
+    def tearDown(self):
+        self.service.close()
+        shutil.rmtree(self.dir)
+
+    def test_closed_interval(self):
+        uids = [p.uid for p in self.service.prize_between(10, 20)]
+        # 价格降序, 同价格按人气降序; 两端 10 与 20 都包含
+        self.assertEqual(uids, [5, 4, 3, 2, 1])
+
+    def test_single_price(self):
+        self.assertEqual([p.uid for p in self.service.prize_between(20, 20)], [5, 4])
+        self.assertEqual(list(self.service.prize_between(11, 12)), [])
+
+
+class ProductKeyTests(SimpleTestCase):
+
+    def test_prefix_comparison(self):
+        Key = Product.ProductKey
+        self.assertEqual(Key([-100]), Key([-100, -5]))
+        self.assertLess(Key([-200]), Key([-100, -5]))
+        self.assertLess(Key([-100, -5]), Key([-100, -1]))
+        self.assertFalse(Key([-100]) < Key([-100, -5]))
+        self.assertFalse(Key([-100, -5]) < Key([-100]))
+        self.assertEqual(hash(Key([-1, 2])), hash(Key((-1, 2))))
+
+    def test_inline_bucket_transitions(self):
+        # 同一个键的商品数在 1 与多个之间变化, 桶在内联与 ProbeHashMap 之间切换
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv = os.path.join(tmp_dir, 'products.csv')
+            with open(csv, 'w') as f:
+                f.write("1,a,10,1\n2,b,10,1\n3,c,12,1\n")
+            service = ProductService(csv, log_threshold=None)
+            self.assertIsNone(service[3].bucket)
+            self.assertIsNotNone(service[1].bucket)
+            service.remove(2)
+            self.assertIsNone(service[1].bucket)
+            uid = service.add('d', [-1200, -1]).uid
+            self.assertIs(service[3].bucket, service[uid].bucket)
+            products = list(service)
+            # 同键商品在桶内的顺序由哈希决定, 不作要求
+            self.assertEqual({p.uid for p in products[:2]}, {3, uid})
+            self.assertEqual(products[2].uid, 1)
+            self.assertEqual(service.page(1, 5), products[1:])
+            service.close()
+
+
+class FuzzyNameTests(SimpleTestCase):
+
+    def test_ranked_and_in_sync(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv = os.path.join(tmp_dir, 'products.csv')
+            with open(csv, 'w') as f:
+                f.write("1,keyboard,10,1\n2,keybored,12,1\n3,mouse,20,1\n4,keyboards,9,1\n")
+            service = ProductService(csv, log_threshold=None)
+            self.assertEqual(service.search_name_fuzzy('keyboard', 1), [(1, 0), (4, 1)])
+            self.assertEqual(service.search_name_fuzzy('keyboard', 2), [(1, 0), (4, 1), (2, 2)])
+            self.assertEqual(service.search_name_fuzzy('mose', 1), [(3, 1)])
+
+            service.update(3, 'keyboard', [-2000, -1])
+            service.remove(4)
+            uid = service.add('keyb0ard', [-500, -1]).uid
+            self.assertEqual(service.search_name_fuzzy('keyboard', 1), [(1, 0), (3, 0), (uid, 1)])
+            service.close()
+
+
+class MultiNameSearchTests(SimpleTestCase):
+
+    def test_search_names_multi(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv = os.path.join(tmp_dir, 'products.csv')
+            with open(csv, 'w') as f:
+                f.write("1,Keyboard,10,1\n2,mouse,12,1\n3,keypad,20,1\n")
+            service = ProductService(csv, log_threshold=None)
+            self.assertEqual(service.search_names_multi(['key', 'ou', 'Key']), {'key': [3], 'ou': [2], 'Key': [1]})
+            self.assertEqual(service.search_names_multi(['key', 'OU'], ignore_case=True), {'key': [1, 3], 'OU': [2]})
+
+            service.update(2, 'mousepad', [-1200, -1])  # 改名后缓存失效
+            self.assertEqual(service.search_names_multi(['pad'], ignore_case=True), {'pad': [2, 3]})
+            service.close()
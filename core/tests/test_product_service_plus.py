@@ -0,0 +1,393 @@
+import dbm
+import os
+import random
+import shelve
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.services.data_structures import RecordStore
+from core.services.product_service_plus import ProductService, Product, UIDMap, MAX_NAME_BYTES, _UID_HEADER, _UID_ENTRY
+
+
+class ProductServicePlusTests(SimpleTestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.files = [os.path.join(self.dir, name) for name in ('products', 'uid_price', 'price_index.bpt')]
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def open(self):
+        return ProductService(*self.files)
+
+    def test_price_index_reopened_without_rebuild(self):
+        service = self.open()
+        for i, price in enumerate([30, 10, 20, 10, 40, 30, 50]):
+            service.add_product(f'p{i}', price)
+        self.assertTrue(service.remove_product(5))  # 价格 40 的桶变空
+        service.close()
+
+        with mock.patch.object(ProductService, '_rebuild_index') as rebuild:
+            service = self.open()
+            rebuild.assert_not_called()
+        self.assertEqual(list(service.tree), [10, 20, 30, 50])
+        self.assertEqual([p.uid for p in service.find_products_in_price_range(10, 30)], [2, 4, 3, 1, 6])
+        self.assertEqual([p.uid for p in service], [2, 4, 3, 1, 6, 7])
+        self.assertEqual([p.uid for p in service.find_n_products(3)], [2, 4, 3])
+        service.close()
+
+    def test_missing_page_file_rebuilt(self):
+        service = self.open()
+        for i, price in enumerate([3, 1, 2]):
+            service.add_product(f'p{i}', price)
+        service.close()
+        os.remove(self.files[2])
+
+        service = self.open()
+        self.assertEqual(list(service.tree), [1, 2, 3])
+        service.close()
+
+    def test_point_read_parses_one_record(self):
+        service = self.open()
+        with service.batch():
+            for i in range(500):  # 同一价格占多页
+                service.add_product(f'p{i}', 7)
+        with mock.patch.object(RecordStore, '_records') as records:
+            self.assertEqual(service.find_product_by_uid(20).name, 'p19')
+            self.assertTrue(service.update_product(30, new_name='renamed'))
+            records.assert_not_called()  # 不解析整页或整个价格
+        self.assertEqual(service.find_product_by_uid(30).name, 'renamed')
+        self.assertTrue(service.update_product(31, new_name='x' * 3000))  # 本页放不下, 移到其他页
+        service.close()
+
+        service = self.open()
+        self.assertEqual(service.find_product_by_uid(31).name, 'x' * 3000)
+        self.assertEqual([p.uid for p in service.find_products_in_price_range(7, 7)].count(31), 1)
+        self.assertEqual(len(list(service)), 500)
+        service.close()
+
+    def test_invalid_update_leaves_product_intact(self):
+        service = self.open()
+        service.add_product('p0', 7)
+        service.add_product('p1', 8)
+        too_long = 'x' * (MAX_NAME_BYTES + 1)
+        for kwargs in ({'new_name': too_long}, {'new_name': too_long, 'new_price': 9}, {'new_price': 2 ** 63},
+                       {'new_price': 1.5}):
+            with self.assertRaises(ValueError):
+                service.update_product(1, **kwargs)
+        with self.assertRaises(ValueError):
+            service.add_product(too_long, 1)
+        self.assertEqual(service.uid_index.get_max_uid(), 2)  # 未分配 uid
+        self.assertTrue(service.update_product(1, new_name='y' * MAX_NAME_BYTES, new_price=9))
+        service.close()
+
+        service = self.open()
+        self.assertEqual(service.find_product_by_uid(1).name, 'y' * MAX_NAME_BYTES)
+        self.assertEqual([(p.uid, p.price) for p in service], [(2, 8), (1, 9)])
+        self.assertEqual(list(service.tree), [8, 9])
+        service.close()
+
+    def test_deleted_slots_reused(self):
+        service = self.open()
+        names = {}
+        with service.batch():
+            for i in range(600):
+                service.add_product(f'p{i}', i % 2)
+                names[i + 1] = f'p{i}'
+        pages = service.block_manager.store.pages
+        removed = [uid for uid in range(1, 601) if uid % 3]
+        for uid in removed:
+            self.assertTrue(service.remove_product(uid))
+            del names[uid]
+        self.assertTrue(service.update_product(3, new_price=5))  # 改价格: 保留原名和 uid
+        with service.batch():
+            for i in range(len(removed) - 1):  # 空出的槽被复用, 文件不增长
+                service.add_product(f'n{i}', i % 2)
+                names[601 + i] = f'n{i}'
+        self.assertEqual(service.block_manager.store.pages, pages + 1)  # 只多出价格 5 的一页
+        service.close()
+
+        service = self.open()
+        for uid, name in names.items():
+            self.assertEqual(service.find_product_by_uid(uid).name, name)
+        for uid in removed:
+            self.assertIsNone(service.find_product_by_uid(uid))
+        self.assertEqual(sorted(p.uid for p in service), sorted(names))
+        self.assertEqual(sorted(p.uid for p in service.find_products_in_price_range(0, 1)),
+                         sorted(uid for uid in names if uid != 3))
+        self.assertEqual(service.find_product_by_uid(3).price, 5)
+        service.close()
+
+
+class LegacyStoreTests(SimpleTestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.files = [os.path.join(self.dir, name) for name in ('products', 'uid_price', 'price_index.bpt')]
+        self.legacy = (os.path.join(self.dir, 'legacy_products'), os.path.join(self.dir, 'legacy_uid_price'))
+        # 旧版本的 shelve 存储: uid 6 已删除
+        with shelve.open(self.legacy[0]) as products, shelve.open(self.legacy[1]) as uids:
+            for uid, price in [(1, 30), (2, 10), (3, 30), (4, 20), (5, 10)]:
+                products[str(price)] = products.get(str(price), []) + [Product(uid, f'p{uid}', price)]
+                uids[str(uid)] = price
+            uids['6'] = 40
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_migrated_once(self):
+        service = ProductService(*self.files, legacy_files=self.legacy)
+        self.assertEqual(len(service), 5)
+        self.assertEqual([(p.uid, p.price) for p in service], [(2, 10), (5, 10), (4, 20), (1, 30), (3, 30)])
+        self.assertEqual(service.find_product_by_uid(3).name, 'p3')
+        self.assertEqual(service.add_product('new', 10), 7)  # 不重复分配旧存储中用过的 uid
+        service.remove_product(1)
+        service.close()
+
+        service = ProductService(*self.files, legacy_files=self.legacy)  # 已转换, 不再读取旧存储
+        self.assertEqual(sorted(p.uid for p in service), [2, 3, 4, 5, 7])
+        self.assertEqual([p.uid for p in service.find_products_in_price_range(10, 10)], [2, 5, 7])
+        service.close()
+        self.assertTrue(dbm.whichdb(self.legacy[0]))  # 旧文件保留
+
+
+class ScanTests(SimpleTestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.files = [os.path.join(self.dir, name) for name in ('products', 'uid_price', 'price_index.bpt')]
+        rng = random.Random(81)
+        service = ProductService(*self.files)
+        with service.batch():
+            for i in range(1500):
+                service.add_product(f'p{i}', rng.choice([5, 10, 10, 10, 20, 30, 40, 50]))
+            for uid in rng.sample(range(1, 1501), 300):
+                service.remove_product(uid)
+            for i in range(100):  # 复用空出的槽
+                service.add_product(f'q{i}', 10)
+        service.close()
+        self.service = ProductService(*self.files)
+
+    def tearDown(self):
+        self.service.close()
+        shutil.rmtree(self.dir)
+
+    def page_through(self, batch_size, **bounds):
+        products, cursor = [], None
+        while True:
+            batch, cursor = self.service.scan(cursor, batch_size, **bounds)
+            self.assertLessEqual(len(batch), batch_size)
+            products.extend(batch)
+            if cursor is None:
+                return products
+            self.assertEqual(len(batch), batch_size)
+
+    def test_pages_in_price_order(self):
+        expected = sorted(self.service, key=lambda p: p.price)
+        for batch_size in (1, 7, 100, 5000):
+            products = self.page_through(batch_size)
+            self.assertEqual(sorted(p.uid for p in products), sorted(p.uid for p in expected))  # 不重复不遗漏
+            self.assertEqual([p.price for p in products], [p.price for p in expected])
+        products = self.page_through(13, min_price=10, max_price=30)
+        self.assertEqual(sorted(p.uid for p in products), sorted(p.uid for p in expected if 10 <= p.price <= 30))
+        self.assertEqual(self.page_through(5, min_price=60), [])
+        self.assertEqual([p.uid for p in self.service.find_n_products(20)], [p.uid for p in self.page_through(20)][:20])
+
+    def test_reverse_pages(self):
+        forward = [p.uid for p in self.page_through(5000)]
+        for batch_size in (1, 7, 100):
+            products = self.page_through(batch_size, reverse=True)
+            self.assertEqual([p.uid for p in products], forward[::-1])  # 价格最高的在前
+        products = self.page_through(13, min_price=10, max_price=30, reverse=True)
+        expected = self.page_through(13, min_price=10, max_price=30)
+        self.assertEqual([p.uid for p in products], [p.uid for p in expected][::-1])
+        self.assertEqual(self.page_through(5, max_price=4, reverse=True), [])
+
+    def test_cursor_resumes_after_reopen(self):
+        first, cursor = self.service.scan(None, 50)
+        self.service.close()
+        self.service = ProductService(*self.files)
+        rest = self.page_through(50)
+        second, _ = self.service.scan(cursor, 50)
+        self.assertEqual([p.uid for p in first + second], [p.uid for p in rest[:100]])
+        with self.assertRaises(ValueError):
+            self.service.scan('not a cursor')
+
+    def test_read_next(self):
+        products = []
+        while True:
+            batch = self.service.read_next(batch_size=64)
+            if not batch:
+                break
+            products.extend(batch)
+        self.assertEqual([p.uid for p in products], [p.uid for p in self.page_through(64)])
+        self.assertEqual(self.service.read_next(), [])
+
+
+class UIDHeaderTests(SimpleTestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.files = [os.path.join(self.dir, name) for name in ('products', 'uid_price', 'price_index.bpt')]
+        service = ProductService(*self.files)
+        with service.batch():
+            for i in range(10):
+                service.add_product(f'p{i}', i % 3)
+        service.remove_product(10)  # 删除最大 uid
+        service.remove_product(4)
+        self.assertEqual(len(service), 8)
+        service.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_open_reads_header_only(self):
+        with mock.patch.object(UIDMap, '_rescan') as rescan:
+            service = ProductService(*self.files)
+            rescan.assert_not_called()
+        self.assertEqual(len(service), 8)
+        self.assertFalse(service.uid_index.recovered)
+        service.add_product('new', 1)
+        self.assertEqual(service.uid_index.get_max_uid(), 11)  # 不重复分配已删除的最大 uid
+        self.assertEqual(len(service), 9)
+        service.close()
+
+    def test_missing_or_inconsistent_header_rescanned(self):
+        with open(self.files[1], 'rb') as f:
+            data = f.read()
+        header, entries = data[:_UID_HEADER.size], data[_UID_HEADER.size:]
+        uncommitted = bytearray(header)
+        uncommitted[6] = False  # 未完整提交
+        cases = [
+            (bytes(_UID_HEADER.size) + entries, 10),  # 文件头缺失
+            (bytes(uncommitted) + entries, 10),
+            (header + entries + bytes(_UID_ENTRY.size), 11),  # 大小与文件头不符
+            (header + entries[:-_UID_ENTRY.size], 9),
+        ]
+        for content, max_uid in cases:
+            with open(self.files[1], 'wb') as f:
+                f.write(content)
+            uid_index = UIDMap(self.files[1])
+            self.assertTrue(uid_index.recovered)
+            self.assertEqual(len(uid_index), 8)
+            self.assertEqual(uid_index.get_max_uid(), max_uid)
+            self.assertEqual(uid_index.get(3), uid_index.all_items()[2][1])
+            uid_index.close()
+            uid_index = UIDMap(self.files[1])
+            self.assertFalse(uid_index.recovered)  # 恢复后写回了文件头
+            uid_index.close()
+
+
+class GroupCommitTests(SimpleTestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.files = [os.path.join(self.dir, name) for name in ('products', 'uid_price', 'price_index.bpt')]
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def count_syncs(self, service):
+        return mock.patch.object(service.block_manager, 'commit', wraps=service.block_manager.commit)
+
+    def test_batch_commits_once(self):
+        service = ProductService(*self.files)
+        with self.count_syncs(service) as sync:
+            with service.batch():
+                for i in range(20):
+                    service.add_product(f'p{i}', i % 4)
+                service.remove_product(3)
+                self.assertEqual(sync.call_count, 0)
+                # 未提交的修改对查询可见
+                self.assertEqual(service.find_product_by_uid(5).name, 'p4')
+                self.assertIsNone(service.find_product_by_uid(3))
+            self.assertEqual(sync.call_count, 1)
+        service.close()
+
+        service = ProductService(*self.files)
+        self.assertEqual(sorted(p.uid for p in service), [uid for uid in range(1, 21) if uid != 3])
+        self.assertEqual(service.uid_index.get_max_uid(), 20)
+        service.close()
+
+    def test_commit_size_and_delay(self):
+        service = ProductService(*self.files, commit_size=3)
+        with self.count_syncs(service) as sync:
+            for i in range(7):
+                service.add_product(f'p{i}', i)
+            self.assertEqual(sync.call_count, 2)
+        service.close()  # 关闭时提交剩余的修改
+
+        service = ProductService(*self.files, commit_size=100, commit_delay=0)
+        with self.count_syncs(service) as sync:
+            service.update_product(1, new_name='renamed')
+            self.assertEqual(sync.call_count, 1)
+        service.close()
+        service = ProductService(*self.files)
+        self.assertEqual(len(list(service)), 7)
+        self.assertEqual(service.find_product_by_uid(1).name, 'renamed')
+        service.close()
+
+    def test_delay_commits_without_further_writes(self):
+        service = ProductService(*self.files, commit_size=100, commit_delay=0.05)
+        with self.count_syncs(service) as sync:
+            service.add_product('p0', 1)
+            self.assertEqual(sync.call_count, 0)
+            deadline = time.monotonic() + 5
+            while sync.call_count == 0 and time.monotonic() < deadline:  # 之后没有新的修改, 由定时器提交
+                time.sleep(0.01)
+            self.assertEqual(sync.call_count, 1)
+        # 不关闭 service, 直接从文件读取: 修改已写入
+        other = ProductService(*self.files)
+        self.assertEqual(other.find_product_by_uid(1).name, 'p0')
+        other.close()
+
+        service.add_product('p1', 2)
+        service.close()  # 关闭时提交并取消定时器
+        self.assertIsNone(service._timer)
+        service = ProductService(*self.files)
+        self.assertEqual(len(service), 2)
+        service.close()
+
+
+class BlockCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.files = [os.path.join(self.dir, name) for name in ('products', 'uid_price', 'price_index.bpt')]
+        service = ProductService(*self.files)
+        with service.batch():
+            for i in range(6):
+                service.add_product(f'p{i}', i % 2)
+        service.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_hits_and_invalidation(self):
+        service = ProductService(*self.files, cache_size=1)
+        service.find_product_by_uid(1)
+        service.find_product_by_uid(3)  # 同一价格块
+        stats = service.cache_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['products']), (1, 1, 3))
+        self.assertGreater(stats['bytes'], 0)
+
+        service.update_product(3, new_name='renamed')  # 修改的是缓冲池中的页
+        self.assertEqual(service.find_product_by_uid(3).name, 'renamed')
+        service.add_product('p6', 0)
+        self.assertEqual([p.uid for p in service.find_products_in_price_range(0, 0)], [1, 3, 5, 7])
+        service.remove_product(2)
+        service.find_product_by_uid(4)  # 淘汰价格 0 的块
+        self.assertEqual(service.cache_stats()['evictions'], 1)
+        self.assertEqual([p.uid for p in service.find_products_in_price_range(1, 1)], [4, 6])
+        service.close()
+
+    def test_cache_disabled(self):
+        service = ProductService(*self.files, cache_size=0)
+        self.assertEqual(service.find_product_by_uid(2).name, 'p1')
+        self.assertEqual(service.cache_stats(), {'capacity': 0})
+        service.close()
@@ -0,0 +1,85 @@
+import os
+import random
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+
+from core.services.product_service import ProductService, write_random_products
+
+
+def snapshot(service):
+    """按顺序导出 (uid, name, sort_key), 用于比较两个服务的状态"""
+    return [(p.uid, p.name, p.key.key()) for p in service]
+
+
+class ProductSnapshotTests(SimpleTestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.csv = os.path.join(self.dir, 'products.csv')
+        random.seed(21)
+        write_random_products(self.csv, 300)
+        with open(self.csv, 'a') as f:
+            f.write("301,价格测试,0.29,3\n302,dup,0.29,3\n")  # 非 ASCII 名称, 以及同键商品
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def saved_service(self):
+        service = ProductService(self.csv, log_threshold=None)
+        service.remove(5)
+        service.save()
+        self.assertTrue(os.path.exists(service.product_snapshot_file))
+        return service
+
+    def test_snapshot_matches_csv(self):
+        service = self.saved_service()
+        expected = snapshot(service)
+        service.close()
+
+        loaded = ProductService(self.csv, log_threshold=None)
+        self.assertIsNotNone(loaded._read_snapshot())
+        self.assertEqual(snapshot(loaded), expected)
+        self.assertEqual(loaded._max_uid, 302)
+        loaded.close()
+
+        # 不用快照, 解析数据表得到相同的商品 (价格取整一致; 同键商品在桶内的顺序不作要求)
+        os.remove(loaded.product_snapshot_file)
+        from_csv = ProductService(self.csv, log_threshold=None, bulk_load=False)
+        self.assertEqual(sorted(snapshot(from_csv)), sorted(expected))
+        from_csv.close()
+
+    def test_log_replayed_on_top_of_snapshot(self):
+        service = self.saved_service()
+        service.update(7, 'renamed', [-1, -1])
+        service.remove(9)
+        expected = snapshot(service)
+        service.close()
+
+        loaded = ProductService(self.csv, log_threshold=None)
+        self.assertEqual(snapshot(loaded), expected)
+        loaded.close()
+
+    def test_stale_snapshot_falls_back_to_csv(self):
+        service = self.saved_service()
+        service.close()
+        with open(self.csv, 'a') as f:
+            f.write("400,edited,1.5,1\n")  # 数据表在 save 之后被改动
+
+        loaded = ProductService(self.csv, log_threshold=None)
+        self.assertIsNone(loaded._read_snapshot())
+        self.assertIn(400, loaded.uid_map)
+        self.assertEqual(len(loaded), 302)
+        loaded.close()
+
+    def test_corrupt_snapshot_falls_back_to_csv(self):
+        service = self.saved_service()
+        expected = snapshot(service)
+        service.close()
+        with open(service.product_snapshot_file, 'r+b') as f:
+            f.truncate(100)  # 截断
+
+        loaded = ProductService(self.csv, log_threshold=None)
+        self.assertEqual(snapshot(loaded), expected)
+        loaded.close()
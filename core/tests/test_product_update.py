@@ -0,0 +1,90 @@
+import os
+import random
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+
+from core.services.product_service import ProductService
+
+
+def snapshot(service):
+    """按顺序导出 (uid, name, sort_key), 用于比较两个服务的状态"""
+    return [(p.uid, p.name, p.key.key()) for p in service]
+
+
+class ProductUpdateTests(SimpleTestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.csv = os.path.join(self.dir, 'products.csv')
+        rng = random.Random(41)
+        with open(self.csv, 'w') as f:
+            for uid in range(1, 801):
+                f.write(f"{uid},p{uid},{rng.randint(1, 40)},{rng.randint(1, 5)}\n")  # 大量同键商品
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def check_consistent(self, service):
+        products = list(service)
+        self.assertEqual(len(products), len(service))
+        self.assertEqual([p.key.key() for p in products], sorted(p.key.key() for p in products))
+        self.assertEqual(service.avl.total(), len(service))
+        self.assertEqual(service.page(100, 50), products[100:150])
+        for product in products:
+            self.assertIs(service.uid_map[product.uid], product)
+            bucket = product.bucket
+            if bucket is None:
+                self.assertIs(service.avl[product.key], product)
+            else:
+                self.assertIs(service.avl[product.key], bucket)
+                self.assertGreater(len(bucket), 1)
+        if service.popularity_index is not None:
+            self.assertEqual(sum(len(bucket) for bucket in service.popularity_index.values()), len(service))
+
+    def test_update_in_place(self):
+        service = ProductService(self.csv, log_threshold=None, popularity_index=True)
+        product = service[10]
+        self.assertEqual(service.update(10, 'moved', [-99900, -7]), 10)
+        self.assertIs(service[10], product)  # 同一个对象, uid 不变
+        self.assertEqual(product.key.key(), (-99900, -7))
+        self.assertEqual(list(service)[0], product)
+        self.assertEqual(service.top_k_popular(None, None, 1), [product])
+        self.assertEqual(service._max_uid, 800)
+        self.assertIsNone(service.update(10, 'moved', [-99900, -7]))
+        self.check_consistent(service)
+        service.close()
+
+    def test_update_many_matches_single_updates(self):
+        rng = random.Random(42)
+        changes = {uid: [-100 * rng.randint(1, 40), -rng.randint(1, 5)] for uid in rng.sample(range(1, 801), 300)}
+        batch = ProductService(self.csv, log_threshold=None, popularity_index=True)
+        single = ProductService(self.csv, log_threshold=None, bulk_load=False)
+        objects = {uid: batch[uid] for uid in changes}
+        expected_moved = sum(1 for uid, key in changes.items() if objects[uid].key.key() != tuple(key))
+
+        self.assertEqual(batch.update_many(changes), expected_moved)
+        for uid in changes:
+            self.assertIs(batch[uid], objects[uid])
+        self.check_consistent(batch)
+        self.assertEqual(batch.update_many(changes), 0)  # 已经是新键
+        batch.close()
+
+        # 日志重放得到相同的状态
+        restored = ProductService(self.csv, log_threshold=None)
+        self.assertEqual(sorted(snapshot(restored)), sorted(snapshot(batch)))
+        restored.close()
+
+        # 与逐个 update 的结果一致
+        for uid, key in changes.items():
+            single.update(uid, single[uid].name, key)
+        self.check_consistent(single)
+        self.assertEqual(sorted(snapshot(single)), sorted(snapshot(batch)))
+        single.close()
+
+    def test_update_many_unknown_uid(self):
+        service = ProductService(self.csv, log_threshold=None)
+        with self.assertRaises(KeyError):
+            service.update_many([(9999, [-100, -1])])
+        service.close()
@@ -0,0 +1,93 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import Client, SimpleTestCase
+
+from core.services import registry
+from core.services.product_service_plus import MAX_NAME_BYTES, ProductService
+
+
+class ProductsPlusViewTests(SimpleTestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        files = [os.path.join(self.dir, name) for name in ('products', 'uid_price', 'price_index.bpt')]
+        self.service = ProductService(*files)
+        with self.service.batch():
+            for i in range(1200):
+                self.service.add_product(f'p{i}', i % 40)
+        patcher = mock.patch.dict(registry._instances, {'products_plus': self.service})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.service.close()
+        shutil.rmtree(self.dir)
+
+    def lines(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+    def test_stream_and_cursor(self):
+        expected = sorted(self.service, key=lambda p: p.price)
+        products = self.lines('/products/plus/')
+        self.assertEqual(len(products), 1200)  # 多于一批
+        self.assertEqual([p['price'] for p in products], [p.price for p in expected])
+
+        self.assertEqual(self.lines('/products/plus/?reverse=1&limit=1500'), products[::-1])
+
+        products = self.lines('/products/plus/range/?price1=30&price2=10')
+        self.assertEqual(sorted(p['uid'] for p in products), sorted(p.uid for p in expected if 10 <= p.price <= 30))
+
+        pages, url = [], '/products/plus/range/?price1=10&price2=30&limit=100'
+        while True:
+            *batch, last = self.lines(url)
+            if 'next_cursor' not in last:
+                pages.extend(batch + [last])
+                break
+            pages.extend(batch)
+            url = f'/products/plus/range/?price1=10&price2=30&limit=100&cursor={last["next_cursor"]}'
+        self.assertEqual(pages, products)
+
+        for url in ('/products/plus/?cursor=bad', '/products/plus/?limit=0', '/products/plus/range/?price1=1'):
+            self.assertEqual(self.client.get(url).status_code, 400)
+
+    def test_detail_and_mutate(self):
+        response = self.client.get('/products/plus/detail/5/')
+        self.assertEqual(response.json()['product'], {'uid': 5, 'product_name': 'p4', 'price': 4})
+        self.assertEqual(self.client.get('/products/plus/detail/5000/').status_code, 404)
+
+        response = self.client.post('/products/plus/add/', {'product_name': 'new', 'price': '7'})
+        self.assertEqual(response.json()['product'], {'uid': 1201, 'product_name': 'new', 'price': 7})
+        self.assertEqual(self.client.post('/products/plus/add/', {'product_name': 'x', 'price': '-1'}).status_code, 400)
+
+        response = self.client.post('/products/plus/detail/5/', {'price': '99'})
+        self.assertEqual(response.json()['product'], {'uid': 5, 'product_name': 'p4', 'price': 99})
+        self.assertEqual([p['uid'] for p in self.lines('/products/plus/range/?price1=99&price2=99')], [5])
+
+        self.assertEqual(self.client.post('/products/plus/delete/', {'uid': '5'}).json(), {'status': 'success'})
+        self.assertEqual(self.client.post('/products/plus/delete/', {'uid': '5'}).status_code, 404)
+        self.assertEqual(self.client.get('/products/plus/delete/?uid=6').status_code, 405)
+        self.assertEqual(self.lines('/products/plus/range/?price1=99&price2=99'), [])
+
+    def test_invalid_input(self):
+        for data in ({'product_name': 'x', 'price': str(2 ** 63)}, {'product_name': 'x', 'price': '\u00b2'},
+                     {'product_name': 'x' * (MAX_NAME_BYTES + 1), 'price': '1'}):
+            self.assertEqual(self.client.post('/products/plus/add/', data).status_code, 400)
+        self.assertEqual(self.client.post('/products/plus/detail/5/', {'product_name': '名' * MAX_NAME_BYTES}).status_code, 400)
+        self.assertEqual(self.client.get('/products/plus/range/?price1=0&price2=99999999999999999999').status_code, 400)
+        self.assertEqual(self.client.post('/products/plus/delete/', {'uid': str(2 ** 64)}).status_code, 400)
+        self.assertEqual(self.client.get('/products/plus/detail/5/').json()['product'], {'uid': 5, 'product_name': 'p4', 'price': 4})
+        self.assertEqual(len(self.service), 1200)
+
+    def test_csrf(self):
+        client = Client(enforce_csrf_checks=True)
+        self.assertEqual(client.post('/products/plus/add/', {'product_name': 'new', 'price': '7'}).status_code, 403)
+        token = client.get('/products/plus/detail/5/').cookies['csrftoken'].value
+        response = client.post('/products/plus/add/', {'product_name': 'new', 'price': '7'}, HTTP_X_CSRFTOKEN=token)
+        self.assertEqual(response.json()['product'], {'uid': 1201, 'product_name': 'new', 'price': 7})
@@ -0,0 +1,104 @@
+import os
+import random
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+
+from core.services.data_structures import RecordStore
+
+
+class RecordStoreTests(SimpleTestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.file = os.path.join(self.dir, 'records')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def check(self, store, heads, expected):
+        """expected: {rid: (group, key, text)}"""
+        for rid, record in expected.items():
+            self.assertEqual(store.read(rid), record)
+        self.assertEqual(sorted(store), sorted(expected.values()))
+        self.assertEqual(sorted(store.heads()), sorted(heads.items()))
+        for group, head in heads.items():
+            self.assertEqual(sorted(store.chain(head)), sorted(r for r in expected.values() if r[0] == group))
+            records = sorted((rid, *r) for rid, r in expected.items() if r[0] == group)
+            self.assertEqual(list(store.scan(head)), records)
+            middle = records[len(records) // 2][0]
+            self.assertEqual(list(store.scan(head, middle)), [r for r in records if r[0] > middle])
+            self.assertEqual(list(store.scan(head, reverse=True)), records[::-1])
+            self.assertEqual(list(store.scan(head, middle, reverse=True)), [r for r in records[::-1] if r[0] < middle])
+
+    def test_random_ops(self):
+        rng = random.Random(71)
+        for cache_size in (0, 4):
+            store = RecordStore(self.file, cache_size)
+            heads, expected = {}, {}
+            for step in range(4000):
+                op = rng.random()
+                if op < 0.5 or not expected:
+                    group = rng.randint(0, 5)
+                    text = 'é' * rng.randint(0, 60)
+                    rid, heads[group] = store.append(heads.get(group), group, step, text)
+                    self.assertNotIn(rid, expected)
+                    expected[rid] = (group, step, text)
+                elif op < 0.8:
+                    rid = rng.choice(list(expected))
+                    group = expected.pop(rid)[0]
+                    emptied = store.delete(heads[group], rid)
+                    self.assertEqual(emptied, all(r[0] != group for r in expected.values()))
+                    if emptied:
+                        del heads[group]
+                else:
+                    rid = rng.choice(list(expected))
+                    group, key, _ = expected[rid]
+                    text = str(step) * rng.randint(0, 40)
+                    if store.write(rid, text):
+                        expected[rid] = (group, key, text)
+                if step % 500 == 0:
+                    store.close()
+                    store = RecordStore(self.file, cache_size)
+            self.check(store, heads, expected)
+            store.close()
+            store = RecordStore(self.file, cache_size)
+            self.check(store, heads, expected)
+            store.close()
+            os.remove(self.file)
+
+    def test_appends_touch_one_page(self):
+        store = RecordStore(self.file)
+        rid, head = store.append(None, 1, 1, 'a')
+        store.commit()
+        for key in range(2, 50):
+            self.assertEqual(store.append(head, 1, key, 'name')[1], head)
+            self.assertEqual(list(store._dirty), [head])
+            store.commit()
+        store.close()
+
+    def test_pages_reused(self):
+        store = RecordStore(self.file)
+        head = None
+        rids = []
+        for key in range(1000):
+            rid, head = store.append(head, 9, key, 'x' * 20)
+            rids.append(rid)
+        pages = store.pages
+        for rid in rids:
+            store.delete(head, rid)
+        self.assertEqual(store.heads(), [])
+        head = None
+        for key in range(1000):
+            head = store.append(head, 3, key, 'y' * 20)[1]
+        self.assertEqual(store.pages, pages)  # 释放的页被复用
+        with self.assertRaises(ValueError):
+            store.append(head, 3, 0, 'z' * 5000)
+        store.close()
+
+    def test_invalid_file(self):
+        with open(self.file, 'wb') as f:
+            f.write(b'not a record file')
+        with self.assertRaises(ValueError):
+            RecordStore(self.file)
@@ -0,0 +1,64 @@
+import threading
+import time
+
+from django.test import SimpleTestCase
+
+from core.services import ServiceRegistry
+
+
+class Slow:
+    """构造较慢的服务, 记录构造次数"""
+    built = 0
+
+    def __init__(self):
+        time.sleep(0.05)
+        Slow.built += 1
+
+
+class ServiceRegistryTests(SimpleTestCase):
+
+    def setUp(self):
+        Slow.built = 0
+        self.registry = ServiceRegistry()
+        self.registry.register('slow', Slow)
+        self.registry.register('list', list)
+
+    def test_lazy(self):
+        self.assertFalse(self.registry.loaded('slow'))
+        self.assertEqual(Slow.built, 0)
+        service = self.registry.get('slow')
+        self.assertIs(self.registry.get('slow'), service)
+        self.assertEqual(Slow.built, 1)
+        self.assertEqual(list(self.registry.load_times()), ['slow'])
+        self.assertGreater(self.registry.load_times()['slow'], 0.04)
+        with self.assertRaises(KeyError):
+            self.registry.get('missing')
+
+    def test_concurrent_get_builds_once(self):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.registry.get('slow'))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(Slow.built, 1)
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_prewarm_background(self):
+        thread = self.registry.prewarm(['slow'])
+        self.assertIs(self.registry.get('slow'), self.registry.get('slow'))  # 与预热线程竞争, 仍只构造一次
+        thread.join()
+        self.assertEqual(Slow.built, 1)
+        self.assertFalse(self.registry.loaded('list'))
+
+        self.assertIsNone(self.registry.prewarm(background=False))
+        self.assertTrue(self.registry.loaded('list'))
+        with self.assertRaises(KeyError):
+            self.registry.prewarm(['missing'])
+
+    def test_reset(self):
+        first = self.registry.get('slow')
+        self.registry.reset('slow')
+        self.assertFalse(self.registry.loaded('slow'))
+        self.assertIsNot(self.registry.get('slow'), first)
+        self.assertEqual(Slow.built, 2)
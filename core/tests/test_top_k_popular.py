@@ -0,0 +1,77 @@
+import os
+import random
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+
+from core.services.product_service import ProductService
+
+
+class TopKPopularTests(SimpleTestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.csv = os.path.join(self.dir, 'products.csv')
+        rng = random.Random(31)
+        with open(self.csv, 'w') as f:
+            for uid in range(1, 1501):
+                # 价格与人气取值都较少, 制造大量同价格组和同人气商品
+                f.write(f"{uid},p{uid},{rng.randint(1, 60)},{rng.randint(1, 200)}\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def brute(self, service, price_min, price_max, k):
+        products = [
+            p for p in service
+            if (price_min is None or -p.key_element()[0] / 100 >= price_min)
+            and (price_max is None or -p.key_element()[0] / 100 <= price_max)
+        ]
+        products.sort(key=lambda p: (p.key_element()[1], p.uid))  # 人气降序, uid 升序
+        return [p.uid for p in products[:k]]
+
+    def check(self, service, rng):
+        for _ in range(40):
+            lo = rng.randint(0, 60)
+            price_min, price_max = rng.choice([(None, None), (lo, lo), (lo, lo + rng.randint(0, 30)), (None, lo)])
+            k = rng.choice([0, 1, 5, 50, 2000])
+            got = [p.uid for p in service.top_k_popular(price_min, price_max, k)]
+            self.assertEqual(got, self.brute(service, price_min, price_max, k), (price_min, price_max, k))
+            if service.popularity_index is not None:
+                # 两种执行方式结果一致
+                start, end = service._prize_keys(price_min, price_max)
+                if k > 0:
+                    self.assertEqual([p.uid for p in service._top_k_by_range(start, end, k)], got)
+                    self.assertEqual([p.uid for p in service._top_k_by_popularity(start, end, k)], got)
+
+    def mutate(self, service, rng):
+        for _ in range(300):
+            uids = list(service.uid_map.keys())
+            op = rng.random()
+            if op < 0.4:
+                service.add('x', [-100 * rng.randint(1, 60), -rng.randint(1, 200)])
+            elif op < 0.7:
+                service.remove(rng.choice(uids))
+            else:
+                service.update(rng.choice(uids), 'y', [-100 * rng.randint(1, 60), -rng.randint(1, 200)])
+
+    def test_without_index(self):
+        rng = random.Random(32)
+        service = ProductService(self.csv, log_threshold=None)
+        self.assertIsNone(service.popularity_index)
+        self.check(service, rng)
+        self.mutate(service, rng)
+        self.check(service, rng)
+        service.close()
+
+    def test_with_index(self):
+        rng = random.Random(33)
+        for bulk_load in (True, False):
+            service = ProductService(self.csv, log_threshold=None, bulk_load=bulk_load, popularity_index=True)
+            self.assertEqual(sum(len(bucket) for bucket in service.popularity_index.values()), len(service))
+            self.check(service, rng)
+            self.mutate(service, rng)
+            self.assertEqual(sum(len(bucket) for bucket in service.popularity_index.values()), len(service))
+            self.check(service, rng)
+            service.close()
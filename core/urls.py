@@ -29,4 +29,11 @@ urlpatterns = [
     path('products/delete/', views.delete_product, name='delete_product'),
     path('products/add/', views.product_detail_view, name='add_product'),
     path('products/detail/<int:uid>/', views.product_detail_view, name='edit_product'),
+
+    # products/plus
+    path('products/plus/', views.products_view_plus, name='products_plus'),
+    path('products/plus/range/', views.products_range_plus, name='products_range_plus'),
+    path('products/plus/delete/', views.delete_product_plus, name='delete_product_plus'),
+    path('products/plus/add/', views.product_detail_view_plus, name='add_product_plus'),
+    path('products/plus/detail/<int:uid>/', views.product_detail_view_plus, name='edit_product_plus'),
 ]
@@ -3,3 +3,5 @@ from .tasks_plus import tasks_view_plus, delete_task_plus, task_detail_view_plus
     delete_relation_view
 from .clients import clients_view, node_detail, edge_detail, node_add, clients_influence
 from .products import products_view, product_detail_view, delete_product
+from .products_plus import products_view_plus, products_range_plus, product_detail_view_plus, \
+    delete_product_plus
@@ -3,13 +3,12 @@ from django.http import JsonResponse
 from django.views.decorators.http import require_GET, require_POST
 from django.views.decorators.csrf import csrf_exempt
 
-from ..services import ClientService
-
-client_service = ClientService()
+from ..services import registry  # 服务在第一次使用时才构造 (读取数据)
 
 
 @require_GET
 def clients_view(request):
+    client_service = registry.get('clients')
     # 获取所有节点数据
     nodes = []
     for uid in client_service.locators:
@@ -53,6 +52,7 @@ def clients_view(request):
 
 @require_GET
 def clients_influence(request, uid, loop):
+    client_service = registry.get('clients')
     if uid is None:
         return redirect('/clients/')
     loop = True if loop == 'loop' else False
@@ -116,6 +116,7 @@ def clients_influence(request, uid, loop):
 
 @require_GET
 def node_add(request):
+    client_service = registry.get('clients')
     if request.GET.get('action') == 'save':
         # 处理添加新客户
         client_name = request.GET.get('name')
@@ -143,6 +144,7 @@ def node_add(request):
 
 @require_GET
 def node_detail(request, uid):
+    client_service = registry.get('clients')
     # 获取节点信息
     node = {
         'uid': uid,
@@ -207,6 +209,7 @@ def node_detail(request, uid):
 
 @require_GET
 def edge_detail(request, source, target):
+    client_service = registry.get('clients')
     # 获取边信息
     edge = {
         'source': source,
@@ -2,14 +2,18 @@ from django.shortcuts import render, redirect
 from django.http import JsonResponse, HttpResponseBadRequest
 from django.views.decorators.http import require_http_methods
 
-from ..services import ProductService
+from ..services import registry  # 服务在第一次使用时才构造 (读取数据)
 
-# 全局 ProductService 实例, 避免重复读取数据
-product_service = ProductService()
+# 分页时每页展示的商品数
+PAGE_SIZE = 50
+
+# 搜索时最多展示的商品数
+DISPLAY_LIMIT = 1000
 
 
 @require_http_methods(["GET", "POST"])
 def products_view(request):
+    product_service = registry.get('products')
     context = {}
 
     # 处理 GET 请求, 获取 price 参数
@@ -17,43 +21,36 @@ def products_view(request):
     price2 = request.GET.get('price2')
 
     # plus 功能: 搜索匹配名字
-    uid_list = None
     pattern = request.GET.get('pattern', '')
-    if pattern != '':
-        uid_list = product_service.search_name(pattern)
+
+    # 分页参数 ?page= , 从 1 开始, 缺省为第 1 页
+    page = request.GET.get('page')
 
     # 获取所有商品或 price1 to price2 的商品
-    products = []
-    if price1 and price2:
-        price1, price2 = float(price1), float(price2)
-        for product in product_service.prize_between(price1, price2):
-            products.append(product)
+    if (price1 and price2) or pattern != '':
+        # 组合查询: 由选择性更高的条件驱动, 到展示上限即停止; 相同条件的重复查询命中缓存
+        price_min, price_max = (float(price1), float(price2)) if price1 and price2 else (None, None)
+        products = product_service.query(price_min, price_max, pattern, limit=DISPLAY_LIMIT)
     else:
-        for product in product_service:
-            products.append(product)
+        # 未筛选时总是分页展示 (缺省为第 1 页), 只读取当前页, O(log n + PAGE_SIZE)
+        page = int(page) if page and page.isdigit() and int(page) > 0 else 1
+        products = product_service.page((page - 1) * PAGE_SIZE, PAGE_SIZE)
+        num_pages = max(1, (len(product_service) + PAGE_SIZE - 1) // PAGE_SIZE)
+        context['page'] = page
+        context['prev_page'] = page - 1 if page > 1 else None
+        context['next_page'] = page + 1 if page < num_pages else None
+        context['num_pages'] = num_pages
 
     # 打包传递给前端的数据
     table_data = []
     for product in products:
-        uid, product_name = product.uid, product.name
-        if pattern == "":
-            price, popularity = product.key_element()
-            table_data.append({
-                'uid': uid,
-                'product_name': product_name,
-                'price': -round(price / 100, 2),
-                'popularity': -popularity,
-            })
-        # 加入 name 匹配限制
-        if uid_list:
-            if uid in uid_list:
-                price, popularity = product.key_element()
-                table_data.append({
-                    'uid': uid,
-                    'product_name': product_name,
-                    'price': -round(price / 100, 2),
-                    'popularity': -popularity,
-                })
+        price, popularity = product.key_element()
+        table_data.append({
+            'uid': product.uid,
+            'product_name': product.name,
+            'price': -round(price / 100, 2),
+            'popularity': -popularity,
+        })
     context['products'] = table_data  # 展示内容
     context['length'] = len(product_service)  # 总长度
     context['show_num'] = len(table_data)  # 最终展示
@@ -63,6 +60,7 @@ def products_view(request):
 
 @require_http_methods(["GET"])
 def delete_product(request):
+    product_service = registry.get('products')
     # 处理删除商品
     uid = request.GET.get('uid')  # get uid
 
@@ -79,9 +77,8 @@ def delete_product(request):
         return JsonResponse({'status': 'error', 'message': '商品不存在'}, status=404)
 
     # 2. 获取成功后, 进行删除
-    result = product_service.remove(uid)
-    if result:  # 删除成功, 保存到磁盘文件中
-        product_service.save()  # 保存
+    result = product_service.remove(uid)  # 删除操作同时追加到日志
+    if result:
         return JsonResponse({'status': 'success'})  # 向前端传回响应
     else:
         return JsonResponse({'status': 'error', 'message': '删除任务失败'}, status=400)
@@ -89,6 +86,7 @@ def delete_product(request):
 
 @require_http_methods(["GET", "POST"])
 def product_detail_view(request, uid=None):
+    product_service = registry.get('products')
     context = {}
 
     # 1. 处理 GET 请求, 用于展示已有数据
@@ -143,14 +141,12 @@ def product_detail_view(request, uid=None):
                 return render(request, 'product/product_detail.html', context)
 
             # 更新现有商品
-            product_service.update(uid, product_name, [-int(price * 100), -popularity])
-            product_service.save()
+            product_service.update(uid, product_name, [-round(price * 100), -popularity])  # 同时追加到日志
             return redirect('products')
         else:
             # 新增任务
-            uid = product_service.add(product_name, [-int(price * 100), -popularity])
+            uid = product_service.add(product_name, [-round(price * 100), -popularity])  # 同时追加到日志
             if uid:
-                product_service.save()
                 return redirect('products')
             else:
                 context['error'] = '添加商品失败'
@@ -0,0 +1,167 @@
+import json
+
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import ensure_csrf_cookie
+from django.views.decorators.http import require_http_methods
+
+from ..services import registry  # 服务在第一次使用时才构造 (读取数据)
+
+# JSON 接口同样受 CSRF 保护: GET 响应设置 csrftoken cookie, POST 时在 X-CSRFToken 头中带回
+
+# 流式输出时每批从服务中取出的商品数, 内存中最多保留一批
+STREAM_BATCH = 500
+
+# 价格与 uid 以 8 字节有符号整数存储
+INT64_MAX = 2 ** 63 - 1
+
+
+def _product_data(product):
+    return {'uid': product.uid, 'product_name': product.name, 'price': product.price}
+
+
+def _error(message, status=400):
+    return JsonResponse({'status': 'error', 'message': message}, status=status)
+
+
+def _int_param(params, name, required=False):
+    """
+    读取非负整数参数 (价格以 8 字节整数存储在 B+ 树中)
+    :return: 整数; 未提供且非必需时为 None
+    :raise ValueError: 缺失、格式错误或超出范围, 附带提示信息
+    """
+    value = params.get(name, '').strip()
+    if not value:
+        if required:
+            raise ValueError(f'{name} 不能为空')
+        return None
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValueError(f'{name} 必须是非负整数') from None
+    if not 0 <= value <= INT64_MAX:
+        raise ValueError(f'{name} 必须在 0 到 {INT64_MAX} 之间')
+    return value
+
+
+def _check_name(name):
+    """商品名编码后须放得进记录文件的一页, 过长则 ValueError"""
+    from ..services.product_service_plus import MAX_NAME_BYTES  # 服务已由 registry 构造, 模块已导入
+    if len(name.encode()) > MAX_NAME_BYTES:
+        raise ValueError(f'product_name 不能超过 {MAX_NAME_BYTES} 字节')
+
+
+def _stream_products(request, min_price=None, max_price=None):
+    """
+    按 (价格, 记录号) 升序以 JSON lines 流式输出商品, 每行一个商品; ?reverse=1 则降序 (价格最高的在前)
+    参数 ?cursor= 从上次的位置继续, ?limit= 限制商品数; 达到 limit 且还有商品时, 最后一行为 {"next_cursor": ...}
+    商品沿 B+ 树叶子链表逐批惰性读取 (scan 内部持有服务锁), 锁外输出; 批与批之间由游标衔接,
+    其间其他请求的修改不会导致重复或遗漏未修改的商品
+    """
+    product_service = registry.get('products_plus')
+    try:
+        limit = _int_param(request.GET, 'limit')
+    except ValueError as e:
+        return _error(str(e))
+    if limit == 0:
+        return _error('limit 必须是正整数')
+    cursor = request.GET.get('cursor') or None
+    reverse = request.GET.get('reverse') in ('1', 'true')
+
+    def batch_size(sent):
+        return STREAM_BATCH if limit is None else min(STREAM_BATCH, limit - sent)
+
+    # 第一批在返回响应前读取, 游标无效时仍可返回 400
+    try:
+        batch, cursor = product_service.scan(cursor, batch_size(0), min_price, max_price, reverse)
+    except ValueError:
+        return _error('游标无效')
+
+    def lines(batch, cursor):
+        sent = 0
+        while True:
+            for product in batch:
+                yield json.dumps(_product_data(product), ensure_ascii=False) + '\n'
+            sent += len(batch)
+            if cursor is None:
+                return
+            if limit is not None and sent >= limit:
+                yield json.dumps({'next_cursor': cursor}) + '\n'
+                return
+            batch, cursor = product_service.scan(cursor, batch_size(sent), min_price, max_price, reverse)
+
+    return StreamingHttpResponse(lines(batch, cursor), content_type='application/x-ndjson')
+
+
+@require_http_methods(["GET"])
+@ensure_csrf_cookie
+def products_view_plus(request):
+    # 所有商品, 按价格升序
+    return _stream_products(request)
+
+
+@require_http_methods(["GET"])
+@ensure_csrf_cookie
+def products_range_plus(request):
+    # price1 to price2 (包含两端) 的商品, 结果可能很大, 逐批输出
+    try:
+        price1 = _int_param(request.GET, 'price1', required=True)
+        price2 = _int_param(request.GET, 'price2', required=True)
+    except ValueError as e:
+        return _error(str(e))
+    return _stream_products(request, min(price1, price2), max(price1, price2))
+
+
+@require_http_methods(["POST"])
+def delete_product_plus(request):
+    product_service = registry.get('products_plus')
+    # 1. 检查 uid 获取是否成功
+    try:
+        uid = _int_param(request.POST, 'uid', required=True)
+    except ValueError as e:  # 未获取到 uid 或不是整数
+        return _error(str(e))
+
+    # 2. 获取成功后, 进行删除
+    with product_service.lock:
+        result = product_service.remove_product(uid)
+    if result:
+        return JsonResponse({'status': 'success'})
+    return _error('商品不存在', status=404)
+
+
+@require_http_methods(["GET", "POST"])
+@ensure_csrf_cookie
+def product_detail_view_plus(request, uid=None):
+    product_service = registry.get('products_plus')
+
+    # 1. 处理 GET 请求, 返回商品详情
+    if request.method == 'GET':
+        if uid is None:
+            return _error('UID 不能为空')
+        with product_service.lock:
+            product = product_service.find_product_by_uid(uid)
+        if product is None:  # 未查询到
+            return _error('商品不存在', status=404)
+        return JsonResponse({'status': 'success', 'product': _product_data(product)})
+
+    # 2. update & add 操作: 处理 POST 请求
+    product_name = request.POST.get('product_name', '').strip()
+    try:
+        price = _int_param(request.POST, 'price', required=uid is None)
+        _check_name(product_name)
+    except ValueError as e:
+        return _error(str(e))
+
+    with product_service.lock:
+        if uid is None:
+            # 新增商品
+            if not product_name:
+                return _error('product_name 不能为空')
+            uid = product_service.add_product(product_name, price)
+        else:
+            # 更新现有商品 (uid 不变), 未提供的字段保持原值
+            if not product_name and price is None:
+                return _error('不允许提交空白内容')
+            if not product_service.update_product(uid, product_name or None, price):
+                return _error('商品不存在', status=404)
+        product = product_service.find_product_by_uid(uid)
+    return JsonResponse({'status': 'success', 'product': _product_data(product)})
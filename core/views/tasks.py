@@ -2,14 +2,12 @@ from django.shortcuts import render, redirect
 from django.http import JsonResponse, HttpResponseBadRequest
 from django.views.decorators.http import require_http_methods
 
-from ..services import TaskService
-
-# 全局 TaskService 实例, 避免重复读取数据
-task_service = TaskService()
+from ..services import registry  # 服务在第一次使用时才构造 (读取数据)
 
 
 @require_http_methods(["GET", "POST"])
 def tasks_view(request):
+    task_service = registry.get('tasks')
     context = {}
 
     # 处理 GET 请求, 获取 top k 参数
@@ -45,6 +43,7 @@ def tasks_view(request):
 
 @require_http_methods(["GET"])
 def delete_task(request):
+    task_service = registry.get('tasks')
     # 处理删除任务
     uid = request.GET.get('uid')  # get uid
 
@@ -71,6 +70,7 @@ def delete_task(request):
 
 @require_http_methods(["GET", "POST"])
 def task_detail_view(request, uid=None):
+    task_service = registry.get('tasks')
     context = {}
 
     # 1. 处理 GET 请求, 用于展示已有数据
@@ -2,14 +2,12 @@ from django.shortcuts import render, redirect
 from django.http import JsonResponse, HttpResponseBadRequest
 from django.views.decorators.http import require_http_methods
 
-from ..services import TaskServicePlus
-
-# 全局 TaskServicePlus 实例, 避免重复读取数据
-task_service = TaskServicePlus()
+from ..services import registry  # 服务在第一次使用时才构造 (读取数据)
 
 
 @require_http_methods(["GET", "POST"])
 def tasks_view_plus(request):
+    task_service = registry.get('tasks_plus')
     context = {}
 
     # 处理 GET 请求, 获取 top k 参数
@@ -80,6 +78,7 @@ def tasks_view_plus(request):
 
 @require_http_methods(["GET"])
 def delete_task_plus(request):
+    task_service = registry.get('tasks_plus')
     # 处理删除任务
     uid = request.GET.get('uid')  # get uid
 
@@ -106,6 +105,7 @@ def delete_task_plus(request):
 
 @require_http_methods(["GET", "POST"])
 def task_detail_view_plus(request, uid=None):
+    task_service = registry.get('tasks_plus')
     context = {}
 
     # 1. 处理 GET 请求, 用于展示已有数据
@@ -176,6 +176,7 @@ def task_detail_view_plus(request, uid=None):
 
 
 def add_relation_view(request):
+    task_service = registry.get('tasks_plus')
     if request.method == 'POST':
         uid = request.POST.get('uid')
         vid = request.POST.get('vid')
@@ -195,6 +196,7 @@ def add_relation_view(request):
 
 
 def delete_relation_view(request):
+    task_service = registry.get('tasks_plus')
     if request.method == 'POST':
         uid = request.POST.get('uid')
         vid = request.POST.get('vid')